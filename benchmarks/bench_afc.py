@@ -0,0 +1,58 @@
+import os
+from functools import lru_cache
+
+import pytest
+
+from fixtures import payload
+
+try:
+    from libimobiledevice.afc import AfcClient
+    from libimobiledevice.device import Device
+    from libimobiledevice.simulator import Simulator
+except (ImportError, OSError) as e:
+    pytest.skip('libimobiledevice could not be loaded: %s' % e, allow_module_level=True)
+
+
+FILE_SIZE = 32 << 20
+UDID = '3ac82354b0a59ba46a03e8ae4937617063e26647'
+
+
+@lru_cache(maxsize=1)
+def data() -> bytes:
+    return payload(FILE_SIZE)
+
+
+@pytest.fixture(scope='module')
+def client():
+    simulator = Simulator(latency=float(os.environ.get('BENCHMARK_AFC_LATENCY', '0')))
+    simulator.add_device(UDID)
+    with simulator.activate():
+        client = AfcClient(device=Device(UDID))
+        with client.open('/benchmark.bin', b'w') as f:
+            f.write(data())
+        yield client
+        client.close()
+
+
+def test_read(benchmark, client, chunk_size):
+    buffer = memoryview(bytearray(chunk_size))
+    benchmark.extra_info['bytes'] = FILE_SIZE
+
+    def read():
+        with client.open('/benchmark.bin', b'r') as f:
+            while f.readinto(buffer):
+                pass
+
+    benchmark(read)
+
+
+def test_write(benchmark, client, chunk_size):
+    view = memoryview(data())
+    benchmark.extra_info['bytes'] = FILE_SIZE
+
+    def write():
+        with client.open('/upload.bin', b'w') as f:
+            for offset in range(0, FILE_SIZE, chunk_size):
+                f.write(view[offset:offset + chunk_size])
+
+    benchmark(write)
@@ -0,0 +1,25 @@
+import pytest
+
+from fixtures import DOMAINS, write_backup
+
+try:
+    from ibackup.libibackup import LocalBackup
+except (ImportError, OSError, NameError) as e:
+    pytest.skip('libibackup could not be loaded: %s' % e, allow_module_level=True)
+
+
+@pytest.fixture
+def backup(cache_dir, backup_files):
+    path = cache_dir / ('backup-%d' % backup_files)
+    if not (path / 'Manifest.db').exists():
+        write_backup(str(path), backup_files)
+    return LocalBackup(str(path))
+
+
+def test_domains(benchmark, backup):
+    benchmark(backup.domains)
+
+
+def test_files_in_domain(benchmark, backup, backup_files):
+    benchmark.extra_info['files'] = backup_files // len(DOMAINS)
+    benchmark(backup.files_in_domain, DOMAINS[0])
@@ -0,0 +1,73 @@
+import plistlib
+from functools import lru_cache
+
+import pytest
+
+from fixtures import plist_document
+from plist import bindings, libplist
+from plist.libplist import BACKEND_LIBPLIST, BACKEND_PYTHON, FMT_BINARY, FMT_XML
+
+COMPILED = bindings.compiled_binding()
+
+requires_libplist = pytest.mark.skipif(libplist.LIBPLIST is None, reason='libplist could not be loaded')
+requires_compiled = pytest.mark.skipif(COMPILED is None, reason='compiled extension is not built')
+
+BACKENDS = [
+    pytest.param(BACKEND_PYTHON, id='python'),
+    pytest.param(BACKEND_LIBPLIST, id='libplist', marks=requires_libplist),
+]
+
+FORMATS = [
+    pytest.param(FMT_XML, id='xml'),
+    pytest.param(FMT_BINARY, id='binary'),
+]
+
+
+@lru_cache(maxsize=None)
+def document(size: int) -> dict:
+    return plist_document(size)
+
+
+@lru_cache(maxsize=4)
+def encoded(size: int, fmt: int) -> bytes:
+    return plistlib.dumps(document(size), fmt=plistlib.FMT_XML if fmt == FMT_XML else plistlib.FMT_BINARY)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_loads(benchmark, plist_size, fmt, backend):
+    data = encoded(plist_size, fmt)
+    benchmark.extra_info['bytes'] = len(data)
+    benchmark(libplist.loads, data, fmt=fmt, native=True, backend=backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_dumps(benchmark, plist_size, fmt, backend):
+    value = document(plist_size)
+    benchmark.extra_info['bytes'] = len(encoded(plist_size, fmt))
+    benchmark(libplist.dumps, value, fmt=fmt, backend=backend)
+
+
+@requires_compiled
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_compiled_loads(benchmark, plist_size, fmt):
+    data = encoded(plist_size, fmt)
+    benchmark.extra_info['bytes'] = len(data)
+    benchmark(COMPILED.loads, data, fmt=fmt, native=True)
+
+
+@requires_compiled
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_compiled_dumps(benchmark, plist_size, fmt):
+    value = document(plist_size)
+    benchmark.extra_info['bytes'] = len(encoded(plist_size, fmt))
+    benchmark(COMPILED.dumps, value, fmt=fmt)
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_plistlib_loads(benchmark, plist_size, fmt):
+    """The standard library as the baseline the backends are compared against."""
+    data = encoded(plist_size, fmt)
+    benchmark.extra_info['bytes'] = len(data)
+    benchmark(plistlib.loads, data)
@@ -0,0 +1,49 @@
+from functools import lru_cache
+
+import pytest
+
+from fixtures import node_tree
+from plist import bindings
+
+BINDINGS = [
+    pytest.param(module, id=name, marks=pytest.mark.skipif(module is None, reason='%s binding is not available' % name))
+    for name, module in bindings.native_bindings().items()
+]
+
+
+@lru_cache(maxsize=2)
+def tree(count: int) -> dict:
+    return node_tree(count)
+
+
+def walk(node) -> int:
+    total = 0
+    for key in node:
+        for item in node[key]:
+            total += item.get_value()
+    return total
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_dict_construction(benchmark, node_count, binding):
+    value = tree(node_count)
+    benchmark(binding.Dict, value)
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_array_construction(benchmark, node_count, binding):
+    value = list(range(node_count))
+    benchmark(binding.Array, value)
+
+
+@pytest.mark.parametrize('lazy', [False, True], ids=['eager', 'lazy'])
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_dict_traversal(benchmark, node_count, binding, lazy):
+    data = binding.Dict(tree(node_count)).to_bin()
+    benchmark(lambda: walk(binding.from_bin(data, lazy=lazy)))
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_native_conversion(benchmark, node_count, binding):
+    node = binding.Dict(tree(node_count))
+    benchmark(node.to_native)
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'libplist'))
+sys.path.insert(0, os.path.join(ROOT, 'libibackup'))
+
+from fixtures import SCALES
+
+
+def pytest_addoption(parser):
+    parser.addoption('--scale', choices=sorted(SCALES), default='quick',
+                     help='fixture sizes to run; "full" goes up to 500 MB plists and 1M file backups')
+
+
+def pytest_generate_tests(metafunc):
+    scale = SCALES[metafunc.config.getoption('scale')]
+    for name in ('plist_size', 'node_count', 'chunk_size', 'backup_files'):
+        if name in metafunc.fixturenames:
+            metafunc.parametrize(name, scale[name], ids=[_size_id(value) for value in scale[name]])
+
+
+def _size_id(value: int) -> str:
+    for unit, size in (('M', 1 << 20), ('K', 1 << 10)):
+        if value >= size and value % size == 0:
+            return '%d%s' % (value // size, unit)
+    return str(value)
+
+
+@pytest.fixture(scope='session')
+def cache_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp('fixtures')
@@ -0,0 +1,104 @@
+"""Deterministic synthetic data for the benchmarks.
+
+Everything is generated from a fixed seed so runs on different commits
+measure identical inputs.
+"""
+
+import hashlib
+import os
+import plistlib
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import *
+
+
+SEED = 0x1DE71CE
+
+SCALES = {
+    'quick': {
+        'plist_size': [1 << 10, 64 << 10, 1 << 20],
+        'node_count': [1000, 10000],
+        'chunk_size': [4 << 10, 64 << 10, 1 << 20],
+        'backup_files': [10000],
+    },
+    'full': {
+        'plist_size': [1 << 10, 64 << 10, 1 << 20, 16 << 20, 128 << 20, 500 << 20],
+        'node_count': [1000, 10000, 100000, 1000000],
+        'chunk_size': [4 << 10, 64 << 10, 1 << 20, 8 << 20],
+        'backup_files': [10000, 100000, 1000000],
+    },
+}
+
+DOMAINS = ['HomeDomain', 'MediaDomain', 'CameraRollDomain', 'AppDomain-com.example.app', 'KeychainDomain']
+
+
+def _record(rng: random.Random, index: int) -> dict:
+    return {
+        'Identifier': 'com.example.item.%d' % index,
+        'Size': rng.randrange(1 << 32),
+        'Ratio': rng.random(),
+        'Enabled': rng.random() < 0.5,
+        'Created': datetime(2020, 1, 1) + timedelta(seconds=rng.randrange(10 ** 8)),
+        'Hash': rng.getrandbits(160).to_bytes(20, 'big'),
+        'Tags': ['tag%d' % rng.randrange(64) for _ in range(rng.randrange(4))],
+    }
+
+
+def plist_document(size: int) -> dict:
+    """A dictionary whose XML encoding is roughly size bytes."""
+    rng = random.Random(SEED)
+    probe = plistlib.dumps({'Items': [_record(random.Random(SEED), i) for i in range(32)]})
+    count = max(1, size * 32 // len(probe))
+    return {
+        'Version': 1,
+        'Items': [_record(rng, i) for i in range(count)],
+    }
+
+
+def node_tree(count: int) -> dict:
+    """A two level tree of dictionaries and arrays holding count leaves."""
+    rng = random.Random(SEED)
+    fanout = 100
+    return {
+        'group%d' % start: [rng.randrange(1 << 31) for _ in range(min(fanout, count - start))]
+        for start in range(0, count, fanout)
+    }
+
+
+def payload(size: int) -> bytes:
+    return random.Random(SEED).getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def write_backup(path: str, files: int, udid: str = '00008030-001A2B3C4D5E6F70'):
+    """Lay out an unencrypted iTunes style backup whose Manifest.db lists files entries.
+
+    Only the manifest is populated; enumeration never touches the file blobs.
+    """
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'Info.plist'), 'wb') as fp:
+        plistlib.dump({'Device Name': 'Benchmark', 'Unique Identifier': udid, 'Product Version': '15.0'}, fp)
+    with open(os.path.join(path, 'Manifest.plist'), 'wb') as fp:
+        plistlib.dump({'IsEncrypted': False, 'Version': '10.0', 'Lockdown': {'UniqueDeviceID': udid}}, fp)
+    with open(os.path.join(path, 'Status.plist'), 'wb') as fp:
+        plistlib.dump({'IsFullBackup': False, 'Version': '3.3', 'SnapshotState': 'finished',
+                       'UUID': udid, 'Date': datetime(2021, 1, 1)}, fp, fmt=plistlib.FMT_BINARY)
+
+    connection = sqlite3.connect(os.path.join(path, 'Manifest.db'))
+    try:
+        connection.execute('CREATE TABLE Files (fileID TEXT PRIMARY KEY, domain TEXT, relativePath TEXT, '
+                           'flags INTEGER, file BLOB)')
+        connection.execute('CREATE INDEX FilesDomainIdx ON Files(domain)')
+        connection.executemany('INSERT INTO Files VALUES (?, ?, ?, ?, ?)', _backup_rows(files))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _backup_rows(files: int) -> Iterator[Tuple[str, str, str, int, Optional[bytes]]]:
+    rng = random.Random(SEED)
+    for index in range(files):
+        domain = DOMAINS[index % len(DOMAINS)]
+        relative_path = 'Library/Data/%03d/file%d.dat' % (rng.randrange(1000), index)
+        file_id = hashlib.sha1(('%s-%s' % (domain, relative_path)).encode('utf-8')).hexdigest()
+        yield file_id, domain, relative_path, 1, None
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""Per-call cost of libplist ctypes calls with and without cached prototypes.
+
+Builds a dict of arrays holding N integer leaves and walks it three ways:
+
+* ``reassign`` - prototypes reassigned before every call, as the bindings used to do
+* ``cached``   - prototypes declared once by ``_initialize_bindings()``
+* ``native``   - ``plist_t_to_native()`` on the same tree
+
+Usage: python benchmarks/plist_bindings.py [NODES ...]
+"""
+
+import os
+import sys
+import time
+from ctypes import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'libplist'))
+
+from plist import libplist
+
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+FANOUT = 100
+
+
+def build_tree(nodes: int) -> c_void_p:
+    lib = libplist.LIBPLIST
+    root = lib.plist_new_dict()
+    for i in range(0, nodes, FANOUT):
+        array = lib.plist_new_array()
+        for j in range(min(FANOUT, nodes - i)):
+            lib.plist_array_append_item(array, lib.plist_new_uint(i + j))
+        lib.plist_dict_set_item(root, b'%d' % i, array)
+    return root
+
+
+def walk_reassign(lib, root) -> int:
+    total = 0
+    value = c_uint64()
+    it = c_void_p()
+    key = c_void_p()
+    array = c_void_p()
+
+    lib.plist_dict_new_iter.argtypes = [c_void_p, POINTER(c_void_p)]
+    lib.plist_dict_new_iter(root, pointer(it))
+    lib.plist_dict_next_item.argtypes = [c_void_p, c_void_p, POINTER(c_void_p), POINTER(c_void_p)]
+    lib.plist_dict_next_item(root, it, pointer(key), pointer(array))
+    while key.value is not None:
+        lib.plist_array_get_size.argtypes = [c_void_p]
+        lib.plist_array_get_size.restype = c_uint32
+        for i in range(lib.plist_array_get_size(array)):
+            lib.plist_array_get_item.argtypes = [c_void_p, c_uint32]
+            lib.plist_array_get_item.restype = c_void_p
+            item = lib.plist_array_get_item(array, i)
+            lib.plist_get_node_type.argtypes = [c_void_p]
+            lib.plist_get_node_type.restype = c_int32
+            lib.plist_get_node_type(item)
+            lib.plist_get_uint_val.argtypes = [c_void_p, POINTER(c_uint64)]
+            lib.plist_get_uint_val(item, pointer(value))
+            total += value.value
+        libplist.LIBC.free(key)
+        lib.plist_dict_next_item.argtypes = [c_void_p, c_void_p, POINTER(c_void_p), POINTER(c_void_p)]
+        lib.plist_dict_next_item(root, it, pointer(key), pointer(array))
+    libplist.LIBC.free(it)
+    return total
+
+
+def walk_cached(lib, root) -> int:
+    total = 0
+    value = c_uint64()
+    it = c_void_p()
+    key = c_void_p()
+    array = c_void_p()
+
+    lib.plist_dict_new_iter(root, byref(it))
+    lib.plist_dict_next_item(root, it, byref(key), byref(array))
+    while key.value is not None:
+        for i in range(lib.plist_array_get_size(array)):
+            item = lib.plist_array_get_item(array, i)
+            lib.plist_get_node_type(item)
+            lib.plist_get_uint_val(item, byref(value))
+            total += value.value
+        libplist.LIBC.free(key)
+        lib.plist_dict_next_item(root, it, byref(key), byref(array))
+    libplist.LIBC.free(it)
+    return total
+
+
+def walk_native(lib, root) -> int:
+    return sum(sum(values) for values in libplist.plist_t_to_native(root).values())
+
+
+def measure(walk, lib, root, nodes: int) -> float:
+    start = time.perf_counter()
+    walk(lib, root)
+    return (time.perf_counter() - start) / nodes * 1e9
+
+
+def main(argv) -> int:
+    if libplist.LIBPLIST is None:
+        print('libplist could not be loaded, nothing to measure', file=sys.stderr)
+        return 1
+
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    # A separate handle so reassigning prototypes does not disturb the cached one
+    uncached = cdll.LoadLibrary(libplist.LIBPLIST._name)
+
+    print('%10s %14s %14s %14s' % ('nodes', 'reassign ns', 'cached ns', 'native ns'))
+    for nodes in sizes:
+        root = build_tree(nodes)
+        try:
+            print('%10d %14.1f %14.1f %14.1f' % (
+                nodes,
+                measure(walk_reassign, uncached, root, nodes),
+                measure(walk_cached, libplist.LIBPLIST, root, nodes),
+                measure(walk_native, libplist.LIBPLIST, root, nodes)))
+        finally:
+            libplist.LIBPLIST.plist_free(root)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,170 @@
+import gc
+import hashlib
+import os
+import plistlib
+import sqlite3
+
+import pytest
+
+from ibackup.libibackup import BackupIndex, BackupItemType, LocalBackup, _prefix_upper_bound
+
+
+def archived_file(properties: dict) -> bytes:
+    """An MBFile record archived the way Manifest.db stores it, strings and data by reference."""
+    objects = ['$null', {}]
+
+    def reference(value):
+        objects.append(value)
+        return plistlib.UID(len(objects) - 1)
+
+    record = objects[1]
+    for key, value in properties.items():
+        record[key] = reference(value) if isinstance(value, (str, bytes)) else value
+    record['$class'] = reference({'$classname': 'MBFile', '$classes': ['MBFile', 'NSObject']})
+    return plistlib.dumps({'$version': 100000, '$archiver': 'NSKeyedArchiver', '$top': {'root': plistlib.UID(1)},
+                           '$objects': objects}, fmt=plistlib.FMT_BINARY)
+
+
+def file_id(domain: str, relative_path: str) -> str:
+    return hashlib.sha1(('%s-%s' % (domain, relative_path)).encode('utf-8')).hexdigest()
+
+
+def make_backup(path, entries) -> str:
+    """Write a backup directory with a Manifest.db listing entries of (domain, path, type, properties, data)."""
+    path.mkdir(exist_ok=True)
+    for name in ('Info.plist', 'Manifest.plist', 'Status.plist'):
+        (path / name).write_bytes(plistlib.dumps({}))
+
+    connection = sqlite3.connect(str(path / 'Manifest.db'))
+    connection.execute('CREATE TABLE Files (fileID TEXT PRIMARY KEY, domain TEXT, relativePath TEXT, '
+                       'flags INTEGER, file BLOB)')
+    for domain, relative_path, item_type, properties, data in entries:
+        identifier = file_id(domain, relative_path)
+        properties = dict({'RelativePath': relative_path, 'Size': len(data or b''), 'Flags': 0}, **properties)
+        connection.execute('INSERT INTO Files VALUES (?, ?, ?, ?, ?)', (
+            identifier, domain, relative_path, item_type.value, archived_file(properties)))
+        if data is not None:
+            (path / identifier[:2]).mkdir(exist_ok=True)
+            (path / identifier[:2] / identifier).write_bytes(data)
+    connection.commit()
+    connection.close()
+    return str(path)
+
+
+ENTRIES = [
+    ('HomeDomain', 'Library', BackupItemType.DIRECTORY, {}, None),
+    ('HomeDomain', 'Library/SMS/sms.db', BackupItemType.FILE, {'Mode': 0o100644}, b'messages'),
+    ('HomeDomain', 'Library/Preferences/com.apple.springboard.plist', BackupItemType.FILE, {}, b'prefs'),
+    ('CameraRollDomain', 'Media/DCIM/100APPLE/IMG_0001.JPG', BackupItemType.FILE, {}, b'jpeg'),
+    ('CameraRollDomain', 'Media/\U0010FFFF', BackupItemType.FILE, {}, b'last'),
+    ('HomeDomain', 'Library/Latest', BackupItemType.SYMBOLIC_LINK, {'Target': 'Library/SMS/sms.db'}, None),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BackupIndex(make_backup(tmp_path / 'backup', ENTRIES))
+    yield index
+    index.close()
+
+
+def test_domains(index):
+    assert index.domains() == ['CameraRollDomain', 'HomeDomain']
+
+
+def test_files_filters(index):
+    assert [entry.relative_path for entry in index.files('HomeDomain', prefix='Library/S')] == ['Library/SMS/sms.db']
+    assert [entry.relative_path for entry in index.files(pattern='*.JPG')] == ['Media/DCIM/100APPLE/IMG_0001.JPG']
+    assert [entry.relative_path for entry in index.files(file_type=BackupItemType.SYMBOLIC_LINK)] == \
+        ['Library/Latest']
+    assert len(list(index.files())) == len(ENTRIES)
+
+
+def test_by_id(index):
+    entry = index.by_id(file_id('HomeDomain', 'Library/SMS/sms.db'))
+
+    assert entry.domain == 'HomeDomain' and entry.type == BackupItemType.FILE
+    assert index.by_id('0' * 40) is None
+
+
+def test_properties_resolve_archived_references(index):
+    entry = index.by_id(file_id('HomeDomain', 'Library/SMS/sms.db'))
+
+    assert entry.properties == {'RelativePath': 'Library/SMS/sms.db', 'Size': 8, 'Flags': 0, 'Mode': 0o100644}
+    assert entry.size == 8
+
+
+def test_cached_rows_leave_out_archived_records(index):
+    entries = list(index.files())
+
+    assert all(len(row) == 4 for rows in index._cache.values() for row in rows)
+    assert entries[-1].properties['RelativePath'] == entries[-1].relative_path
+
+
+def test_open_shares_an_index_only_while_it_is_used(tmp_path):
+    path = os.path.abspath(make_backup(tmp_path / 'backup', ENTRIES))
+    index = BackupIndex.open(path)
+    assert BackupIndex.open(path) is index and index.domains()
+
+    del index
+    gc.collect()
+    assert path not in BackupIndex._instances
+
+    index = BackupIndex.open(path)
+    index.close()
+    assert path not in BackupIndex._instances
+
+
+def test_prefix_ending_in_the_last_code_point(index):
+    assert [entry.relative_path for entry in index.files(prefix='Media/\U0010FFFF')] == ['Media/\U0010FFFF']
+    assert len(list(index.files(prefix='Media/'))) == 2
+
+
+def test_prefix_upper_bound():
+    assert _prefix_upper_bound('Library/S') == 'Library/T'
+    assert _prefix_upper_bound('a\U0010FFFF\U0010FFFF') == 'b'
+    assert _prefix_upper_bound('\U0010FFFF') is None
+    assert _prefix_upper_bound('\ud7ff') == '\ue000'
+
+
+def test_refresh_leaves_running_queries_alone(index, tmp_path):
+    files = index.files()
+    next(files)
+
+    manifest = tmp_path / 'backup' / 'Manifest.db'
+    os.utime(str(manifest), ns=(0, os.stat(str(manifest)).st_mtime_ns + 1))
+    assert index.domains() == ['CameraRollDomain', 'HomeDomain']
+
+    assert len(list(files)) == len(ENTRIES) - 1
+
+
+def test_entries_read_their_target_from_the_archived_record(index):
+    entry = index.by_id(file_id('HomeDomain', 'Library/Latest'))
+
+    assert entry.target == 'Library/SMS/sms.db'
+    assert index.by_id(file_id('HomeDomain', 'Library/SMS/sms.db')).target is None
+
+
+def test_extract(tmp_path):
+    backup = LocalBackup(make_backup(tmp_path / 'backup', ENTRIES))
+    dest = tmp_path / 'restored'
+
+    report = backup.extract(backup.find(), str(dest), workers=2)
+
+    assert report.ok
+    assert (report.files, report.directories, report.symlinks, report.bytes_copied) == (4, 1, 1, 21)
+    assert (dest / 'HomeDomain' / 'Library' / 'SMS' / 'sms.db').read_bytes() == b'messages'
+    assert os.readlink(str(dest / 'HomeDomain' / 'Library' / 'Latest')) == 'Library/SMS/sms.db'
+
+
+def test_extract_reports_links_without_a_target(tmp_path):
+    entries = ENTRIES + [('HomeDomain', 'Library/Dangling', BackupItemType.SYMBOLIC_LINK, {}, None)]
+    backup = LocalBackup(make_backup(tmp_path / 'backup', entries))
+    dest = tmp_path / 'restored'
+
+    report = backup.extract(backup.find('HomeDomain'), str(dest))
+
+    (entry, error), = report.errors
+    assert entry.relative_path == 'Library/Dangling' and isinstance(error, ValueError)
+    assert not os.path.lexists(str(dest / 'HomeDomain' / 'Library' / 'Dangling'))
+    assert (report.files, report.symlinks) == (2, 1)
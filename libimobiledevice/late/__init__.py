@@ -7,7 +7,7 @@ from typing import Optional
 
 
 class BaseError(Exception):
-    _lookup_table: dict
+    _lookup_table: Optional[dict] = None
     _c_errcode: int
 
     def __init__(self, error_code: int):
@@ -15,6 +15,10 @@ class BaseError(Exception):
         if self._lookup_table is None:
             self._lookup_table = {}
 
+    @property
+    def error_code(self) -> int:
+        return self._c_errcode
+
     def __repr__(self):
         class_name = type(self)
         return f"{class_name}: {self._lookup_table[self._c_errcode]}"
@@ -1,8 +1,20 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
 from ctypes import *
 from enum import Enum
+from io import RawIOBase, SEEK_SET
+from queue import Empty, Queue
+from threading import Lock, local
+from typing import *
+import hashlib
+import json
+import os
+import posixpath
+import time
 from libimobiledevice import BaseError, BaseService
 from libimobiledevice.service import PropertyListService, LockdownServiceDescriptor
 from libimobiledevice.device import Device
+from libimobiledevice.util import parse_c_string_list
 from sys import platform as _platform
 
 
@@ -23,7 +35,7 @@ def initialize_bindings():
     module.afc_file_lock.argtypes = [c_void_p, c_uint64, c_uint32]
     module.afc_file_read.argtypes = [c_void_p, c_uint64, c_char_p, c_uint32, POINTER(c_uint32)]
     module.afc_file_write.argtypes = [c_void_p, c_uint64, c_char_p, c_uint32, POINTER(c_uint32)]
-    module.afc_file_seek.argtypes = [c_void_p, c_uint64, c_uint64, c_int32]
+    module.afc_file_seek.argtypes = [c_void_p, c_uint64, c_int64, c_int32]
     module.afc_file_tell.argtypes = [c_void_p, c_uint64, POINTER(c_uint64)]
     module.afc_file_truncate.argtypes = [c_void_p, c_uint64, c_uint64]
     module.afc_remove_path.argtypes = [c_void_p, c_char_p]
@@ -34,12 +46,18 @@ def initialize_bindings():
     module.afc_set_file_time.argtypes = [c_void_p, c_char_p, c_uint64]
     module.afc_remove_path_and_contents.argtypes = [c_void_p, c_char_p]
     module.afc_get_device_info_key.argtypes = [c_void_p, c_char_p, POINTER(c_char_p)]
+    module.afc_dictionary_free.argtypes = [POINTER(c_char_p)]
 
     return module
 
 
 LIBIMOBILEDEVICE = initialize_bindings()
 
+AFC_MAX_TRANSFER_SIZE = 0xFFFFFFFF
+AFC_TRANSFER_CHUNK_SIZE = 1 << 20
+AFC_DEFAULT_WORKERS = 4
+AFC_SYNC_MANIFEST_VERSION = 1
+
 
 class AfcErrorCode(Enum):
     AFC_E_SUCCESS = 0
@@ -149,71 +167,346 @@ class AfcError(BaseError):
         BaseError.__init__(self, error_code)
 
 
-class AfcFile(object):
+class AfcFile(RawIOBase):
     _client: 'AfcClient'
+    _c_handle: int
+    _mode: bytes
 
     def __init__(self):
         raise TypeError("AfcFile cannot be instantiated")
 
-    def __enter__(self):
-        return self
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._client.handle_error(LIBIMOBILEDEVICE.afc_file_close(self._client.client, self._c_handle))
+        finally:
+            RawIOBase.close(self)
 
-    def __exit__(self, type, value, traceback):
-        self.close()
+    def readable(self) -> bool:
+        return self._mode in (b'r', b'r+', b'w+', b'a+')
 
-    def close(self):
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_close(self._client.client, self._c_handle))
+    def writable(self) -> bool:
+        return self._mode != b'r'
+
+    def seekable(self) -> bool:
+        return True
 
     def lock(self, operation: AfcLockOperation):
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_lock(self._client.client, self._c_handle, operation))
+        self._client.handle_error(LIBIMOBILEDEVICE.afc_file_lock(self._client.client, self._c_handle, operation.value))
 
-    def seek(self, offset: c_int64, whence: c_int32):
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_seek(self._client.client, self._c_handle, offset, whence))
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        self._client.handle_error(LIBIMOBILEDEVICE.afc_file_seek(self._client.client, self._c_handle, offset, whence))
+        return self.tell()
 
-    def tell(self) -> c_uint64:
+    def tell(self) -> int:
         position = c_uint64(0)
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_tell(self._client.client, self._c_handle, pointer(position)))
-        return position
+        self._client.handle_error(
+            LIBIMOBILEDEVICE.afc_file_tell(self._client.client, self._c_handle, pointer(position)))
+        return position.value
+
+    def truncate(self, newsize: int = None) -> int:
+        if newsize is None:
+            newsize = self.tell()
+        self._client.handle_error(LIBIMOBILEDEVICE.afc_file_truncate(self._client.client, self._c_handle, newsize))
+        return newsize
+
+    def readinto(self, buffer) -> int:
+        # afc_file_read writes straight into the caller's memory, no intermediate buffer
+        view = memoryview(buffer).cast('B')
+        size = min(len(view), AFC_MAX_TRANSFER_SIZE)
+        if size == 0:
+            return 0
 
-    def truncate(self, newsize: c_uint64):
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_truncate(self._client.client, self._c_handle, newsize))
+        bytes_read = c_uint32(0)
+        c_data = (c_char * size).from_buffer(view)
+        self._client.handle_error(
+            LIBIMOBILEDEVICE.afc_file_read(self._client.client, self._c_handle, c_data, size, pointer(bytes_read)))
+        return bytes_read.value
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast('B')
+        size = min(len(view), AFC_MAX_TRANSFER_SIZE)
+        if size == 0:
+            return 0
+
+        bytes_written = c_uint32(0)
+        if isinstance(data, bytes):
+            c_data = data
+        elif view.readonly:
+            c_data = (c_char * size).from_buffer_copy(view)
+        else:
+            c_data = (c_char * size).from_buffer(view)
+        self._client.handle_error(
+            LIBIMOBILEDEVICE.afc_file_write(self._client.client, self._c_handle, c_data, size, pointer(bytes_written)))
+        return bytes_written.value
 
-    def read(self, size: c_uint32) -> bytes:
 
-        bytes_read = c_uint32(0)
-        c_data = create_string_buffer(size)
-        result: bytes
+class AfcTransferResult(object):
+    source: str
+    destination: str
+    bytes_transferred: int
+    error: Optional[BaseException]
+
+    def __init__(self, source: str, destination: str):
+        self.source = source
+        self.destination = destination
+        self.bytes_transferred = 0
+        self.error = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return '<AfcTransferResult: %s -> %s failed: %r>' % (self.source, self.destination, self.error)
+        return '<AfcTransferResult: %s -> %s %d bytes>' % (self.source, self.destination, self.bytes_transferred)
+
+
+class AfcStat(object):
+    __slots__ = ('st_ifmt', 'st_size', 'st_blocks', 'st_nlink', 'st_mtime_ns', 'st_birthtime_ns', 'link_target')
+
+    st_ifmt: str
+    st_size: int
+    st_blocks: int
+    st_nlink: int
+    st_mtime_ns: int
+    st_birthtime_ns: int
+    link_target: Optional[str]
+
+    def __init__(self, info: List[str]):
+        values = dict(zip(info[0::2], info[1::2]))
+        self.st_ifmt = values.get('st_ifmt', 'S_IFREG')
+        self.st_size = int(values.get('st_size', 0))
+        self.st_blocks = int(values.get('st_blocks', 0))
+        self.st_nlink = int(values.get('st_nlink', 1))
+        self.st_mtime_ns = int(values.get('st_mtime', 0))
+        self.st_birthtime_ns = int(values.get('st_birthtime', 0))
+        self.link_target = values.get('LinkTarget')
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+    @property
+    def st_birthtime(self) -> float:
+        return self.st_birthtime_ns / 1e9
+
+    def __repr__(self):
+        return '<AfcStat: %s size=%d mtime=%d>' % (self.st_ifmt, self.st_size, self.st_mtime_ns)
+
+
+class AfcDirEntry(object):
+    __slots__ = ('name', 'path', '_stat')
+
+    name: str
+    path: str
+    _stat: AfcStat
+
+    def __init__(self, name: str, path: str, stat: AfcStat):
+        self.name = name
+        self.path = path
+        self._stat = stat
+
+    def stat(self) -> AfcStat:
+        return self._stat
+
+    def is_dir(self) -> bool:
+        return self._stat.st_ifmt == 'S_IFDIR'
+
+    def is_file(self) -> bool:
+        return self._stat.st_ifmt == 'S_IFREG'
+
+    def is_symlink(self) -> bool:
+        return self._stat.st_ifmt == 'S_IFLNK'
+
+    def __repr__(self):
+        return '<AfcDirEntry: %s>' % self.path
+
+
+class _AfcClientPool(object):
+    """Lends out the client and up to size - 1 more connections, each opened when first needed."""
+    _clients: Queue
+    _owned: list
+
+    def __init__(self, client: 'AfcClient', size: int):
+        if size > 1 and client.device is None:
+            raise ValueError("a connection pool needs a client started from a Device")
+
+        self._client = client
+        self._size = size
+        self._opened = 1
+        self._lock = Lock()
+        self._clients = Queue()
+        self._owned = []
+        self._clients.put(client)
+
+    @contextmanager
+    def checkout(self):
+        client = self._take()
         try:
-            self.handle_error(
-                LIBIMOBILEDEVICE.afc_file_read(self._client.client, self._c_handle, c_data, size, pointer(bytes_read)))
-            result = c_data[:bytes_read]
-            return result
-        except BaseError as e:
-            raise e
+            yield client
         finally:
-            free(c_data)
+            self._clients.put(client)
+
+    def _take(self) -> 'AfcClient':
+        try:
+            return self._clients.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            opening = self._opened < self._size
+            if opening:
+                self._opened += 1
+        if not opening:
+            return self._clients.get()
 
-    def write(self, data: bytes) -> c_uint32:
-        bytes_written = c_uint32()
-        c_data: bytes
         try:
-            self.handle_error(LIBIMOBILEDEVICE.afc_file_write(self._client.client, self._c_handle, c_data, len(data),
-                                                              pointer(bytes_written)))
-        except BaseError as e:
+            extra = type(self._client)(device=self._client.device)
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
             raise
+        with self._lock:
+            self._owned.append(extra)
+        return extra
 
-        return bytes_written
+    def close(self):
+        for client in self._owned:
+            client.close()
+        self._owned = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
 
-    def _error(self, ret: c_uint16) -> AfcError:
-        return AfcError(ret)
+
+@contextmanager
+def _fan_out(workers: int, executor: Optional[Executor]):
+    """The executor to fan work out on: the caller's, or a private one of workers threads."""
+    if executor is not None:
+        yield executor
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield executor
+
+
+def _mirror_path(dest_dir: str, path: str) -> Optional[str]:
+    """The local path mirroring device path below dest_dir, None if path climbs out of it."""
+    relative = posixpath.normpath(path.lstrip('/'))
+    if relative in ('.', '..') or relative.startswith('../'):
+        return None
+    return os.path.join(dest_dir, *relative.split('/'))
+
+
+def _transfer_pairs(paths: Iterable, destination: Callable[[str], str]) -> List[Tuple[str, str]]:
+    pairs = []
+    for path in paths:
+        if isinstance(path, tuple):
+            pairs.append(path)
+        else:
+            pairs.append((path, destination(path)))
+    return pairs
+
+
+class AfcSyncManifest(object):
+    """On-disk index of the files mirrored from one device directory.
+
+    files maps device paths to [size, mtime_ns] as last seen on the device,
+    tombstones maps device paths removed from the device to the time the
+    removal was noticed.
+    """
+    path: str
+    udid: Optional[str]
+    files: Dict[str, List[int]]
+    tombstones: Dict[str, float]
+
+    def __init__(self, path: str, udid: Optional[str] = None):
+        self.path = path
+        self.udid = udid
+        self.files = {}
+        self.tombstones = {}
+
+    @classmethod
+    def load(cls, path: str, udid: Optional[str] = None) -> 'AfcSyncManifest':
+        manifest = cls(path, udid)
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return manifest
+
+        if data.get('version') != AFC_SYNC_MANIFEST_VERSION:
+            raise ValueError("Unsupported sync manifest version in %s" % path)
+        if udid is not None and data.get('udid') not in (None, udid):
+            raise ValueError("Sync manifest %s belongs to device %s" % (path, data['udid']))
+
+        manifest.files = data.get('files', {})
+        manifest.tombstones = data.get('tombstones', {})
+        return manifest
+
+    def save(self):
+        data = {
+            'version': AFC_SYNC_MANIFEST_VERSION,
+            'udid': self.udid,
+            'files': self.files,
+            'tombstones': self.tombstones,
+        }
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp, sort_keys=True)
+        os.replace(temporary, self.path)
+
+
+def default_sync_manifest_path(udid: Optional[str], remote_dir: str, dest_dir: str) -> str:
+    """Where sync() keeps its manifest unless told otherwise, below $XDG_CACHE_HOME or ~/.cache."""
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    key = hashlib.sha1(('%s\0%s' % (remote_dir, os.path.abspath(dest_dir))).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, 'libimobiledevice', 'afc-sync', '%s-%s.json' % (udid or 'device', key))
+
+
+class AfcSyncReport(object):
+    dry_run: bool
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: List[str]
+    transfers: List[AfcTransferResult]
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = []
+        self.transfers = []
+
+    @property
+    def errors(self) -> List[AfcTransferResult]:
+        return [result for result in self.transfers if not result.ok]
+
+    @property
+    def bytes_transferred(self) -> int:
+        return sum(result.bytes_transferred for result in self.transfers)
+
+    def __repr__(self):
+        return '<AfcSyncReport: %d added, %d changed, %d removed, %d unchanged%s>' % (
+            len(self.added), len(self.changed), len(self.removed), len(self.unchanged),
+            ' (dry run)' if self.dry_run else '')
 
 
 class AfcClient(BaseService):
     __service_name__ = "com.apple.afc"
     _c_client: c_void_p
+    _device: Optional[Device] = None
 
     def __init__(self, device: Device = None, descriptor: LockdownServiceDescriptor = None):
         self._c_client = c_void_p()
+        self._device = device
         if device is None and descriptor is None:
             raise ArgumentError("device or descriptor must be provided")
 
@@ -228,6 +521,12 @@ class AfcClient(BaseService):
             err = LIBIMOBILEDEVICE.afc_client_free(self._c_client)
             self.handle_error(err)
 
+    def close(self):
+        if self._c_client:
+            err = LIBIMOBILEDEVICE.afc_client_free(self._c_client)
+            self._c_client = c_void_p()
+            self.handle_error(err)
+
     def _error(self, ret: c_uint16) -> AfcError:
         return AfcError(ret)
 
@@ -235,102 +534,278 @@ class AfcClient(BaseService):
     def client(self) -> c_void_p:
         return self._c_client
 
-    def get_device_info(self) -> list:
-        err = c_int16()
-        infos: c_void_p()
-        info: bytes
-        i = 0
-        result = []
-        err = LIBIMOBILEDEVICE.afc_get_device_info(self._c_client, pointer(infos))
+    @property
+    def device(self) -> Optional[Device]:
+        return self._device
+
+    def _string_list(self, function, *args) -> List[str]:
+        c_list = POINTER(c_char_p)()
+        self.handle_error(function(self._c_client, *args, byref(c_list)))
         try:
-            self.handle_error(err)
-        except BaseError as e:
-            raise
+            return parse_c_string_list(c_list) if c_list else []
         finally:
-            if infos is not None:
-                while infos[i]:
-                    info = infos[i]
-                    result.append(info)
-                    free(infos[i])
-                    i = i + 1
-                free(infos)
+            if c_list:
+                LIBIMOBILEDEVICE.afc_dictionary_free(c_list)
 
-        return result
+    def get_device_info(self) -> list:
+        return self._string_list(LIBIMOBILEDEVICE.afc_get_device_info)
 
     def read_directory(self, directory: str) -> list:
-        err = c_int16(0)
-        dir_list = c_void_p()
-        f: bytes
-        i = 0
-        result = []
-        err = LIBIMOBILEDEVICE.afc_read_directory(self._c_client, directory, pointer(dir_list))
-        try:
-            self.handle_error(err)
-        except BaseError as e:
-            raise
-        finally:
-            if dir_list is not None:
-                while dir_list[i]:
-                    f = dir_list[i]
-                    result.append(f)
-                    free(dir_list[i])
-                    i = i + 1
-                free(dir_list)
-
-        return result
+        return self._string_list(LIBIMOBILEDEVICE.afc_read_directory, directory.encode('utf-8'))
 
     def open(self, filename: str, mode: bytes = b'r') -> AfcFile:
-        handle = c_void_p()
+        handle = c_uint64(0)
         c_mode = afc_mode_to_c_mode(mode)
 
-        self.handle_error(LIBIMOBILEDEVICE.afc_file_open(self._c_client, filename, c_mode, pointer(handle)))
+        self.handle_error(LIBIMOBILEDEVICE.afc_file_open(self._c_client, filename.encode('utf-8'), c_mode.value,
+                                                         pointer(handle)))
         f = AfcFile.__new__(AfcFile)
-        f._c_handle = handle
+        f._c_handle = handle.value
         f._client = self
         f._filename = filename
+        f._mode = mode
 
         return f
 
     def get_file_info(self, path: str) -> list:
-        result = []
-        c_result = c_void_p()
-        i = 0
-        info: bytes
-        try:
-            self.handle_error(LIBIMOBILEDEVICE.afc_get_file_info(self._c_client, path, pointer(c_result)))
-        except BaseError as e:
-            raise
-        finally:
-            if c_result is not None:
-                while c_result[i]:
-                    info = c_result[i]
-                    result.append(info)
-                    free(c_result[i])
-                    i = i + 1
-                free(c_result)
-
-        return result
+        return self._string_list(LIBIMOBILEDEVICE.afc_get_file_info, path.encode('utf-8'))
+
+    def stat(self, path: str) -> AfcStat:
+        return AfcStat(self.get_file_info(path))
+
+    def scandir(self, path: str = '/', workers: int = AFC_DEFAULT_WORKERS, executor: Executor = None) \
+            -> Iterator[AfcDirEntry]:
+        """Yield an AfcDirEntry for every entry of path, fetching their stats concurrently.
+
+        The stats are fetched on executor when one is given, otherwise on a
+        private pool of workers threads.
+        """
+        with self.pool(workers) as connections, _fan_out(workers, executor) as executor:
+            yield from self._scandir(path, connections, executor)
+
+    def walk(self, top: str = '/', topdown: bool = True, workers: int = AFC_DEFAULT_WORKERS,
+             executor: Executor = None) -> Iterator[Tuple[str, List[AfcDirEntry], List[AfcDirEntry]]]:
+        """Like os.walk, but directories and files are yielded as AfcDirEntry lists.
+
+        Symbolic links are reported as files and never followed. With topdown,
+        removing entries from the directory list prunes the walk.
+        """
+        with self.pool(workers) as connections, _fan_out(workers, executor) as executor:
+            yield from self._walk(top, topdown, connections, executor)
+
+    def _walk(self, top: str, topdown: bool, connections: _AfcClientPool, executor: Executor):
+        dirs = []
+        files = []
+        for entry in self._scandir(top, connections, executor):
+            if entry.is_dir():
+                dirs.append(entry)
+            else:
+                files.append(entry)
+
+        if topdown:
+            yield top, dirs, files
+        for entry in dirs:
+            yield from self._walk(entry.path, topdown, connections, executor)
+        if not topdown:
+            yield top, dirs, files
+
+    def _scandir(self, path: str, connections: _AfcClientPool, executor: Executor) \
+            -> Iterator[AfcDirEntry]:
+        def list_names() -> List[str]:
+            with connections.checkout() as client:
+                return [name for name in client.read_directory(path) if name not in ('.', '..')]
+
+        names = executor.submit(list_names).result()
+
+        def stat(name: str) -> Optional[AfcDirEntry]:
+            entry_path = posixpath.join(path, name)
+            with connections.checkout() as client:
+                try:
+                    return AfcDirEntry(name, entry_path, client.stat(entry_path))
+                except AfcError as e:
+                    # Removed between listing the directory and asking for its stats
+                    if e.error_code == AfcErrorCode.AFC_E_OBJECT_NOT_FOUND.value:
+                        return None
+                    raise
+
+        for entry in executor.map(stat, names):
+            if entry is not None:
+                yield entry
 
     def remove_path(self, path: str):
-        self.handle_error(LIBIMOBILEDEVICE.afc_remove_path(self._c_client, path))
+        self.handle_error(LIBIMOBILEDEVICE.afc_remove_path(self._c_client, path.encode('utf-8')))
 
-    def rename_path(self, f: str, t: bytes):
-        self.handle_error(LIBIMOBILEDEVICE.afc_rename_path(self._c_client, f, t))
+    def rename_path(self, f: str, t: str):
+        self.handle_error(LIBIMOBILEDEVICE.afc_rename_path(self._c_client, f.encode('utf-8'), t.encode('utf-8')))
 
     def make_directory(self, d: str):
-        self.handle_error(LIBIMOBILEDEVICE.afc_make_directory(self._c_client, d))
+        self.handle_error(LIBIMOBILEDEVICE.afc_make_directory(self._c_client, d.encode('utf-8')))
 
     def truncate(self, path: str, newsize: c_uint64):
-        self.handle_error(LIBIMOBILEDEVICE.afc_truncate(self._c_client, path, newsize))
+        self.handle_error(LIBIMOBILEDEVICE.afc_truncate(self._c_client, path.encode('utf-8'), newsize))
 
     def link(self, source: str, link_name: str):
-        self.handle_error(LIBIMOBILEDEVICE.afc_make_link(self._c_client, AfcLinkType.AFC_HARDLINK, source, link_name))
+        self.handle_error(LIBIMOBILEDEVICE.afc_make_link(self._c_client, AfcLinkType.AFC_HARDLINK.value,
+                                                         source.encode('utf-8'), link_name.encode('utf-8')))
 
     def symlink(self, source: str, link_name: str):
-        self.handle_error(LIBIMOBILEDEVICE.afc_make_link(self._c_client, AfcLinkType.AFC_SYMLINK, source, link_name))
+        self.handle_error(LIBIMOBILEDEVICE.afc_make_link(self._c_client, AfcLinkType.AFC_SYMLINK.value,
+                                                         source.encode('utf-8'), link_name.encode('utf-8')))
 
     def set_file_time(self, path: str, mtime: c_uint64):
-        self.handle_error(LIBIMOBILEDEVICE.afc_set_file_time(self._c_client, path, mtime))
+        self.handle_error(LIBIMOBILEDEVICE.afc_set_file_time(self._c_client, path.encode('utf-8'), mtime))
+
+    def sync(self, remote_dir: str, dest_dir: str, manifest_path: str = None, delete: bool = False,
+             dry_run: bool = False, workers: int = AFC_DEFAULT_WORKERS, executor: Executor = None) -> AfcSyncReport:
+        """Mirror remote_dir into dest_dir, transferring only files that are new or changed.
+
+        The manifest defaults to a per-user cache file for this device and pair of
+        directories, kept out of dest_dir so it never shows up in the mirror. Files
+        removed from the device are deleted locally when delete is set and
+        tombstoned in the manifest otherwise. With dry_run nothing is transferred
+        or written.
+        """
+        udid = self.device.udid if self.device is not None else None
+        remote_dir = posixpath.normpath(remote_dir)
+        if manifest_path is None:
+            manifest_path = default_sync_manifest_path(udid, remote_dir, dest_dir)
+        manifest = AfcSyncManifest.load(manifest_path, udid)
+        report = AfcSyncReport(dry_run)
+
+        seen = {}
+        for _, _, files in self.walk(remote_dir, workers=workers, executor=executor):
+            for entry in files:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen[entry.path] = [stat.st_size, stat.st_mtime_ns]
+
+        def local_path(path: str) -> str:
+            return os.path.join(dest_dir, *posixpath.relpath(path, remote_dir).split('/'))
+
+        pending = []
+        for path, state in seen.items():
+            known = manifest.files.get(path)
+            if known is None:
+                report.added.append(path)
+            elif known != state or not os.path.exists(local_path(path)):
+                report.changed.append(path)
+            else:
+                report.unchanged.append(path)
+                continue
+            pending.append((path, local_path(path)))
+
+        prefix = remote_dir.rstrip('/') + '/'
+        for path in manifest.files:
+            if path.startswith(prefix) and path not in seen:
+                report.removed.append(path)
+
+        if dry_run:
+            return report
+
+        if pending:
+            report.transfers = self.pull_many(pending, dest_dir, workers=workers, executor=executor)
+        for result in report.transfers:
+            if result.ok:
+                mtime_ns = seen[result.source][1]
+                os.utime(result.destination, ns=(mtime_ns, mtime_ns))
+                manifest.files[result.source] = seen[result.source]
+                manifest.tombstones.pop(result.source, None)
+
+        for path in report.removed:
+            del manifest.files[path]
+            if delete:
+                try:
+                    os.remove(local_path(path))
+                except FileNotFoundError:
+                    pass
+            else:
+                manifest.tombstones[path] = time.time()
+
+        os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+        manifest.save()
+        return report
+
+    def pool(self, size: int = AFC_DEFAULT_WORKERS) -> _AfcClientPool:
+        return _AfcClientPool(self, size)
+
+    def pull_many(self, paths: Iterable, dest_dir: str, workers: int = AFC_DEFAULT_WORKERS,
+                  chunk_size: int = AFC_TRANSFER_CHUNK_SIZE, executor: Executor = None) -> List[AfcTransferResult]:
+        """Download device files into dest_dir over a pool of AFC connections.
+
+        Each entry of paths is a device path, mirrored below dest_dir, or a
+        (device_path, local_path) tuple. One result is returned per entry, in order.
+        A device path that resolves outside dest_dir fails with ValueError.
+        """
+        pairs = _transfer_pairs(paths, lambda path: _mirror_path(dest_dir, path))
+        buffers = local()
+
+        def pull(client: AfcClient, result: AfcTransferResult):
+            if result.destination is None:
+                raise ValueError("%s resolves outside %s" % (result.source, dest_dir))
+            if not hasattr(buffers, 'chunk'):
+                buffers.chunk = bytearray(chunk_size)
+            chunk = memoryview(buffers.chunk)
+
+            os.makedirs(os.path.dirname(result.destination) or '.', exist_ok=True)
+            with client.open(result.source, b'r') as source, open(result.destination, 'wb') as destination:
+                count = source.readinto(chunk)
+                while count:
+                    destination.write(chunk[:count])
+                    result.bytes_transferred += count
+                    count = source.readinto(chunk)
+
+        return self._transfer(pairs, pull, workers, executor)
+
+    def push_many(self, paths: Iterable, dest_dir: str, workers: int = AFC_DEFAULT_WORKERS,
+                  chunk_size: int = AFC_TRANSFER_CHUNK_SIZE, executor: Executor = None) -> List[AfcTransferResult]:
+        """Upload local files into the device directory dest_dir over a pool of AFC connections.
+
+        Each entry of paths is a local path, stored under its base name, or a
+        (local_path, device_path) tuple. One result is returned per entry, in order.
+        """
+        pairs = _transfer_pairs(paths, lambda path: posixpath.join(dest_dir, os.path.basename(path)))
+        buffers = local()
+        created = set()
+
+        def push(client: AfcClient, result: AfcTransferResult):
+            # Created with the file it is needed for, so a failure is reported for that file alone
+            directory = posixpath.dirname(result.destination)
+            if directory and directory not in created:
+                client.make_directory(directory)
+                created.add(directory)
+            if not hasattr(buffers, 'chunk'):
+                buffers.chunk = bytearray(chunk_size)
+            chunk = memoryview(buffers.chunk)
+
+            with open(result.source, 'rb', buffering=0) as source, client.open(result.destination, b'w') as destination:
+                count = source.readinto(chunk)
+                while count:
+                    written = 0
+                    while written < count:
+                        written += destination.write(chunk[written:count])
+                    result.bytes_transferred += count
+                    count = source.readinto(chunk)
+
+        return self._transfer(pairs, push, workers, executor)
+
+    def _transfer(self, pairs: List[Tuple[str, str]], operation, workers: int, executor: Optional[Executor]) \
+            -> List[AfcTransferResult]:
+        results = [AfcTransferResult(source, destination) for source, destination in pairs]
+        workers = max(1, min(workers, len(results)))
+
+        def run(result: AfcTransferResult) -> AfcTransferResult:
+            with connections.checkout() as client:
+                try:
+                    operation(client, result)
+                except (BaseError, OSError, ValueError) as e:
+                    result.error = e
+            return result
+
+        with self.pool(workers) as connections, _fan_out(workers, executor) as executor:
+            list(executor.map(run, results))
+
+        return results
 
 
 class Afc2Client(AfcClient):
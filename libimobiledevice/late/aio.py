@@ -0,0 +1,222 @@
+"""asyncio front end for the blocking device APIs.
+
+Every blocking ctypes call runs on a small thread pool owned by the device it
+talks to, so one event loop can drive many devices while calls to the same
+device stay bounded.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Event, Lock
+from typing import *
+from weakref import WeakKeyDictionary
+
+from libimobiledevice import BaseError
+from libimobiledevice import afc as _afc
+from libimobiledevice.device import Device
+from libimobiledevice.service import PropertyListService as _PropertyListService
+from plist.libplist import Node
+
+
+AIO_DEVICE_WORKERS = 4
+AIO_POLL_INTERVAL_MS = 250
+
+_executors: Dict[Optional[str], ThreadPoolExecutor] = {}
+_executors_lock = Lock()
+_device_udids: 'WeakKeyDictionary[Device, str]' = WeakKeyDictionary()
+
+
+def device_executor(udid: Optional[str] = None) -> ThreadPoolExecutor:
+    """The bounded executor shared by every async call made to the device udid."""
+    with _executors_lock:
+        executor = _executors.get(udid)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=AIO_DEVICE_WORKERS,
+                                          thread_name_prefix='libimobiledevice-%s' % (udid or 'shared'))
+            _executors[udid] = executor
+        return executor
+
+
+def shutdown(wait: bool = True):
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+async def _run(executor: ThreadPoolExecutor, function, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args, **kwargs))
+
+
+def _executor_for(device: Optional[Device]) -> ThreadPoolExecutor:
+    if device is None:
+        return device_executor()
+    udid = _device_udids.get(device)
+    if udid is None:
+        # Not opened through open_device(), so this asks the device and blocks
+        udid = _device_udids[device] = device.udid
+    return device_executor(udid)
+
+
+async def _executor_for_device(device: Optional[Device]) -> ThreadPoolExecutor:
+    if device is not None and device not in _device_udids:
+        _device_udids[device] = await _run(device_executor(), getattr, device, 'udid')
+    return _executor_for(device)
+
+
+async def devices() -> List[str]:
+    return await _run(device_executor(), Device.devices)
+
+
+async def open_device(udid: str) -> Device:
+    device = await _run(device_executor(udid), Device, udid)
+    _device_udids[device] = udid
+    return device
+
+
+class PropertyListService(object):
+    """Async wrapper around a connected PropertyListService.
+
+    Cancelling areceive() stops the worker thread within one poll interval; a
+    message that arrives in that window is dropped.
+    """
+    _service: _PropertyListService
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, service: _PropertyListService, executor: ThreadPoolExecutor = None):
+        self._service = service
+        self._executor = executor if executor is not None else device_executor()
+
+    @property
+    def service(self) -> _PropertyListService:
+        return self._service
+
+    async def asend(self, node: Node):
+        await _run(self._executor, self._service.send, node)
+
+    async def areceive(self, timeout: float = None, lazy: bool = True) -> object:
+        cancelled = Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def receive():
+            while not cancelled.is_set():
+                slice_ms = AIO_POLL_INTERVAL_MS
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    slice_ms = max(1, min(slice_ms, int(remaining * 1000)))
+                try:
+                    return self._service.receive_with_timeout(slice_ms, lazy)
+                except BaseError as e:
+                    if not self._service.is_receive_timeout(e):
+                        raise
+            raise asyncio.CancelledError()
+
+        try:
+            return await _run(self._executor, receive)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+
+class AfcClient(object):
+    """Async wrapper around an AfcClient.
+
+    Bulk operations fan out on the device executor, never opening more than
+    AIO_DEVICE_WORKERS connections or threads for one call.
+    """
+    _client: _afc.AfcClient
+    _executor: ThreadPoolExecutor
+
+    def __init__(self, client: _afc.AfcClient, executor: ThreadPoolExecutor = None):
+        self._client = client
+        self._executor = executor if executor is not None else _executor_for(client.device)
+
+    @classmethod
+    async def connect(cls, device: Device) -> 'AfcClient':
+        executor = await _executor_for_device(device)
+        return cls(await _run(executor, _afc.AfcClient, device=device), executor)
+
+    @property
+    def client(self) -> _afc.AfcClient:
+        return self._client
+
+    async def close(self):
+        await _run(self._executor, self._client.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.close()
+
+    async def read(self, path: str, size: int = -1) -> bytes:
+        def read():
+            with self._client.open(path, b'r') as f:
+                return f.read(size) if size >= 0 else f.readall()
+
+        return await _run(self._executor, read)
+
+    async def write(self, path: str, data) -> int:
+        def write():
+            with self._client.open(path, b'w') as f:
+                view = memoryview(data).cast('B')
+                written = 0
+                while written < len(view):
+                    written += f.write(view[written:])
+                return written
+
+        return await _run(self._executor, write)
+
+    async def stat(self, path: str) -> _afc.AfcStat:
+        return await _run(self._executor, self._client.stat, path)
+
+    async def read_directory(self, directory: str) -> List[str]:
+        return await _run(self._executor, self._client.read_directory, directory)
+
+    async def remove_path(self, path: str):
+        await _run(self._executor, self._client.remove_path, path)
+
+    async def make_directory(self, path: str):
+        await _run(self._executor, self._client.make_directory, path)
+
+    async def walk(self, top: str = '/', topdown: bool = True, workers: int = _afc.AFC_DEFAULT_WORKERS) \
+            -> AsyncIterator[Tuple[str, List[_afc.AfcDirEntry], List[_afc.AfcDirEntry]]]:
+        walker = self._client.walk(top, topdown, self._workers(workers), self._executor)
+        done = object()
+        try:
+            while True:
+                item = await self._fan_out(next, walker, done)
+                if item is done:
+                    break
+                yield item
+        finally:
+            await self._fan_out(walker.close)
+
+    async def pull(self, paths: Iterable, dest_dir: str, workers: int = _afc.AFC_DEFAULT_WORKERS) \
+            -> List[_afc.AfcTransferResult]:
+        return await self._fan_out(self._client.pull_many, list(paths), dest_dir, self._workers(workers),
+                                   executor=self._executor)
+
+    async def push(self, paths: Iterable, dest_dir: str, workers: int = _afc.AFC_DEFAULT_WORKERS) \
+            -> List[_afc.AfcTransferResult]:
+        return await self._fan_out(self._client.push_many, list(paths), dest_dir, self._workers(workers),
+                                   executor=self._executor)
+
+    async def sync(self, remote_dir: str, dest_dir: str, workers: int = _afc.AFC_DEFAULT_WORKERS,
+                   **kwargs) -> _afc.AfcSyncReport:
+        return await self._fan_out(self._client.sync, remote_dir, dest_dir, workers=self._workers(workers),
+                                   executor=self._executor, **kwargs)
+
+    @staticmethod
+    def _workers(workers: int) -> int:
+        return max(1, min(workers, AIO_DEVICE_WORKERS))
+
+    async def _fan_out(self, function, *args, **kwargs):
+        # Only waits on the work it hands to the device executor, so it runs on the loop's default
+        # executor: running it on the device executor could occupy every worker with waiting calls
+        return await _run(None, partial(function, *args, **kwargs))
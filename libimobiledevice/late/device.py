@@ -1,12 +1,34 @@
+import asyncio
 from ctypes import *
 from ctypes.util import find_library
-from enum import Enum
+from enum import Enum, IntFlag
+from queue import Queue
+from threading import Lock
 from libimobiledevice import BaseError
-from libimobiledevice.util import parse_c_string_list
+from libimobiledevice.util import parse_c_string_list, parse_darwin_sockaddr
 from sys import platform as _platform
 from typing import *
 
 
+class idevice_event_t(Structure):
+    _fields_ = [
+        ('event', c_int),
+        ('udid', c_char_p),
+        ('conn_type', c_int),
+    ]
+
+
+class idevice_info_t(Structure):
+    _fields_ = [
+        ('udid', c_char_p),
+        ('conn_type', c_int),
+        ('conn_data', c_void_p),
+    ]
+
+
+idevice_event_cb_t = CFUNCTYPE(None, POINTER(idevice_event_t), c_void_p)
+
+
 def _initialize_bindings():
     module = cdll.LoadLibrary(find_library('imobiledevice-1.0'))
 
@@ -15,6 +37,14 @@ def _initialize_bindings():
     module.idevice_get_udid.argtypes = [c_void_p, POINTER(c_char_p)]
     module.idevice_get_device_list.argtypes = [POINTER(POINTER(c_char_p)), POINTER(c_int)]
     module.idevice_device_list_free.argtypes = [POINTER(c_char_p)]
+    module.idevice_new_with_options.argtypes = [POINTER(c_void_p), c_char_p, c_int]
+    module.idevice_get_device_list_extended.argtypes = [POINTER(POINTER(POINTER(idevice_info_t))), POINTER(c_int)]
+    module.idevice_device_list_extended_free.argtypes = [POINTER(POINTER(idevice_info_t))]
+    module.idevice_event_subscribe.argtypes = [idevice_event_cb_t, c_void_p]
+    module.idevice_event_unsubscribe.argtypes = []
+    if hasattr(module, 'idevice_events_subscribe'):
+        module.idevice_events_subscribe.argtypes = [POINTER(c_void_p), idevice_event_cb_t, c_void_p]
+        module.idevice_events_unsubscribe.argtypes = [c_void_p]
 
     return module
 
@@ -46,13 +76,61 @@ class DeviceError(BaseError):
         BaseError.__init__(self, error_code)
 
 
+class DeviceLookup(IntFlag):
+    IDEVICE_LOOKUP_USBMUX = 1 << 1
+    IDEVICE_LOOKUP_NETWORK = 1 << 2
+    IDEVICE_LOOKUP_PREFER_NETWORK = 1 << 3
+
+    PREFER_USB = IDEVICE_LOOKUP_USBMUX | IDEVICE_LOOKUP_NETWORK
+    PREFER_NETWORK = IDEVICE_LOOKUP_USBMUX | IDEVICE_LOOKUP_NETWORK | IDEVICE_LOOKUP_PREFER_NETWORK
+    USB_ONLY = IDEVICE_LOOKUP_USBMUX
+    NETWORK_ONLY = IDEVICE_LOOKUP_NETWORK
+
+
+def _parse_sockaddr(c_data: c_void_p) -> Optional[Tuple[str, int]]:
+    if not c_data:
+        return None
+    return parse_darwin_sockaddr(string_at(c_data, string_at(c_data, 1)[0]))
+
+
+class DeviceInfo(object):
+    __slots__ = ('udid', 'connection_type', 'address')
+
+    udid: str
+    connection_type: 'DeviceConnectionType'
+    address: Optional[Tuple[str, int]]
+
+    def __init__(self, udid: str, connection_type: 'DeviceConnectionType', address: Optional[Tuple[str, int]] = None):
+        self.udid = udid
+        self.connection_type = connection_type
+        self.address = address
+
+    @property
+    def is_network(self) -> bool:
+        return self.connection_type == DeviceConnectionType.CONNECTION_NETWORK
+
+    def open(self) -> 'Device':
+        if self.is_network:
+            return Device(self.udid, DeviceLookup.NETWORK_ONLY)
+        return Device(self.udid, DeviceLookup.USB_ONLY)
+
+    def __repr__(self):
+        if self.address is not None:
+            return '<DeviceInfo: %s via %s at %s>' % (self.udid, self.connection_type.name, self.address[0])
+        return '<DeviceInfo: %s via %s>' % (self.udid, self.connection_type.name)
+
+
 class Device(object):
     _c_handle: c_void_p
 
-    def __init__(self, udid: str):
+    def __init__(self, udid: str, lookup: DeviceLookup = None):
         self._c_handle = c_void_p()
         device_id = create_string_buffer(bytes(udid, 'utf-8'))
-        self._handle_error(LIBIMOBILEDEVICE.idevice_new(pointer(self._c_handle), device_id))
+        if lookup is None:
+            self._handle_error(LIBIMOBILEDEVICE.idevice_new(pointer(self._c_handle), device_id))
+        else:
+            self._handle_error(LIBIMOBILEDEVICE.idevice_new_with_options(pointer(self._c_handle), device_id,
+                                                                         int(lookup)))
 
     def __del__(self):
         if self._c_handle:
@@ -87,4 +165,214 @@ class Device(object):
 
         free_result = LIBIMOBILEDEVICE.idevice_device_list_free(list)
 
-        return devices
\ No newline at end of file
+        return devices
+
+    @staticmethod
+    def devices_extended(lookup: DeviceLookup = None) -> List[DeviceInfo]:
+        """Every USB and network connection usbmuxd knows about.
+
+        With lookup, connections it excludes are dropped and each device is
+        listed once, over the connection the policy prefers.
+        """
+        c_list = POINTER(POINTER(idevice_info_t))()
+        count = c_int(0)
+        Device._handle_error(LIBIMOBILEDEVICE.idevice_get_device_list_extended(byref(c_list), byref(count)))
+        try:
+            infos = []
+            for index in range(count.value):
+                c_info = c_list[index].contents
+                connection_type = DeviceConnectionType(c_info.conn_type)
+                address = _parse_sockaddr(c_info.conn_data) \
+                    if connection_type == DeviceConnectionType.CONNECTION_NETWORK else None
+                infos.append(DeviceInfo(c_info.udid.decode('utf-8'), connection_type, address))
+        finally:
+            LIBIMOBILEDEVICE.idevice_device_list_extended_free(c_list)
+
+        if lookup is None:
+            return infos
+
+        allowed = set()
+        if lookup & DeviceLookup.IDEVICE_LOOKUP_USBMUX:
+            allowed.add(DeviceConnectionType.CONNECTION_USBMUXD)
+        if lookup & DeviceLookup.IDEVICE_LOOKUP_NETWORK:
+            allowed.add(DeviceConnectionType.CONNECTION_NETWORK)
+        prefer_network = bool(lookup & DeviceLookup.IDEVICE_LOOKUP_PREFER_NETWORK)
+
+        selected: Dict[str, DeviceInfo] = {}
+        for info in infos:
+            if info.connection_type not in allowed:
+                continue
+            current = selected.get(info.udid)
+            if current is None or (info.is_network == prefer_network and current.is_network != prefer_network):
+                selected[info.udid] = info
+        return list(selected.values())
+
+
+class DeviceEventType(Enum):
+    IDEVICE_DEVICE_ADD = 1
+    IDEVICE_DEVICE_REMOVE = 2
+    IDEVICE_DEVICE_PAIRED = 3
+
+
+class DeviceConnectionType(Enum):
+    CONNECTION_USBMUXD = 1
+    CONNECTION_NETWORK = 2
+
+
+class DeviceEvent(object):
+    __slots__ = ('event', 'udid', 'connection_type')
+
+    event: DeviceEventType
+    udid: str
+    connection_type: DeviceConnectionType
+
+    def __init__(self, event: DeviceEventType, udid: str, connection_type: DeviceConnectionType):
+        self.event = event
+        self.udid = udid
+        self.connection_type = connection_type
+
+    def __repr__(self):
+        return '<DeviceEvent: %s %s via %s>' % (self.event.name, self.udid, self.connection_type.name)
+
+
+class DeviceMonitor(object):
+    """Device add, remove and pair events from usbmuxd.
+
+    Events are delivered to the optional callback, to every blocking iterator
+    and to every async iterator over the monitor. Callbacks run on the
+    libimobiledevice event thread and must not block. devices holds the UDIDs
+    attached right now, seeded when the monitor starts.
+    """
+    _callback: Optional[Callable[[DeviceEvent], None]]
+    _c_callback: Optional[idevice_event_cb_t]
+    _c_context: c_void_p
+    _connections: Dict[str, Set[DeviceConnectionType]]
+    _queues: list
+    _lock: Lock
+
+    # Without idevice_events_subscribe the C library supports one subscriber per process
+    _legacy_subscriber: Optional['DeviceMonitor'] = None
+
+    def __init__(self, callback: Callable[[DeviceEvent], None] = None):
+        self._callback = callback
+        self._c_callback = None
+        self._c_context = c_void_p()
+        self._connections = {}
+        self._queues = []
+        self._lock = Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._c_callback is not None
+
+    @property
+    def devices(self) -> FrozenSet[str]:
+        with self._lock:
+            return frozenset(self._connections)
+
+    def connection_types(self, udid: str) -> FrozenSet[DeviceConnectionType]:
+        with self._lock:
+            return frozenset(self._connections.get(udid, ()))
+
+    def start(self):
+        if self.running:
+            return
+
+        with self._lock:
+            self._connections = {udid: set() for udid in Device.devices()}
+
+        callback = idevice_event_cb_t(self._on_event)
+        if hasattr(LIBIMOBILEDEVICE, 'idevice_events_subscribe'):
+            Device._handle_error(LIBIMOBILEDEVICE.idevice_events_subscribe(byref(self._c_context), callback, None))
+        else:
+            if DeviceMonitor._legacy_subscriber is not None:
+                raise RuntimeError("Only one DeviceMonitor can run with this libimobiledevice")
+            Device._handle_error(LIBIMOBILEDEVICE.idevice_event_subscribe(callback, None))
+            DeviceMonitor._legacy_subscriber = self
+        self._c_callback = callback
+
+    def stop(self):
+        if not self.running:
+            return
+
+        if self._c_context:
+            Device._handle_error(LIBIMOBILEDEVICE.idevice_events_unsubscribe(self._c_context))
+            self._c_context = c_void_p()
+        else:
+            Device._handle_error(LIBIMOBILEDEVICE.idevice_event_unsubscribe())
+            DeviceMonitor._legacy_subscriber = None
+        self._c_callback = None
+
+        with self._lock:
+            queues = list(self._queues)
+        for put, _ in queues:
+            put(None)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def __del__(self):
+        if self.running:
+            self.stop()
+
+    def _on_event(self, c_event, user_data):
+        event = DeviceEvent(DeviceEventType(c_event.contents.event),
+                            c_event.contents.udid.decode('utf-8'),
+                            DeviceConnectionType(c_event.contents.conn_type))
+
+        with self._lock:
+            if event.event == DeviceEventType.IDEVICE_DEVICE_REMOVE:
+                connections = self._connections.get(event.udid)
+                if connections is not None:
+                    connections.discard(event.connection_type)
+                    if not connections:
+                        del self._connections[event.udid]
+            else:
+                self._connections.setdefault(event.udid, set()).add(event.connection_type)
+            queues = list(self._queues)
+
+        if self._callback is not None:
+            self._callback(event)
+        for put, _ in queues:
+            put(event)
+
+    def _subscribe(self, put) -> tuple:
+        subscriber = (put, object())
+        with self._lock:
+            self._queues.append(subscriber)
+        return subscriber
+
+    def _unsubscribe(self, subscriber: tuple):
+        with self._lock:
+            self._queues.remove(subscriber)
+
+    def __iter__(self) -> Iterator[DeviceEvent]:
+        self.start()
+        events = Queue()
+        subscriber = self._subscribe(events.put)
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._unsubscribe(subscriber)
+
+    async def __aiter__(self) -> AsyncIterator[DeviceEvent]:
+        self.start()
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        subscriber = self._subscribe(lambda event: loop.call_soon_threadsafe(events.put_nowait, event))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._unsubscribe(subscriber)
@@ -1,8 +1,19 @@
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from ctypes import *
+from ctypes.util import find_library
 from platform import system
+from threading import Lock
 from typing import *
 from enum import *
-from libimobiledevice.util import parse_c_string_list
+from weakref import WeakValueDictionary
+from plist import bplist
+from plistlib import UID
+import errno
+import os
+import posixpath
+import shutil
+import sqlite3
 
 if "Darwin" in system():
     LIBIBACKUP = cdll.LoadLibrary('ibackup-1.0.dylib')
@@ -32,38 +43,360 @@ LIBIBACKUP.libibackup_free.argtypes = [c_void_p]
 LIBIBACKUP.libibackup_get_path_for_file_id.restype = c_char_p
 LIBIBACKUP.libibackup_get_path_for_file_id.argtypes = [c_void_p, c_char_p]
 
+# Lists handed out by libibackup are malloc'ed and owned by the caller
+LIBC = cdll.LoadLibrary(find_library('c'))
+LIBC.free.argtypes = [c_void_p]
+LIBC.free.restype = None
+
+_ENTRY_STRINGS = [BackupFileEntry.file_id.offset, BackupFileEntry.domain.offset,
+                  BackupFileEntry.relative_path.offset, BackupFileEntry.target.offset]
+
+
+def _free_file_entry(entry: POINTER(BackupFileEntry)):
+    address = addressof(entry.contents)
+    for offset in _ENTRY_STRINGS:
+        LIBC.free(c_void_p.from_address(address + offset).value)
+    LIBC.free(address)
+
 
 class FileMetadata(object):
     pass
 
 
+def _unarchive(objects: list, value: object) -> object:
+    """Resolve an NSKeyedArchiver value and everything it references through objects."""
+    if isinstance(value, UID):
+        value = objects[value.data]
+    if isinstance(value, list):
+        return [_unarchive(objects, item) for item in value]
+    if not isinstance(value, dict):
+        return None if value == '$null' else value
+
+    if 'NS.keys' in value:
+        return {_unarchive(objects, key): _unarchive(objects, item)
+                for key, item in zip(value['NS.keys'], value['NS.objects'])}
+    if 'NS.objects' in value:
+        return _unarchive(objects, value['NS.objects'])
+    for key in ('NS.data', 'NS.string', 'NS.bytes'):
+        if key in value:
+            return _unarchive(objects, value[key])
+    return {key: _unarchive(objects, item) for key, item in value.items() if key != '$class'}
+
+
 class FileEntry(object):
-    _file_id: str
-    _relative_path: Optional[str]
-    _domain: str
+    __slots__ = ('_file_id', '_relative_path', '_domain', '_type', '_target', '_metadata', '_blob', '_index')
+
+    # Strings are kept as the bytes libibackup returned until first accessed
+    _file_id: Union[bytes, str]
+    _relative_path: Union[bytes, str, None]
+    _domain: Union[bytes, str]
     _type: BackupItemType
-    _target: Optional[str]
+    _target: Union[bytes, str, None]
     _metadata: Optional[FileMetadata]
+    # The archived record, read from _index on first use so query results never hold it
+    _blob: Optional[bytes]
+    _index: Optional['BackupIndex']
 
     def __init__(self, file_entry: BackupFileEntry):
-        self._file_id = file_entry.file_id.decode('utf-8')
-        self._relative_path = file_entry.relative_path.decode('utf-8')
-        self._domain = file_entry.domain.decode('utf-8')
+        self._file_id = file_entry.file_id
+        self._relative_path = file_entry.relative_path
+        self._domain = file_entry.domain
         self._type = BackupItemType(file_entry.type)
+        self._target = file_entry.target
+        self._metadata = None
+        self._blob = None
+        self._index = None
 
+    @classmethod
+    def from_row(cls, row: tuple, index: 'BackupIndex' = None) -> 'FileEntry':
+        file_id, domain, relative_path, flags = row
+        entry = cls.__new__(cls)
+        entry._file_id = file_id
+        entry._domain = domain
+        entry._relative_path = relative_path
+        entry._type = BackupItemType(flags)
+        entry._target = None
+        entry._metadata = None
+        entry._blob = None
+        entry._index = index
+        return entry
 
     @property
     def file_id(self) -> str:
+        if isinstance(self._file_id, bytes):
+            self._file_id = self._file_id.decode('utf-8')
         return self._file_id
 
     @property
     def relative_path(self) -> str:
+        if isinstance(self._relative_path, bytes):
+            self._relative_path = self._relative_path.decode('utf-8')
         return self._relative_path
 
+    @property
+    def domain(self) -> str:
+        if isinstance(self._domain, bytes):
+            self._domain = self._domain.decode('utf-8')
+        return self._domain
+
+    @property
+    def target(self) -> Optional[str]:
+        if self._target is None and self._record():
+            # Manifest.db rows only carry the target inside the archived record
+            self._target = self.properties.get('Target')
+        if isinstance(self._target, bytes):
+            self._target = self._target.decode('utf-8')
+        return self._target
+
+    @property
+    def type(self) -> BackupItemType:
+        return self._type
+
+    @property
+    def properties(self) -> dict:
+        """The MBFile record archived in Manifest.db, or an empty dict when it is not available."""
+        blob = self._record()
+        if not blob:
+            return {}
+        archive = bplist.loads(blob)
+        return _unarchive(archive['$objects'], archive['$top']['root'])
+
+    @property
+    def size(self) -> int:
+        return self.properties.get('Size', 0)
+
+    def _record(self) -> Optional[bytes]:
+        if self._blob is None and self._index is not None:
+            self._blob = self._index._record(self.file_id) or b''
+        return self._blob
+
+    def __repr__(self):
+        return '<FileEntry: %s-%s>' % (self.domain, self.relative_path)
+
+
+BACKUP_INDEX_CACHE_SIZE = 32
+BACKUP_INDEX_CACHE_MAX_ROWS = 100000
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """The smallest string above every string starting with prefix, None if there is none."""
+    stripped = prefix.rstrip(chr(0x10FFFF))
+    if not stripped:
+        return None
+    following = ord(stripped[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Surrogates cannot be stored as UTF-8 text, and nothing sorts between them and U+E000
+        following = 0xE000
+    return stripped[:-1] + chr(following)
+
+
+class BackupIndex(object):
+    """Read-only queries over a backup's Manifest.db.
+
+    Query results are kept in a small LRU cache that is dropped whenever the
+    manifest's mtime changes. The archived records are left out of cached
+    rows and read per entry when first needed. Use BackupIndex.open() to share
+    one index per backup directory while anything still uses it.
+    """
+    _path: str
+    _manifest: str
+    _connection: Optional[sqlite3.Connection]
+    _mtime: Optional[int]
+    _cache: OrderedDict
+    _lock: Lock
+
+    _instances: 'WeakValueDictionary[str, BackupIndex]' = WeakValueDictionary()
+    _instances_lock = Lock()
+
+    def __init__(self, path: str):
+        self._path = path
+        self._manifest = os.path.join(path, 'Manifest.db')
+        self._connection = None
+        self._mtime = None
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    @classmethod
+    def open(cls, path: str) -> 'BackupIndex':
+        path = os.path.abspath(path)
+        with cls._instances_lock:
+            index = cls._instances.get(path)
+            if index is None:
+                index = cls(path)
+                cls._instances[path] = index
+            return index
+
+    def close(self):
+        with self._instances_lock:
+            if self._instances.get(self._path) is self:
+                del self._instances[self._path]
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+            self._mtime = None
+            self._cache.clear()
+
+    def _refresh(self) -> sqlite3.Connection:
+        mtime = os.stat(self._manifest).st_mtime_ns
+        with self._lock:
+            if self._connection is None or mtime != self._mtime:
+                # Queries still iterating keep the previous connection alive until they finish
+                uri = 'file:%s?mode=ro' % self._manifest.replace('?', '%3f').replace('#', '%23')
+                self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._mtime = mtime
+                self._cache.clear()
+            return self._connection
+
+    def _query(self, sql: str, parameters: tuple = ()) -> Iterator[tuple]:
+        connection = self._refresh()
+        key = (sql, parameters)
+        with self._lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+        if rows is not None:
+            yield from rows
+            return
+
+        cursor = self._execute(connection, sql, parameters)
+
+        rows = []
+        for row in cursor:
+            if rows is not None:
+                rows.append(row)
+                if len(rows) > BACKUP_INDEX_CACHE_MAX_ROWS:
+                    rows = None
+            yield row
+
+        if rows is not None:
+            with self._lock:
+                self._cache[key] = rows
+                while len(self._cache) > BACKUP_INDEX_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+    @staticmethod
+    def _execute(connection: sqlite3.Connection, sql: str, parameters: tuple) -> sqlite3.Cursor:
+        try:
+            return connection.execute(sql, parameters)
+        except sqlite3.DatabaseError as e:
+            raise RuntimeError("Manifest.db could not be read, the backup may be encrypted") from e
+
+    def _record(self, file_id: str) -> Optional[bytes]:
+        # Never cached, a record can be far larger than the rest of its row
+        row = self._execute(self._refresh(), 'SELECT file FROM Files WHERE fileID = ?', (file_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def domains(self) -> List[str]:
+        return [row[0] for row in self._query('SELECT DISTINCT domain FROM Files ORDER BY domain')]
+
+    def files(self, domain: str = None, prefix: str = None, pattern: str = None,
+              file_type: BackupItemType = None) -> Iterator[FileEntry]:
+        """Stream the entries matching every given filter.
+
+        prefix matches the start of the relative path and pattern is a
+        case-sensitive glob over it, e.g. '*.jpg' or 'Library/SMS/*'.
+        """
+        clauses = []
+        parameters = []
+        if domain is not None:
+            clauses.append('domain = ?')
+            parameters.append(domain)
+        if prefix:
+            clauses.append('relativePath >= ?')
+            parameters.append(prefix)
+            upper_bound = _prefix_upper_bound(prefix)
+            if upper_bound is not None:
+                clauses.append('relativePath < ?')
+                parameters.append(upper_bound)
+        if pattern is not None:
+            clauses.append('relativePath GLOB ?')
+            parameters.append(pattern)
+        if file_type is not None:
+            clauses.append('flags = ?')
+            parameters.append(BackupItemType(file_type).value)
+
+        sql = 'SELECT fileID, domain, relativePath, flags FROM Files'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY domain, relativePath'
+
+        for row in self._query(sql, tuple(parameters)):
+            yield FileEntry.from_row(row, self)
+
+    def by_id(self, file_id: str) -> Optional[FileEntry]:
+        for row in self._query('SELECT fileID, domain, relativePath, flags FROM Files WHERE fileID = ?', (file_id,)):
+            return FileEntry.from_row(row, self)
+        return None
+
+    def path_for_id(self, file_id: str) -> str:
+        return os.path.join(self._path, file_id[:2], file_id)
+
+
+BACKUP_EXTRACT_WORKERS = 8
+BACKUP_COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class ExtractReport(object):
+    files: int
+    directories: int
+    symlinks: int
+    bytes_copied: int
+    errors: List[Tuple[FileEntry, BaseException]]
+
+    def __init__(self):
+        self.files = 0
+        self.directories = 0
+        self.symlinks = 0
+        self.bytes_copied = 0
+        self.errors = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __repr__(self):
+        return '<ExtractReport: %d files, %d directories, %d symlinks, %d bytes, %d errors>' % (
+            self.files, self.directories, self.symlinks, self.bytes_copied, len(self.errors))
+
+
+def _copy_file(source: str, destination: str, hardlink: bool) -> int:
+    if hardlink:
+        try:
+            os.link(source, destination)
+            return 0
+        except FileExistsError:
+            os.remove(destination)
+            os.link(source, destination)
+            return 0
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            try:
+                total = 0
+                while True:
+                    copied = copy_file_range(src.fileno(), dst.fileno(), BACKUP_COPY_CHUNK_SIZE)
+                    if not copied:
+                        return total
+                    total += copied
+            except OSError as e:
+                # Filesystems without copy_file_range support, or across devices on older kernels
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+
+    # shutil picks sendfile on Linux and fcopyfile on macOS
+    shutil.copyfile(source, destination)
+    return os.path.getsize(destination)
+
 
 class LocalBackup(object):
     _path: str
     _client: c_void_p
+    _index: Optional[BackupIndex] = None
 
     def __init__(self, path: str):
         if LIBIBACKUP.libibackup_preflight_backup(path.encode('utf-8')):
@@ -74,26 +407,136 @@ class LocalBackup(object):
             raise RuntimeError
 
     def domains(self) -> list:
-        domains = pointer(c_char_p())
+        return list(self.iter_domains())
 
-        LIBIBACKUP.libibackup_list_domains(self._client, byref(domains))
+    def files_in_domain(self, domain: str) -> list:
+        return list(self.iter_files(domain))
 
-        return parse_c_string_list(domains)
+    def iter_domains(self) -> Iterator[str]:
+        c_domains = POINTER(c_char_p)()
+        LIBIBACKUP.libibackup_list_domains(self._client, byref(c_domains))
+        if not c_domains:
+            return
 
-    def files_in_domain(self, domain: str) -> list:
-        result = []
-        files = pointer(pointer(BackupFileEntry()))
+        # The same list viewed as raw pointers, so each string can be freed
+        domains = POINTER(c_void_p).from_buffer(c_domains)
+
+        index = 0
+        try:
+            while domains[index]:
+                yield string_at(domains[index]).decode('utf-8')
+                LIBC.free(domains[index])
+                index += 1
+        finally:
+            # Also reached when the caller stops early, so the rest of the list is released too
+            while domains[index]:
+                LIBC.free(domains[index])
+                index += 1
+            LIBC.free(domains)
+
+    def iter_files(self, domain: str = None) -> Iterator[FileEntry]:
+        """Yield every entry of domain, or of all domains, freeing the C entries as they are decoded."""
+        if domain is None:
+            for name in self.domains():
+                yield from self.iter_files(name)
+            return
 
+        files = POINTER(POINTER(BackupFileEntry))()
         LIBIBACKUP.libibackup_list_files_for_domain(self._client, domain.encode('utf-8'), byref(files))
+        if not files:
+            return
 
         index = 0
-        file = files[index]
-        while file:
-            result.append(FileEntry(file.contents))
-            index += 1
-            file = files[index]
+        try:
+            while files[index]:
+                entry = FileEntry(files[index].contents)
+                _free_file_entry(files[index])
+                index += 1
+                yield entry
+        finally:
+            while files[index]:
+                _free_file_entry(files[index])
+                index += 1
+            LIBC.free(files)
+
+    @property
+    def index(self) -> BackupIndex:
+        # Held here, the shared index is only released once no backup or entry uses it
+        if self._index is None:
+            self._index = BackupIndex.open(self._path)
+        return self._index
+
+    def find(self, domain: str = None, prefix: str = None, pattern: str = None,
+             file_type: BackupItemType = None) -> Iterator[FileEntry]:
+        return self.index.files(domain, prefix, pattern, file_type)
+
+    def extract(self, query: Iterable[FileEntry] = None, dest: str = '.', workers: int = BACKUP_EXTRACT_WORKERS,
+                hardlink: bool = False) -> ExtractReport:
+        """Restore entries as dest/domain/relative_path, copying files on a thread pool.
+
+        query is any iterable of entries, such as find() or iter_files(), and
+        defaults to the whole backup. With hardlink, files are linked instead
+        of copied wherever dest is on the same filesystem as the backup.
+        """
+        if query is None:
+            query = self.iter_files()
+
+        report = ExtractReport()
+        root = os.path.abspath(dest)
+
+        def destination_of(entry: FileEntry) -> str:
+            relative = posixpath.normpath(posixpath.join(entry.domain, entry.relative_path or ''))
+            if relative.startswith('../') or relative == '..' or posixpath.isabs(relative):
+                raise ValueError("Entry escapes the extraction directory: %r" % entry)
+            return os.path.join(root, *relative.split('/'))
+
+        def restore(entry: FileEntry, destination: str) -> int:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            source = os.path.join(self._path, entry.file_id[:2], entry.file_id)
+            if not os.path.exists(source):
+                # Backups from before iOS 10 keep every file at the top level
+                source = os.path.join(self._path, entry.file_id)
+            return _copy_file(source, destination, hardlink)
+
+        def collect(done):
+            for future in done:
+                entry = futures.pop(future)
+                try:
+                    report.bytes_copied += future.result()
+                    report.files += 1
+                except OSError as e:
+                    report.errors.append((entry, e))
+
+        futures = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for entry in query:
+                try:
+                    destination = destination_of(entry)
+                    if entry.type == BackupItemType.DIRECTORY:
+                        os.makedirs(destination, exist_ok=True)
+                        report.directories += 1
+                    elif entry.type == BackupItemType.SYMBOLIC_LINK:
+                        target = entry.target
+                        if not target:
+                            raise ValueError("Symbolic link has no target: %r" % entry)
+                        os.makedirs(os.path.dirname(destination), exist_ok=True)
+                        if os.path.lexists(destination):
+                            os.remove(destination)
+                        os.symlink(target, destination)
+                        report.symlinks += 1
+                    else:
+                        futures[executor.submit(restore, entry, destination)] = entry
+                except (OSError, ValueError) as e:
+                    report.errors.append((entry, e))
+
+                # Keep the queue bounded so whole-backup queries are not materialized up front
+                if len(futures) >= workers * 4:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+            collect(list(futures))
 
-        return result
+        return report
 
     def get_path_by_id(self, file_id: str) -> str:
         file_id_string = create_string_buffer(file_id.encode('utf-8'))
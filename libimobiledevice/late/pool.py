@@ -0,0 +1,238 @@
+"""Process-wide cache of device handles and started service clients."""
+
+import time
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import *
+
+from libimobiledevice import BaseError
+from libimobiledevice.device import Device
+
+
+DEVICE_POOL_MAX_IDLE = 300.0
+DEVICE_POOL_MAX_SESSIONS = 4
+
+
+def _afc_healthy(client) -> bool:
+    # get_device_info() is a flat key/value list, a live connection always reports the model
+    return 'Model' in client.get_device_info()[::2]
+
+
+_HEALTH_CHECKS: Dict[str, Callable[[object], bool]] = {
+    'com.apple.afc': _afc_healthy,
+}
+
+
+def register_health_check(service_name: str, check: Callable[[object], bool]):
+    """Register how idle clients of service_name are verified before being handed out again."""
+    _HEALTH_CHECKS[service_name] = check
+
+
+class DevicePoolMetrics(object):
+    hits: int
+    misses: int
+    reconnects: int
+    evictions: int
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.evictions = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'reconnects': self.reconnects,
+            'evictions': self.evictions,
+        }
+
+    def __repr__(self):
+        return '<DevicePoolMetrics: %d hits, %d misses, %d reconnects, %d evictions>' % (
+            self.hits, self.misses, self.reconnects, self.evictions)
+
+
+class _PooledClient(object):
+    __slots__ = ('client', 'last_used')
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class _DeviceEntry(object):
+    device: Device
+    sessions: BoundedSemaphore
+    idle: Dict[str, List[_PooledClient]]
+    active: int
+    last_used: float
+
+    def __init__(self, device: Device, max_sessions: int):
+        self.device = device
+        self.sessions = BoundedSemaphore(max_sessions)
+        self.idle = {}
+        self.active = 0
+        self.last_used = time.monotonic()
+
+
+def _close_client(client):
+    close = getattr(client, 'close', None)
+    if close is not None:
+        try:
+            close()
+        except BaseError:
+            pass
+
+
+class DevicePool(object):
+    """Keeps Device handles and service clients alive between uses.
+
+    Clients are checked out per (udid, service) with at most max_sessions
+    checked out per device at once. Idle clients are health checked before
+    reuse and closed once unused for longer than max_idle seconds.
+    """
+    max_idle: float
+    max_sessions: int
+    metrics: DevicePoolMetrics
+    _devices: Dict[str, _DeviceEntry]
+    _lock: Lock
+
+    def __init__(self, max_idle: float = DEVICE_POOL_MAX_IDLE, max_sessions: int = DEVICE_POOL_MAX_SESSIONS):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+
+        self.max_idle = max_idle
+        self.max_sessions = max_sessions
+        self.metrics = DevicePoolMetrics()
+        self._devices = {}
+        self._lock = Lock()
+
+    def _entry(self, udid: str) -> _DeviceEntry:
+        with self._lock:
+            entry = self._devices.get(udid)
+        if entry is None:
+            # Opened outside the lock so a slow device does not hold up checkouts for the others
+            entry = _DeviceEntry(Device(udid), self.max_sessions)
+
+        with self._lock:
+            entry = self._devices.setdefault(udid, entry)
+            entry.last_used = time.monotonic()
+            return entry
+
+    def device(self, udid: str) -> Device:
+        return self._entry(udid).device
+
+    @contextmanager
+    def checkout(self, udid: str, service_class: type, timeout: float = None):
+        """Yield a started service_class client for the device udid and return it to the pool afterwards.
+
+        Blocks while max_sessions clients are already checked out for the device
+        and raises TimeoutError if none frees up within timeout seconds. A client
+        whose use raised any exception, or whose device was evicted meanwhile, is
+        closed instead of returned.
+        """
+        entry = self._entry(udid)
+        if not entry.sessions.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError("No free session for device %s" % udid)
+
+        service_name = service_class.__service_name__ or service_class.__name__
+        try:
+            client = self._acquire(entry, service_name, service_class)
+            with self._lock:
+                entry.active += 1
+            try:
+                yield client
+            except BaseException:
+                _close_client(client)
+                raise
+            else:
+                with self._lock:
+                    # Evicted or closed while checked out, an orphaned entry would never close it
+                    pooled = self._devices.get(udid) is entry
+                    if pooled:
+                        entry.idle.setdefault(service_name, []).append(_PooledClient(client))
+                if not pooled:
+                    _close_client(client)
+            finally:
+                with self._lock:
+                    entry.active -= 1
+                    entry.last_used = time.monotonic()
+        finally:
+            entry.sessions.release()
+            self.evict_idle()
+
+    def _acquire(self, entry: _DeviceEntry, service_name: str, service_class: type):
+        check = _HEALTH_CHECKS.get(service_name)
+        while True:
+            with self._lock:
+                idle = entry.idle.get(service_name)
+                pooled = idle.pop() if idle else None
+                if pooled is None:
+                    self.metrics.misses += 1
+
+            if pooled is None:
+                return service_class(device=entry.device)
+
+            healthy = check is None or self._healthy(check, pooled.client)
+            with self._lock:
+                if healthy:
+                    self.metrics.hits += 1
+                else:
+                    self.metrics.reconnects += 1
+            if healthy:
+                return pooled.client
+
+            _close_client(pooled.client)
+
+    @staticmethod
+    def _healthy(check: Callable[[object], bool], client) -> bool:
+        try:
+            return bool(check(client))
+        except BaseError:
+            return False
+
+    def evict_idle(self, max_idle: float = None) -> int:
+        """Close clients and drop devices unused for longer than max_idle seconds, returning the count closed."""
+        max_idle = self.max_idle if max_idle is None else max_idle
+        cutoff = time.monotonic() - max_idle
+        expired = []
+
+        with self._lock:
+            for udid, entry in list(self._devices.items()):
+                for service_name, idle in list(entry.idle.items()):
+                    keep = [pooled for pooled in idle if pooled.last_used >= cutoff]
+                    expired.extend(pooled.client for pooled in idle if pooled.last_used < cutoff)
+                    if keep:
+                        entry.idle[service_name] = keep
+                    else:
+                        del entry.idle[service_name]
+                if not entry.idle and not entry.active and entry.last_used < cutoff:
+                    del self._devices[udid]
+
+            self.metrics.evictions += len(expired)
+
+        for client in expired:
+            _close_client(client)
+        return len(expired)
+
+    def close(self):
+        self.evict_idle(max_idle=-1.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+_default_pool: Optional[DevicePool] = None
+_default_pool_lock = Lock()
+
+
+def default_pool() -> DevicePool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DevicePool()
+        return _default_pool
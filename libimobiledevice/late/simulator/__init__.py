@@ -0,0 +1,5 @@
+"""A local usbmuxd, lockdown and AFC stand-in for running and benchmarking without a device."""
+
+from .filesystem import DirectoryFilesystem, MemoryFilesystem
+from .server import USBMUXD_SOCKET_ADDRESS_ENV, SimulatedDevice, Simulator
+from .transport import LinkShaper
@@ -0,0 +1,38 @@
+import argparse
+import signal
+import sys
+
+from .filesystem import DirectoryFilesystem
+from .server import USBMUXD_SOCKET_ADDRESS_ENV, Simulator
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog='python -m libimobiledevice.simulator',
+                                     description='Serve simulated devices over a usbmuxd socket.')
+    parser.add_argument('--socket', help='UNIX socket path, a temporary one by default')
+    parser.add_argument('--udid', action='append', default=[], help='UDID of a device to attach, repeatable')
+    parser.add_argument('--root', help='back the device filesystems with this directory instead of memory')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='delay added to every message')
+    parser.add_argument('--bandwidth', type=float, help='link bandwidth in bytes per second')
+    args = parser.parse_args(argv)
+
+    simulator = Simulator(args.socket, args.latency_ms / 1000.0, args.bandwidth)
+    for udid in args.udid or [None]:
+        filesystem = None
+        if args.root is not None:
+            filesystem = DirectoryFilesystem(args.root if len(args.udid) < 2 else '%s/%s' % (args.root, udid))
+        device = simulator.add_device(udid, filesystem)
+        print('attached %s' % device.udid, file=sys.stderr)
+
+    with simulator:
+        print('export %s=%s' % (USBMUXD_SOCKET_ADDRESS_ENV, simulator.address))
+        sys.stdout.flush()
+        try:
+            signal.pause()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
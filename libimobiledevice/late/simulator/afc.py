@@ -0,0 +1,235 @@
+import errno
+import socket
+import struct
+from typing import *
+
+from .transport import LinkShaper, recv_exact
+
+
+AFC_SERVICE_NAME = 'com.apple.afc'
+AFC_MAGIC = b'CFA6LPAA'
+AFC_HEADER = struct.Struct('<8sQQQQ')
+
+AFC_OP_STATUS = 0x01
+AFC_OP_DATA = 0x02
+AFC_OP_READ_DIR = 0x03
+AFC_OP_TRUNCATE = 0x07
+AFC_OP_REMOVE_PATH = 0x08
+AFC_OP_MAKE_DIR = 0x09
+AFC_OP_GET_FILE_INFO = 0x0A
+AFC_OP_GET_DEVINFO = 0x0B
+AFC_OP_FILE_OPEN = 0x0D
+AFC_OP_FILE_OPEN_RES = 0x0E
+AFC_OP_FILE_READ = 0x0F
+AFC_OP_FILE_WRITE = 0x10
+AFC_OP_FILE_SEEK = 0x11
+AFC_OP_FILE_TELL = 0x12
+AFC_OP_FILE_TELL_RES = 0x13
+AFC_OP_FILE_CLOSE = 0x14
+AFC_OP_FILE_SET_SIZE = 0x15
+AFC_OP_RENAME_PATH = 0x18
+AFC_OP_FILE_LOCK = 0x1B
+AFC_OP_MAKE_LINK = 0x1C
+AFC_OP_SET_FILE_MOD_TIME = 0x1E
+AFC_OP_REMOVE_PATH_AND_CONTENTS = 0x22
+
+AFC_E_SUCCESS = 0
+AFC_E_UNKNOWN_ERROR = 1
+AFC_E_INVALID_ARG = 7
+AFC_E_OBJECT_NOT_FOUND = 8
+AFC_E_OBJECT_IS_DIR = 9
+AFC_E_PERM_DENIED = 10
+AFC_E_OP_NOT_SUPPORTED = 15
+AFC_E_OBJECT_EXISTS = 16
+AFC_E_NO_SPACE_LEFT = 18
+AFC_E_IO_ERROR = 20
+AFC_E_DIR_NOT_EMPTY = 33
+
+_ERRNO_TO_AFC = {
+    errno.ENOENT: AFC_E_OBJECT_NOT_FOUND,
+    errno.ENOTDIR: AFC_E_OBJECT_NOT_FOUND,
+    errno.EISDIR: AFC_E_OBJECT_IS_DIR,
+    errno.EEXIST: AFC_E_OBJECT_EXISTS,
+    errno.ENOTEMPTY: AFC_E_DIR_NOT_EMPTY,
+    errno.EACCES: AFC_E_PERM_DENIED,
+    errno.EPERM: AFC_E_PERM_DENIED,
+    errno.ENOSPC: AFC_E_NO_SPACE_LEFT,
+    errno.EINVAL: AFC_E_INVALID_ARG,
+}
+
+_U64 = struct.Struct('<Q')
+_U64_PAIR = struct.Struct('<QQ')
+_SEEK = struct.Struct('<QQq')
+
+
+def _c_strings(data: bytes) -> List[str]:
+    return [part.decode('utf-8') for part in data.split(b'\0')[:-1]]
+
+
+def _encode_strings(values: Iterable[str]) -> bytes:
+    return b''.join(value.encode('utf-8') + b'\0' for value in values)
+
+
+def _encode_dict(values: Dict[str, str]) -> bytes:
+    return _encode_strings(item for pair in values.items() for item in pair)
+
+
+class AfcSession(object):
+    """Serves the AFC packet protocol on one connection against a device filesystem."""
+    _sock: socket.socket
+    _shaper: LinkShaper
+    _handles: Dict[int, object]
+    _next_handle: int
+
+    def __init__(self, simulator, device, sock: socket.socket):
+        self._filesystem = device.filesystem
+        self._sock = sock
+        self._shaper = simulator.shaper
+        self._handles = {}
+        self._next_handle = 1
+        self._operations = {
+            AFC_OP_READ_DIR: self._read_dir,
+            AFC_OP_GET_FILE_INFO: self._get_file_info,
+            AFC_OP_GET_DEVINFO: self._get_device_info,
+            AFC_OP_FILE_OPEN: self._file_open,
+            AFC_OP_FILE_READ: self._file_read,
+            AFC_OP_FILE_WRITE: self._file_write,
+            AFC_OP_FILE_SEEK: self._file_seek,
+            AFC_OP_FILE_TELL: self._file_tell,
+            AFC_OP_FILE_CLOSE: self._file_close,
+            AFC_OP_FILE_SET_SIZE: self._file_set_size,
+            AFC_OP_FILE_LOCK: self._file_lock,
+            AFC_OP_REMOVE_PATH: self._remove_path,
+            AFC_OP_REMOVE_PATH_AND_CONTENTS: self._remove_path_and_contents,
+            AFC_OP_MAKE_DIR: self._make_dir,
+            AFC_OP_RENAME_PATH: self._rename_path,
+            AFC_OP_TRUNCATE: self._truncate,
+            AFC_OP_MAKE_LINK: self._make_link,
+            AFC_OP_SET_FILE_MOD_TIME: self._set_file_mod_time,
+        }
+
+    def run(self):
+        try:
+            while True:
+                header = recv_exact(self._sock, AFC_HEADER.size)
+                if header is None:
+                    return
+                magic, entire_length, this_length, packet_num, operation = AFC_HEADER.unpack(header)
+                if magic != AFC_MAGIC or this_length < AFC_HEADER.size or entire_length < this_length:
+                    return
+
+                params = recv_exact(self._sock, this_length - AFC_HEADER.size) or b''
+                payload = recv_exact(self._sock, entire_length - this_length) or b''
+                self._send(packet_num, *self._dispatch(operation, params, payload))
+        finally:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+    def _dispatch(self, operation: int, params: bytes, payload: bytes) -> Tuple[int, bytes, bytes]:
+        handler = self._operations.get(operation)
+        if handler is None:
+            return self._status(AFC_E_OP_NOT_SUPPORTED)
+        try:
+            return handler(params, payload)
+        except OSError as e:
+            return self._status(_ERRNO_TO_AFC.get(e.errno, AFC_E_IO_ERROR))
+        except (KeyError, IndexError, ValueError, struct.error):
+            return self._status(AFC_E_INVALID_ARG)
+
+    def _send(self, packet_num: int, operation: int, params: bytes, payload: bytes):
+        this_length = AFC_HEADER.size + len(params)
+        header = AFC_HEADER.pack(AFC_MAGIC, this_length + len(payload), this_length, packet_num, operation)
+        self._shaper.send(self._sock, header + params + payload)
+
+    @staticmethod
+    def _status(code: int = AFC_E_SUCCESS) -> Tuple[int, bytes, bytes]:
+        return AFC_OP_STATUS, _U64.pack(code), b''
+
+    @staticmethod
+    def _data(data: bytes) -> Tuple[int, bytes, bytes]:
+        return AFC_OP_DATA, b'', data
+
+    def _read_dir(self, params: bytes, payload: bytes):
+        return self._data(_encode_strings(self._filesystem.listdir(_c_strings(params)[0])))
+
+    def _get_file_info(self, params: bytes, payload: bytes):
+        return self._data(_encode_dict(self._filesystem.stat(_c_strings(params)[0])))
+
+    def _get_device_info(self, params: bytes, payload: bytes):
+        return self._data(_encode_dict(self._filesystem.device_info()))
+
+    def _file_open(self, params: bytes, payload: bytes):
+        mode, = _U64.unpack_from(params)
+        handle = self._filesystem.open(_c_strings(params[_U64.size:])[0], mode)
+        number = self._next_handle
+        self._next_handle += 1
+        self._handles[number] = handle
+        return AFC_OP_FILE_OPEN_RES, _U64.pack(number), b''
+
+    def _file_read(self, params: bytes, payload: bytes):
+        number, length = _U64_PAIR.unpack_from(params)
+        return self._data(self._handles[number].read(length))
+
+    def _file_write(self, params: bytes, payload: bytes):
+        number, = _U64.unpack_from(params)
+        self._handles[number].write(payload)
+        return self._status()
+
+    def _file_seek(self, params: bytes, payload: bytes):
+        number, whence, offset = _SEEK.unpack_from(params)
+        self._handles[number].seek(offset, whence)
+        return self._status()
+
+    def _file_tell(self, params: bytes, payload: bytes):
+        number, = _U64.unpack_from(params)
+        return AFC_OP_FILE_TELL_RES, _U64.pack(self._handles[number].tell()), b''
+
+    def _file_close(self, params: bytes, payload: bytes):
+        number, = _U64.unpack_from(params)
+        self._handles.pop(number).close()
+        return self._status()
+
+    def _file_set_size(self, params: bytes, payload: bytes):
+        number, size = _U64_PAIR.unpack_from(params)
+        self._handles[number].truncate(size)
+        return self._status()
+
+    def _file_lock(self, params: bytes, payload: bytes):
+        number, _ = _U64_PAIR.unpack_from(params)
+        if number not in self._handles:
+            raise KeyError(number)
+        return self._status()
+
+    def _remove_path(self, params: bytes, payload: bytes):
+        self._filesystem.remove(_c_strings(params)[0])
+        return self._status()
+
+    def _remove_path_and_contents(self, params: bytes, payload: bytes):
+        self._filesystem.remove_tree(_c_strings(params)[0])
+        return self._status()
+
+    def _make_dir(self, params: bytes, payload: bytes):
+        self._filesystem.mkdir(_c_strings(params)[0])
+        return self._status()
+
+    def _rename_path(self, params: bytes, payload: bytes):
+        source, destination = _c_strings(params)[:2]
+        self._filesystem.rename(source, destination)
+        return self._status()
+
+    def _truncate(self, params: bytes, payload: bytes):
+        size, = _U64.unpack_from(params)
+        self._filesystem.truncate(_c_strings(params[_U64.size:])[0], size)
+        return self._status()
+
+    def _make_link(self, params: bytes, payload: bytes):
+        kind, = _U64.unpack_from(params)
+        target, name = _c_strings(params[_U64.size:])[:2]
+        self._filesystem.link(kind, target, name)
+        return self._status()
+
+    def _set_file_mod_time(self, params: bytes, payload: bytes):
+        mtime_ns, = _U64.unpack_from(params)
+        self._filesystem.set_mtime(_c_strings(params[_U64.size:])[0], mtime_ns)
+        return self._status()
@@ -0,0 +1,375 @@
+import errno
+import os
+import posixpath
+import shutil
+import time
+from io import SEEK_CUR, SEEK_END, SEEK_SET
+from threading import RLock
+from typing import *
+
+
+# AFC file open modes
+AFC_FOPEN_RDONLY = 1
+AFC_FOPEN_RW = 2
+AFC_FOPEN_WRONLY = 3
+AFC_FOPEN_WR = 4
+AFC_FOPEN_APPEND = 5
+AFC_FOPEN_RDAPPEND = 6
+
+AFC_HARDLINK = 1
+AFC_SYMLINK = 2
+
+BLOCK_SIZE = 4096
+
+
+def _os_error(code: int, path: str) -> OSError:
+    return OSError(code, os.strerror(code), path)
+
+
+def _normalize(path: str) -> str:
+    return posixpath.normpath('/' + path.lstrip('/'))
+
+
+class _MemoryNode(object):
+    __slots__ = ('kind', 'children', 'data', 'target', 'mtime_ns', 'birthtime_ns')
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.children = {} if kind == 'S_IFDIR' else None
+        self.data = bytearray() if kind == 'S_IFREG' else None
+        self.target = None
+        self.mtime_ns = self.birthtime_ns = time.time_ns()
+
+
+class _MemoryHandle(object):
+    _node: _MemoryNode
+    _position: int
+    _append: bool
+    _lock: RLock
+
+    def __init__(self, node: _MemoryNode, append: bool, lock: RLock):
+        self._node = node
+        self._position = 0
+        self._append = append
+        self._lock = lock
+
+    def read(self, size: int) -> bytes:
+        with self._lock:
+            data = bytes(self._node.data[self._position:self._position + size])
+            self._position += len(data)
+            return data
+
+    def write(self, data: bytes) -> int:
+        with self._lock:
+            buffer = self._node.data
+            if self._append:
+                self._position = len(buffer)
+            end = self._position + len(data)
+            if self._position > len(buffer):
+                buffer.extend(bytes(self._position - len(buffer)))
+            buffer[self._position:end] = data
+            self._position = end
+            self._node.mtime_ns = time.time_ns()
+            return len(data)
+
+    def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+        with self._lock:
+            if whence == SEEK_CUR:
+                offset += self._position
+            elif whence == SEEK_END:
+                offset += len(self._node.data)
+            if offset < 0:
+                raise _os_error(errno.EINVAL, '')
+            self._position = offset
+            return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def truncate(self, size: int):
+        with self._lock:
+            buffer = self._node.data
+            if size < len(buffer):
+                del buffer[size:]
+            else:
+                buffer.extend(bytes(size - len(buffer)))
+            self._node.mtime_ns = time.time_ns()
+
+    def close(self):
+        pass
+
+
+class MemoryFilesystem(object):
+    """A device filesystem held entirely in memory."""
+    _root: _MemoryNode
+    _lock: RLock
+
+    def __init__(self, total_bytes: int = 64 << 30):
+        self._root = _MemoryNode('S_IFDIR')
+        self._lock = RLock()
+        self.total_bytes = total_bytes
+
+    def _lookup(self, path: str, follow: bool = True) -> _MemoryNode:
+        node = self._root
+        parts = [part for part in _normalize(path).split('/') if part]
+        for index, part in enumerate(parts):
+            if node.kind != 'S_IFDIR':
+                raise _os_error(errno.ENOTDIR, path)
+            node = node.children.get(part)
+            if node is None:
+                raise _os_error(errno.ENOENT, path)
+            if node.kind == 'S_IFLNK' and (follow or index < len(parts) - 1):
+                target = node.target
+                if not target.startswith('/'):
+                    target = posixpath.join('/', *parts[:index], target)
+                node = self._lookup(target, follow)
+        return node
+
+    def _parent(self, path: str) -> Tuple[_MemoryNode, str]:
+        path = _normalize(path)
+        name = posixpath.basename(path)
+        if not name:
+            raise _os_error(errno.EPERM, path)
+        parent = self._lookup(posixpath.dirname(path))
+        if parent.kind != 'S_IFDIR':
+            raise _os_error(errno.ENOTDIR, path)
+        return parent, name
+
+    def _size(self, node: _MemoryNode) -> int:
+        if node.kind == 'S_IFREG':
+            return len(node.data)
+        if node.kind == 'S_IFLNK':
+            return len(node.target.encode('utf-8'))
+        return sum(self._size(child) for child in node.children.values())
+
+    def listdir(self, path: str) -> List[str]:
+        with self._lock:
+            node = self._lookup(path)
+            if node.kind != 'S_IFDIR':
+                raise _os_error(errno.ENOTDIR, path)
+            return ['.', '..'] + sorted(node.children)
+
+    def stat(self, path: str) -> Dict[str, str]:
+        with self._lock:
+            node = self._lookup(path, follow=False)
+            if node.kind == 'S_IFDIR':
+                size = 68 + 34 * len(node.children)
+                nlink = 2 + sum(1 for child in node.children.values() if child.kind == 'S_IFDIR')
+            elif node.kind == 'S_IFREG':
+                size = len(node.data)
+                nlink = 1
+            else:
+                size = len(node.target.encode('utf-8'))
+                nlink = 1
+
+            info = {
+                'st_size': str(size),
+                'st_blocks': str((size + 511) // 512),
+                'st_nlink': str(nlink),
+                'st_ifmt': node.kind,
+                'st_mtime': str(node.mtime_ns),
+                'st_birthtime': str(node.birthtime_ns),
+            }
+            if node.kind == 'S_IFLNK':
+                info['LinkTarget'] = node.target
+            return info
+
+    def open(self, path: str, mode: int) -> _MemoryHandle:
+        with self._lock:
+            try:
+                node = self._lookup(path)
+            except FileNotFoundError:
+                if mode in (AFC_FOPEN_RDONLY, AFC_FOPEN_RW):
+                    raise
+                parent, name = self._parent(path)
+                node = _MemoryNode('S_IFREG')
+                parent.children[name] = node
+                parent.mtime_ns = node.mtime_ns
+
+            if node.kind == 'S_IFDIR':
+                raise _os_error(errno.EISDIR, path)
+            if mode in (AFC_FOPEN_WRONLY, AFC_FOPEN_WR):
+                del node.data[:]
+                node.mtime_ns = time.time_ns()
+            return _MemoryHandle(node, mode in (AFC_FOPEN_APPEND, AFC_FOPEN_RDAPPEND), self._lock)
+
+    def mkdir(self, path: str):
+        with self._lock:
+            node = self._root
+            for part in [part for part in _normalize(path).split('/') if part]:
+                child = node.children.get(part)
+                if child is None:
+                    child = _MemoryNode('S_IFDIR')
+                    node.children[part] = child
+                    node.mtime_ns = child.mtime_ns
+                elif child.kind != 'S_IFDIR':
+                    raise _os_error(errno.EEXIST, path)
+                node = child
+
+    def remove(self, path: str):
+        with self._lock:
+            parent, name = self._parent(path)
+            node = parent.children.get(name)
+            if node is None:
+                raise _os_error(errno.ENOENT, path)
+            if node.kind == 'S_IFDIR' and node.children:
+                raise _os_error(errno.ENOTEMPTY, path)
+            del parent.children[name]
+            parent.mtime_ns = time.time_ns()
+
+    def remove_tree(self, path: str):
+        with self._lock:
+            parent, name = self._parent(path)
+            if parent.children.pop(name, None) is None:
+                raise _os_error(errno.ENOENT, path)
+            parent.mtime_ns = time.time_ns()
+
+    def rename(self, source: str, destination: str):
+        with self._lock:
+            source_parent, source_name = self._parent(source)
+            node = source_parent.children.get(source_name)
+            if node is None:
+                raise _os_error(errno.ENOENT, source)
+            destination_parent, destination_name = self._parent(destination)
+            existing = destination_parent.children.get(destination_name)
+            if existing is not None and existing.kind == 'S_IFDIR' and existing.children:
+                raise _os_error(errno.ENOTEMPTY, destination)
+            del source_parent.children[source_name]
+            destination_parent.children[destination_name] = node
+            source_parent.mtime_ns = destination_parent.mtime_ns = time.time_ns()
+
+    def truncate(self, path: str, size: int):
+        with self._lock:
+            node = self._lookup(path)
+            if node.kind != 'S_IFREG':
+                raise _os_error(errno.EISDIR, path)
+            _MemoryHandle(node, False, self._lock).truncate(size)
+
+    def link(self, kind: int, target: str, name: str):
+        with self._lock:
+            parent, link_name = self._parent(name)
+            if link_name in parent.children:
+                raise _os_error(errno.EEXIST, name)
+            if kind == AFC_SYMLINK:
+                node = _MemoryNode('S_IFLNK')
+                node.target = target
+            elif kind == AFC_HARDLINK:
+                node = self._lookup(target)
+                if node.kind == 'S_IFDIR':
+                    raise _os_error(errno.EPERM, target)
+            else:
+                raise _os_error(errno.EINVAL, name)
+            parent.children[link_name] = node
+
+    def set_mtime(self, path: str, mtime_ns: int):
+        with self._lock:
+            self._lookup(path).mtime_ns = mtime_ns
+
+    def device_info(self) -> Dict[str, str]:
+        with self._lock:
+            used = self._size(self._root)
+        return {
+            'Model': 'iPhone10,3',
+            'FSTotalBytes': str(self.total_bytes),
+            'FSFreeBytes': str(max(0, self.total_bytes - used)),
+            'FSBlockSize': str(BLOCK_SIZE),
+        }
+
+
+_OPEN_MODES = {
+    AFC_FOPEN_RDONLY: 'rb',
+    AFC_FOPEN_RW: 'r+b',
+    AFC_FOPEN_WRONLY: 'wb',
+    AFC_FOPEN_WR: 'w+b',
+    AFC_FOPEN_APPEND: 'ab',
+    AFC_FOPEN_RDAPPEND: 'a+b',
+}
+
+_FILE_TYPES = {
+    0o040000: 'S_IFDIR',
+    0o100000: 'S_IFREG',
+    0o120000: 'S_IFLNK',
+    0o020000: 'S_IFCHR',
+    0o060000: 'S_IFBLK',
+    0o010000: 'S_IFIFO',
+    0o140000: 'S_IFSOCK',
+}
+
+
+class DirectoryFilesystem(object):
+    """A device filesystem backed by a host directory, for data sets larger than memory."""
+    root: str
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _host_path(self, path: str) -> str:
+        return os.path.join(self.root, *[part for part in _normalize(path).split('/') if part])
+
+    def listdir(self, path: str) -> List[str]:
+        return ['.', '..'] + sorted(os.listdir(self._host_path(path)))
+
+    def stat(self, path: str) -> Dict[str, str]:
+        host_path = self._host_path(path)
+        st = os.lstat(host_path)
+        info = {
+            'st_size': str(st.st_size),
+            'st_blocks': str(getattr(st, 'st_blocks', (st.st_size + 511) // 512)),
+            'st_nlink': str(st.st_nlink),
+            'st_ifmt': _FILE_TYPES.get(st.st_mode & 0o170000, 'S_IFREG'),
+            'st_mtime': str(st.st_mtime_ns),
+            'st_birthtime': str(int(getattr(st, 'st_birthtime', st.st_ctime) * 1e9)),
+        }
+        if info['st_ifmt'] == 'S_IFLNK':
+            info['LinkTarget'] = os.readlink(host_path)
+        return info
+
+    def open(self, path: str, mode: int):
+        if mode not in _OPEN_MODES:
+            raise _os_error(errno.EINVAL, path)
+        return open(self._host_path(path), _OPEN_MODES[mode], buffering=0)
+
+    def mkdir(self, path: str):
+        os.makedirs(self._host_path(path), exist_ok=True)
+
+    def remove(self, path: str):
+        host_path = self._host_path(path)
+        if os.path.isdir(host_path) and not os.path.islink(host_path):
+            os.rmdir(host_path)
+        else:
+            os.remove(host_path)
+
+    def remove_tree(self, path: str):
+        host_path = self._host_path(path)
+        if os.path.isdir(host_path) and not os.path.islink(host_path):
+            shutil.rmtree(host_path)
+        else:
+            os.remove(host_path)
+
+    def rename(self, source: str, destination: str):
+        os.replace(self._host_path(source), self._host_path(destination))
+
+    def truncate(self, path: str, size: int):
+        os.truncate(self._host_path(path), size)
+
+    def link(self, kind: int, target: str, name: str):
+        if kind == AFC_SYMLINK:
+            os.symlink(target, self._host_path(name))
+        elif kind == AFC_HARDLINK:
+            os.link(self._host_path(target), self._host_path(name))
+        else:
+            raise _os_error(errno.EINVAL, name)
+
+    def set_mtime(self, path: str, mtime_ns: int):
+        host_path = self._host_path(path)
+        os.utime(host_path, ns=(os.stat(host_path).st_atime_ns, mtime_ns))
+
+    def device_info(self) -> Dict[str, str]:
+        usage = shutil.disk_usage(self.root)
+        return {
+            'Model': 'iPhone10,3',
+            'FSTotalBytes': str(usage.total),
+            'FSFreeBytes': str(usage.free),
+            'FSBlockSize': str(BLOCK_SIZE),
+        }
@@ -0,0 +1,107 @@
+import socket
+import uuid
+from typing import *
+
+from .transport import LinkShaper, recv_plist, send_plist
+
+
+LOCKDOWN_PORT = 62078
+LOCKDOWN_TYPE = 'com.apple.mobile.lockdown'
+
+ECHO_SERVICE_NAME = 'com.apple.simulator.echo'
+
+
+class LockdownSession(object):
+    """Serves lockdownd requests for one connection.
+
+    Sessions are started without SSL so a client paired with the simulator's
+    dummy pair record can talk plain property lists to every service.
+    """
+    _sock: socket.socket
+    _shaper: LinkShaper
+    _session_id: Optional[str]
+
+    def __init__(self, simulator, device, sock: socket.socket):
+        self._simulator = simulator
+        self._device = device
+        self._sock = sock
+        self._shaper = simulator.shaper
+        self._session_id = None
+        self._requests = {
+            'QueryType': self._query_type,
+            'GetValue': self._get_value,
+            'StartSession': self._start_session,
+            'StopSession': self._stop_session,
+            'StartService': self._start_service,
+            'ValidatePair': self._success,
+            'Pair': self._success,
+            'Goodbye': self._success,
+        }
+
+    def run(self):
+        while True:
+            message = recv_plist(self._sock)
+            if not isinstance(message, dict):
+                return
+
+            request = message.get('Request')
+            handler = self._requests.get(request)
+            if handler is None:
+                response = {'Error': 'InvalidRequest'}
+            else:
+                response = handler(message)
+            response['Request'] = request
+            send_plist(self._sock, self._shaper, response)
+
+            if request == 'Goodbye':
+                return
+
+    def _success(self, message: dict) -> dict:
+        return {'Result': 'Success'}
+
+    def _query_type(self, message: dict) -> dict:
+        return {'Type': LOCKDOWN_TYPE}
+
+    def _get_value(self, message: dict) -> dict:
+        values = self._device.lockdown_values(message.get('Domain'))
+        key = message.get('Key')
+        if key is None:
+            return {'Value': values}
+        if key not in values:
+            return {'Key': key, 'Error': 'MissingValue'}
+        return {'Key': key, 'Value': values[key]}
+
+    def _start_session(self, message: dict) -> dict:
+        self._session_id = str(uuid.uuid4()).upper()
+        return {'SessionID': self._session_id, 'EnableSessionSSL': False}
+
+    def _stop_session(self, message: dict) -> dict:
+        self._session_id = None
+        return {'Result': 'Success'}
+
+    def _start_service(self, message: dict) -> dict:
+        service = message.get('Service')
+        if self._session_id is None:
+            return {'Service': service, 'Error': 'NoRunningSession'}
+
+        port = self._simulator.start_service(service)
+        if port is None:
+            return {'Service': service, 'Error': 'InvalidService'}
+        return {'Service': service, 'Port': port, 'EnableServiceSSL': False}
+
+
+class EchoSession(object):
+    """A property list service that sends every message straight back, for round trip measurements."""
+    _sock: socket.socket
+    _shaper: LinkShaper
+
+    def __init__(self, simulator, device, sock: socket.socket):
+        self._sock = sock
+        self._shaper = simulator.shaper
+
+    def run(self):
+        while True:
+            message = recv_plist(self._sock)
+            if message is None:
+                return
+            send_plist(self._sock, self._shaper, message)
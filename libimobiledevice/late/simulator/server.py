@@ -0,0 +1,312 @@
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import uuid
+from contextlib import contextmanager
+from threading import Lock, Thread
+from typing import *
+
+from libimobiledevice.util import darwin_sockaddr
+
+from .afc import AFC_SERVICE_NAME, AfcSession
+from .filesystem import MemoryFilesystem
+from .lockdown import ECHO_SERVICE_NAME, LOCKDOWN_PORT, EchoSession, LockdownSession
+from .transport import LinkShaper
+from .usbmux import UsbmuxSession
+
+
+USBMUXD_SOCKET_ADDRESS_ENV = 'USBMUXD_SOCKET_ADDRESS'
+SERVICE_PORT_BASE = 49152
+
+
+class SimulatedDevice(object):
+    udid: str
+    device_id: int
+    filesystem: object
+    values: Dict[str, object]
+    network_address: Optional[Tuple[str, int]]
+
+    def __init__(self, udid: str, device_id: int, filesystem, values: Dict[str, object] = None,
+                 network_address: Tuple[str, int] = None):
+        self.udid = udid
+        self.device_id = device_id
+        self.filesystem = filesystem
+        self.network_address = network_address
+        self.values = {
+            'UniqueDeviceID': udid,
+            'DeviceName': 'Simulated iPhone',
+            'DeviceClass': 'iPhone',
+            'ProductType': 'iPhone10,3',
+            'ProductVersion': '15.0',
+            'BuildVersion': '19A346',
+            'SerialNumber': udid[:12].upper(),
+        }
+        if values:
+            self.values.update(values)
+
+    def lockdown_values(self, domain: Optional[str]) -> Dict[str, object]:
+        if domain is None:
+            return {key: value for key, value in self.values.items() if not isinstance(value, dict)}
+        return self.values.get(domain, {})
+
+    @property
+    def is_network(self) -> bool:
+        return self.network_address is not None
+
+    def attached_message(self) -> dict:
+        if self.is_network:
+            return {
+                'MessageType': 'Attached',
+                'DeviceID': self.device_id,
+                'Properties': {
+                    'ConnectionType': 'Network',
+                    'DeviceID': self.device_id,
+                    'EscapedFullServiceName': '%s._apple-mobdev2._tcp.local.' % self.udid,
+                    'InterfaceIndex': 1,
+                    'NetworkAddress': darwin_sockaddr(self.network_address),
+                    'SerialNumber': self.udid,
+                },
+            }
+        return {
+            'MessageType': 'Attached',
+            'DeviceID': self.device_id,
+            'Properties': {
+                'ConnectionSpeed': 480000000,
+                'ConnectionType': 'USB',
+                'DeviceID': self.device_id,
+                'LocationID': self.device_id,
+                'ProductID': 0x12A8,
+                'SerialNumber': self.udid,
+            },
+        }
+
+    def pair_record(self, buid: str) -> dict:
+        # Sessions never enable SSL, so the certificates only have to be present
+        placeholder = b'-----BEGIN CERTIFICATE-----\nc2ltdWxhdG9y\n-----END CERTIFICATE-----\n'
+        return {
+            'HostID': 'SIMULATOR-' + self.udid.upper(),
+            'SystemBUID': buid,
+            'DeviceCertificate': placeholder,
+            'HostCertificate': placeholder,
+            'RootCertificate': placeholder,
+            'HostPrivateKey': placeholder,
+            'RootPrivateKey': placeholder,
+            'WiFiMACAddress': '00:00:00:00:00:00',
+        }
+
+    def __repr__(self):
+        if self.is_network:
+            return '<SimulatedDevice: %s at %s>' % (self.udid, self.network_address[0])
+        return '<SimulatedDevice: %s>' % self.udid
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.server.simulator._serve(self.request)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    simulator: 'Simulator'
+
+
+class Simulator(object):
+    """A stand-in usbmuxd with lockdown and AFC for benchmarking without hardware.
+
+    Point libimobiledevice at it with activate() or by exporting environ().
+    Every message the simulator sends goes through shaper, so latency and
+    bandwidth apply to usbmuxd, lockdown and service traffic alike.
+    """
+    shaper: LinkShaper
+    buid: str
+    socket_path: Optional[str]
+
+    def __init__(self, socket_path: str = None, latency: float = 0.0, bandwidth: float = None):
+        self.shaper = LinkShaper(latency, bandwidth)
+        self.buid = str(uuid.uuid4()).upper()
+        self.socket_path = socket_path
+        self._temporary_dir = None
+        self._server = None
+        self._thread = None
+        self._lock = Lock()
+        self._devices: Dict[int, SimulatedDevice] = {}
+        self._next_device_id = 1
+        self._services: Dict[str, Callable] = {
+            AFC_SERVICE_NAME: AfcSession,
+            ECHO_SERVICE_NAME: EchoSession,
+        }
+        self._ports: Dict[int, str] = {}
+        self._next_port = SERVICE_PORT_BASE
+        self._listeners = []
+        self._connections = set()
+
+    @property
+    def address(self) -> str:
+        if self.socket_path is None:
+            raise RuntimeError("Simulator is not running")
+        return 'UNIX:' + self.socket_path
+
+    def environ(self) -> Dict[str, str]:
+        return {USBMUXD_SOCKET_ADDRESS_ENV: self.address}
+
+    @property
+    def devices(self) -> List[SimulatedDevice]:
+        with self._lock:
+            return list(self._devices.values())
+
+    def device_by_id(self, device_id: int) -> Optional[SimulatedDevice]:
+        with self._lock:
+            return self._devices.get(device_id)
+
+    def device_by_udid(self, udid: str) -> Optional[SimulatedDevice]:
+        with self._lock:
+            for device in self._devices.values():
+                if device.udid == udid:
+                    return device
+        return None
+
+    def add_device(self, udid: str = None, filesystem=None, network_address: Tuple[str, int] = None,
+                   **values) -> SimulatedDevice:
+        """Attach a device, over the network when network_address is given and over USB otherwise.
+
+        Adding a udid that is already attached adds a second connection to it;
+        pass the first device's filesystem to have both see the same files.
+        """
+        with self._lock:
+            device = SimulatedDevice(udid or uuid.uuid4().hex + uuid.uuid4().hex[:8], self._next_device_id,
+                                     filesystem if filesystem is not None else MemoryFilesystem(), values,
+                                     network_address)
+            self._next_device_id += 1
+            self._devices[device.device_id] = device
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener.send(device.attached_message())
+        return device
+
+    def remove_device(self, udid: str, network: bool = None):
+        """Detach every connection of udid, or only its network or USB ones."""
+        with self._lock:
+            removed = [device for device in self._devices.values()
+                       if device.udid == udid and (network is None or device.is_network == network)]
+            if not removed:
+                raise KeyError(udid)
+            for device in removed:
+                del self._devices[device.device_id]
+            listeners = list(self._listeners)
+
+        for device in removed:
+            for listener in listeners:
+                listener.send({'MessageType': 'Detached', 'DeviceID': device.device_id})
+
+    def register_service(self, name: str, factory: Callable):
+        """factory(simulator, device, sock) must return an object whose run() serves one connection."""
+        self._services[name] = factory
+
+    def start_service(self, name: str) -> Optional[int]:
+        with self._lock:
+            if name not in self._services:
+                return None
+            port = self._next_port
+            self._next_port = port + 1 if port < 0xFFFF else SERVICE_PORT_BASE
+            self._ports[port] = name
+            return port
+
+    def has_port(self, port: int) -> bool:
+        with self._lock:
+            return port == LOCKDOWN_PORT or port in self._ports
+
+    def add_listener(self, listener: UsbmuxSession):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: UsbmuxSession):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def start(self):
+        if self._server is not None:
+            return
+
+        if self.socket_path is None:
+            self._temporary_dir = tempfile.mkdtemp(prefix='usbmuxd-simulator-')
+            self.socket_path = os.path.join(self._temporary_dir, 'usbmuxd.sock')
+        elif os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        self._server = _Server(self.socket_path, _Handler)
+        self._server.simulator = self
+        self._thread = Thread(target=self._server.serve_forever, name='usbmuxd-simulator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is None:
+            return
+
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+        if self._temporary_dir is not None:
+            shutil.rmtree(self._temporary_dir, ignore_errors=True)
+            self._temporary_dir = None
+            self.socket_path = None
+        elif os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    @contextmanager
+    def activate(self):
+        """Run the simulator with USBMUXD_SOCKET_ADDRESS pointing at it for the duration of the block."""
+        started = self._server is None
+        self.start()
+        previous = os.environ.get(USBMUXD_SOCKET_ADDRESS_ENV)
+        os.environ[USBMUXD_SOCKET_ADDRESS_ENV] = self.address
+        try:
+            yield self
+        finally:
+            if previous is None:
+                del os.environ[USBMUXD_SOCKET_ADDRESS_ENV]
+            else:
+                os.environ[USBMUXD_SOCKET_ADDRESS_ENV] = previous
+            if started:
+                self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+    def _serve(self, sock: socket.socket):
+        with self._lock:
+            self._connections.add(sock)
+        try:
+            target = UsbmuxSession(self, sock).run()
+            if target is None:
+                return
+
+            device, port = target
+            if port == LOCKDOWN_PORT:
+                session = LockdownSession(self, device, sock)
+            else:
+                with self._lock:
+                    factory = self._services[self._ports[port]]
+                session = factory(self, device, sock)
+            session.run()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(sock)
@@ -0,0 +1,69 @@
+import plistlib
+import socket
+import struct
+import time
+from typing import *
+
+
+LENGTH_PREFIX = struct.Struct('>I')
+
+
+class LinkShaper(object):
+    """Delays every message sent by the simulator to mimic a slower link.
+
+    latency is added once per message in seconds, bandwidth in bytes per
+    second adds the time the message would take on the wire.
+    """
+    latency: float
+    bandwidth: Optional[float]
+
+    def __init__(self, latency: float = 0.0, bandwidth: float = None):
+        if latency < 0:
+            raise ValueError("latency cannot be negative")
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("bandwidth must be positive")
+
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def delay(self, size: int) -> float:
+        if self.bandwidth is None:
+            return self.latency
+        return self.latency + size / self.bandwidth
+
+    def send(self, sock: socket.socket, data: bytes):
+        delay = self.delay(len(data))
+        if delay > 0:
+            time.sleep(delay)
+        sock.sendall(data)
+
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or None if the peer closed the connection before sending any."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError("Connection closed in the middle of a message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_plist(sock: socket.socket) -> Optional[object]:
+    """Read one length prefixed property list as used by lockdown and plist services."""
+    header = recv_exact(sock, LENGTH_PREFIX.size)
+    if header is None:
+        return None
+    data = recv_exact(sock, LENGTH_PREFIX.unpack(header)[0])
+    if data is None:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return plistlib.loads(data)
+
+
+def send_plist(sock: socket.socket, shaper: LinkShaper, value, fmt=plistlib.FMT_XML):
+    data = plistlib.dumps(value, fmt=fmt)
+    shaper.send(sock, LENGTH_PREFIX.pack(len(data)) + data)
@@ -0,0 +1,122 @@
+import plistlib
+import socket
+import struct
+from threading import Lock
+from typing import *
+
+from .transport import LinkShaper, recv_exact
+
+
+USBMUX_HEADER = struct.Struct('<IIII')
+USBMUX_VERSION_PLIST = 1
+USBMUX_MESSAGE_PLIST = 8
+
+USBMUX_RESULT_OK = 0
+USBMUX_RESULT_BADCOMMAND = 1
+USBMUX_RESULT_BADDEV = 2
+USBMUX_RESULT_CONNREFUSED = 3
+USBMUX_RESULT_BADVERSION = 6
+
+
+def _swap16(value: int) -> int:
+    # usbmuxd clients send the port in network byte order inside a host order integer
+    return ((value & 0xFF) << 8) | ((value >> 8) & 0xFF)
+
+
+class UsbmuxSession(object):
+    """Serves the usbmuxd plist protocol until the client either closes or connects to a device port."""
+    _sock: socket.socket
+    _shaper: LinkShaper
+    _send_lock: Lock
+    _closed: bool
+
+    def __init__(self, simulator, sock: socket.socket):
+        self._simulator = simulator
+        self._sock = sock
+        self._shaper = simulator.shaper
+        self._send_lock = Lock()
+        self._closed = False
+        self._messages = {
+            'ListDevices': self._list_devices,
+            'Listen': self._listen,
+            'Connect': self._connect,
+            'ReadBUID': self._read_buid,
+            'ReadPairRecord': self._read_pair_record,
+            'SavePairRecord': self._result_ok,
+            'DeletePairRecord': self._result_ok,
+        }
+
+    def run(self) -> Optional[Tuple[object, int]]:
+        """Returns the (device, port) the connection was handed over to, or None once the client is gone."""
+        while True:
+            header = recv_exact(self._sock, USBMUX_HEADER.size)
+            if header is None:
+                return None
+            length, version, message_type, tag = USBMUX_HEADER.unpack(header)
+            payload = recv_exact(self._sock, length - USBMUX_HEADER.size) or b''
+
+            if version != USBMUX_VERSION_PLIST or message_type != USBMUX_MESSAGE_PLIST:
+                self.send({'MessageType': 'Result', 'Number': USBMUX_RESULT_BADVERSION}, tag)
+                continue
+
+            message = plistlib.loads(payload)
+            handler = self._messages.get(message.get('MessageType'))
+            if handler is None:
+                self.send({'MessageType': 'Result', 'Number': USBMUX_RESULT_BADCOMMAND}, tag)
+                continue
+
+            target = handler(message, tag)
+            if target is not None or self._closed:
+                return target
+
+    def send(self, message: dict, tag: int = 0):
+        data = plistlib.dumps(message, fmt=plistlib.FMT_XML)
+        header = USBMUX_HEADER.pack(USBMUX_HEADER.size + len(data), USBMUX_VERSION_PLIST, USBMUX_MESSAGE_PLIST, tag)
+        with self._send_lock:
+            self._shaper.send(self._sock, header + data)
+
+    def _result(self, number: int, tag: int):
+        self.send({'MessageType': 'Result', 'Number': number}, tag)
+
+    def _result_ok(self, message: dict, tag: int):
+        self._result(USBMUX_RESULT_OK, tag)
+
+    def _list_devices(self, message: dict, tag: int):
+        self.send({'DeviceList': [device.attached_message() for device in self._simulator.devices]}, tag)
+
+    def _listen(self, message: dict, tag: int):
+        self._result(USBMUX_RESULT_OK, tag)
+        self._simulator.add_listener(self)
+        try:
+            for device in self._simulator.devices:
+                self.send(device.attached_message())
+            # A listening connection only ever receives from here on; wait for the client to hang up
+            while self._sock.recv(4096):
+                pass
+        finally:
+            self._simulator.remove_listener(self)
+        self._closed = True
+
+    def _connect(self, message: dict, tag: int):
+        device = self._simulator.device_by_id(message.get('DeviceID'))
+        if device is None:
+            self._result(USBMUX_RESULT_BADDEV, tag)
+            return None
+
+        port = _swap16(message.get('PortNumber', 0))
+        if not self._simulator.has_port(port):
+            self._result(USBMUX_RESULT_CONNREFUSED, tag)
+            return None
+
+        self._result(USBMUX_RESULT_OK, tag)
+        return device, port
+
+    def _read_buid(self, message: dict, tag: int):
+        self.send({'BUID': self._simulator.buid}, tag)
+
+    def _read_pair_record(self, message: dict, tag: int):
+        device = self._simulator.device_by_udid(message.get('PairRecordID'))
+        if device is None:
+            self._result(USBMUX_RESULT_BADDEV, tag)
+            return None
+        self.send({'PairRecordData': plistlib.dumps(device.pair_record(self._simulator.buid))}, tag)
@@ -1,40 +1,186 @@
 from libimobiledevice import BaseService, BaseError
-from libplist import *
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 from ctypes import *
+from enum import Enum
+from io import BytesIO
+from plist import bplist
+from plist.libplist import Node, plist_free, plist_t_to_node
+from struct import Struct
+from threading import RLock
+from typing import *
+import plistlib
+import time
+
+
+PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT = -5
+
+FRAME_HEADER = Struct('>I')
+RECEIVE_CHUNK_SIZE = 64 * 1024
+DEFAULT_PIPELINE_DEPTH = 8
+
+
+class PropertyListServiceErrorCode(Enum):
+    PROPERTY_LIST_SERVICE_E_SUCCESS = 0
+    PROPERTY_LIST_SERVICE_E_INVALID_ARG = -1
+    PROPERTY_LIST_SERVICE_E_PLIST_ERROR = -2
+    PROPERTY_LIST_SERVICE_E_MUX_ERROR = -3
+    PROPERTY_LIST_SERVICE_E_SSL_ERROR = -4
+    PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT = PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT
+    PROPERTY_LIST_SERVICE_E_NOT_ENOUGH_DATA = -6
+    PROPERTY_LIST_SERVICE_E_UNKNOWN_ERROR = -256
+
+
+class PropertyListServiceError(BaseError):
+    def __init__(self, error_code: int):
+        self._lookup_table = {
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_SUCCESS: "Success",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_INVALID_ARG: "Invalid argument",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_PLIST_ERROR: "Property list error",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_MUX_ERROR: "Mux error",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_SSL_ERROR: "SSL error",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT: "Receive timeout",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_NOT_ENOUGH_DATA: "Not enough data",
+            PropertyListServiceErrorCode.PROPERTY_LIST_SERVICE_E_UNKNOWN_ERROR: "Unknown error"
+        }
+        BaseError.__init__(self, error_code)
 
 
 class LockdownServiceDescriptor:
     pass
 
 
+def _decode_frame(frame: bytes) -> object:
+    if frame[:len(bplist.BPLIST_MAGIC)] == bplist.BPLIST_MAGIC:
+        return bplist.loads(frame)
+    return plistlib.loads(frame)
+
+
+def _encode_frame(value: object) -> bytes:
+    # Serialized behind a placeholder header so the payload is not copied again to prepend its length
+    buffer = BytesIO()
+    buffer.write(bytes(FRAME_HEADER.size))
+    bplist.dump(value, buffer)
+    with buffer.getbuffer() as view:
+        FRAME_HEADER.pack_into(view, 0, len(view) - FRAME_HEADER.size)
+    return buffer.getvalue()
+
+
 class PropertyListService(BaseService):
+    __receive_timeout_error__: Optional[int] = PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT
+    _native_buffer: Optional[bytearray] = None
+    _native_pending: Optional[deque] = None
+
+    def _error(self, error_code: int) -> BaseError:
+        return PropertyListServiceError(error_code)
+
     def send(self, node: Node):
         self.handle_error(self._send(node._c_node))
 
-    def receive(self) -> object:
+    def receive(self, lazy: bool = True) -> object:
         c_node = c_void_p()
         err = self._receive(c_node)
         try:
             self.handle_error(err)
 
-            return plist_t_to_node(c_node)
+            return plist_t_to_node(c_node, lazy=lazy)
         except BaseError:
-            if c_node is not None:
+            if c_node:
                 plist_free(c_node)
             raise
 
-    def receive_with_timeout(self, timeout_ms):
+    def receive_with_timeout(self, timeout_ms, lazy: bool = True):
         c_node = c_void_p()
         err = self._receive_with_timeout(c_node, timeout_ms)
         try:
             self.handle_error(err)
 
-            return plist_t_to_node(c_node)
+            return plist_t_to_node(c_node, lazy=lazy)
         except BaseError:
-            if c_node is not None:
+            if c_node:
                 plist_free(c_node)
             raise
 
+    def send_native(self, value: object):
+        self._send_frames(_encode_frame(value))
+
+    def pipeline(self, depth: int = DEFAULT_PIPELINE_DEPTH) -> 'PropertyListPipeline':
+        return PropertyListPipeline(self, depth)
+
+    @contextmanager
+    def batch(self, depth: int = DEFAULT_PIPELINE_DEPTH):
+        """Collect requests made in the block and send them together on exit, depth at a time.
+
+        Yields a PropertyListPipeline whose submit() returns a future per request;
+        all of them are resolved when the block exits normally.
+        """
+        pipeline = PropertyListPipeline(self, depth, autoflush=False)
+        try:
+            yield pipeline
+        except BaseException:
+            pipeline.cancel()
+            raise
+        pipeline.flush()
+
+    def _send_frames(self, frame: bytes):
+        while frame:
+            sent = c_uint32(0)
+            self.handle_error(self._send_raw(frame, len(frame), sent))
+            frame = frame[sent.value:]
+
+    def receive_native(self, timeout_ms: int = None) -> object:
+        return self.receive_many(1, timeout_ms)[0]
+
+    def receive_many(self, count: int, timeout_ms: int = None) -> List[object]:
+        """Receive count messages decoded straight to Python objects, reading ahead in large chunks.
+
+        Messages decoded before a receive error are kept and returned first by
+        the next call, as is a partly received frame. A frame that fails to
+        decode is dropped and its error raised. With timeout_ms, giving up after
+        that long raises the receive timeout error.
+        """
+        deadline = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000
+        if self._native_buffer is None:
+            self._native_buffer = bytearray()
+            self._native_pending = deque()
+        buffer = self._native_buffer
+        pending = self._native_pending
+
+        offset = 0
+        try:
+            while len(pending) < count:
+                if len(buffer) - offset < FRAME_HEADER.size:
+                    self._fill(buffer, offset + FRAME_HEADER.size, deadline)
+                size, = FRAME_HEADER.unpack_from(buffer, offset)
+                end = offset + FRAME_HEADER.size + size
+                if len(buffer) < end:
+                    self._fill(buffer, end, deadline)
+                # Copied out so no view of the buffer outlives this frame, even in a decode traceback
+                with memoryview(buffer) as view:
+                    frame = bytes(view[offset + FRAME_HEADER.size:end])
+                offset = end
+                pending.append(_decode_frame(frame))
+        finally:
+            del buffer[:offset]
+        return [pending.popleft() for _ in range(count)]
+
+    def _fill(self, buffer: bytearray, size: int, deadline: Optional[float] = None):
+        chunk = create_string_buffer(max(RECEIVE_CHUNK_SIZE, size - len(buffer)))
+        received = c_uint32(0)
+        while len(buffer) < size:
+            if deadline is None:
+                self.handle_error(self._receive_raw(chunk, len(chunk), received))
+            else:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0:
+                    self.handle_error(self.__receive_timeout_error__)
+                self.handle_error(self._receive_raw_with_timeout(chunk, len(chunk), received, remaining_ms))
+            buffer += memoryview(chunk).cast('B')[:received.value]
+
+    def is_receive_timeout(self, error: BaseError) -> bool:
+        return error.error_code == self.__receive_timeout_error__
+
     def _send(self, node: c_void_p) -> c_int16:
         raise NotImplementedError("send is not implemented")
 
@@ -42,4 +188,138 @@ class PropertyListService(BaseService):
         raise NotImplementedError("receive is not implemented")
 
     def _receive_with_timeout(self, c_node: c_void_p, timeout_ms: c_int32) -> c_int16:
-        raise NotImplementedError("receive_with_timeout is not implemented")
\ No newline at end of file
+        raise NotImplementedError("receive_with_timeout is not implemented")
+
+    def _send_raw(self, data: bytes, size: int, sent: c_uint32) -> c_int16:
+        raise NotImplementedError("send_native is not implemented")
+
+    def _receive_raw(self, buffer, size: int, received: c_uint32) -> c_int16:
+        raise NotImplementedError("receive_native is not implemented")
+
+    def _receive_raw_with_timeout(self, buffer, size: int, received: c_uint32, timeout_ms: c_uint32) -> c_int16:
+        raise NotImplementedError("receive_native with a timeout is not implemented")
+
+
+class PipelinedFuture(Future):
+    _pipeline: 'PropertyListPipeline'
+
+    def __init__(self, pipeline: 'PropertyListPipeline'):
+        Future.__init__(self)
+        self._pipeline = pipeline
+
+    def result(self, timeout=None):
+        if not self.done():
+            self._pipeline._resolve(self, timeout)
+        return Future.result(self, timeout)
+
+    def exception(self, timeout=None):
+        if not self.done():
+            self._pipeline._resolve(self, timeout)
+        return Future.exception(self, timeout)
+
+
+class PropertyListPipeline(object):
+    """Keeps up to depth requests in flight on one service connection.
+
+    Replies are matched to requests in order. Waiting on a future returned by
+    submit() sends and receives as far as needed to resolve it, from whichever
+    thread waits first. A wait with a timeout gives up waiting for replies after
+    that long and leaves the request outstanding; sending is not bounded.
+    """
+    _service: PropertyListService
+    _depth: int
+    _autoflush: bool
+    _queued: deque
+    _outstanding: deque
+    _lock: RLock
+
+    def __init__(self, service: PropertyListService, depth: int = DEFAULT_PIPELINE_DEPTH, autoflush: bool = True):
+        if depth < 1:
+            raise ValueError("Pipeline depth must be at least 1")
+
+        self._service = service
+        self._depth = depth
+        self._autoflush = autoflush
+        self._queued = deque()
+        self._outstanding = deque()
+        self._lock = RLock()
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._outstanding)
+
+    def submit(self, request: object) -> PipelinedFuture:
+        future = PipelinedFuture(self)
+        frame = _encode_frame(request)
+        with self._lock:
+            self._queued.append((frame, future))
+            if self._autoflush:
+                if len(self._outstanding) >= self._depth:
+                    self._receive_one()
+                self._send_window()
+        return future
+
+    def flush(self):
+        with self._lock:
+            while self._queued or self._outstanding:
+                self._send_window()
+                if self._outstanding:
+                    self._receive_one()
+
+    def cancel(self):
+        with self._lock:
+            for _, future in self._queued:
+                future.cancel()
+            self._queued.clear()
+
+    def _resolve(self, future: PipelinedFuture, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise FutureTimeoutError()
+        try:
+            while not future.done() and (self._queued or self._outstanding):
+                self._send_window()
+                if self._outstanding:
+                    self._receive_one(deadline)
+        finally:
+            self._lock.release()
+
+    def _send_window(self):
+        frames = []
+        while self._queued and len(self._outstanding) < self._depth:
+            frame, future = self._queued.popleft()
+            if future.set_running_or_notify_cancel():
+                frames.append(frame)
+                self._outstanding.append(future)
+        if not frames:
+            return
+
+        try:
+            self._service._send_frames(b''.join(frames))
+        except BaseException as e:
+            self._fail(e)
+            raise
+
+    def _receive_one(self, deadline: Optional[float] = None):
+        timeout_ms = None if deadline is None else max(0, int((deadline - time.monotonic()) * 1000))
+        try:
+            reply = self._service.receive_native(timeout_ms)
+        except BaseError as e:
+            # A timed out read keeps what it received, so the stream is still in step
+            if timeout_ms is not None and self._service.is_receive_timeout(e):
+                raise FutureTimeoutError() from e
+            self._fail(e)
+            raise
+        except BaseException as e:
+            self._fail(e)
+            raise
+        self._outstanding.popleft().set_result(reply)
+
+    def _fail(self, error: BaseException):
+        # Once the stream is out of step no later reply can be matched to its request
+        while self._outstanding:
+            self._outstanding.popleft().set_exception(error)
+        while self._queued:
+            _, future = self._queued.popleft()
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
@@ -1,13 +1,319 @@
 #!/usr/bin/env python
 
+import io
+from array import array
+
 from pytest import fixture
-from pytest_describe import behaves_like
 from libimobiledevice.afc import AfcClient
 from libimobiledevice.device import Device
+from libimobiledevice.simulator import Simulator
+
+
+UDID = '3ac82354b0a59ba46a03e8ae4937617063e26647'
+
+
+def mirrored(dest_dir):
+    return sorted(str(path.relative_to(dest_dir)) for path in dest_dir.rglob('*') if path.is_file())
 
 
 def describe_afc():
-    device = Device('3ac82354b0a59ba46a03e8ae4937617063e26647')
+    @fixture
+    def simulator():
+        with Simulator().activate() as simulator:
+            simulator.add_device(UDID)
+            yield simulator
+
+    @fixture
+    def client(simulator):
+        client = AfcClient(device=Device(UDID))
+        yield client
+        client.close()
+
+    def it_should_create_a_client(simulator):
+        client = AfcClient(device=Device(UDID))
+        client.close()
+
+    def describe_files():
+        @fixture
+        def photo(client):
+            with client.open('/photo.jpg', b'w') as f:
+                assert f.write(b'jpeg data') == 9
+            return '/photo.jpg'
+
+        def it_should_read_into_a_caller_buffer(client, photo):
+            buffer = bytearray(4)
+            with client.open(photo) as f:
+                assert f.readinto(buffer) == 4
+                assert buffer == b'jpeg'
+                assert f.readinto(memoryview(buffer)[1:]) == 3
+                assert buffer == b'j da'
+                assert f.readinto(buffer) == 2
+                assert f.readinto(buffer) == 0
+
+        def it_should_read_into_typed_buffers(client):
+            with client.open('/words.bin', b'w') as f:
+                f.write(array('I', [1, 2, 3]))
+
+            words = array('I', [0, 0, 0])
+            with client.open('/words.bin') as f:
+                assert f.readinto(words) == 12
+            assert words.tolist() == [1, 2, 3]
+
+        def it_should_read_to_the_end(client, photo):
+            with client.open(photo) as f:
+                assert f.read() == b'jpeg data'
+            with client.open(photo) as f:
+                assert f.read(4) == b'jpeg'
+                assert f.readall() == b' data'
+
+        def it_should_work_with_buffered_io(client):
+            with client.open('/lines.txt', b'w') as f:
+                f.write(b'first\nsecond\n')
+
+            with io.BufferedReader(client.open('/lines.txt'), buffer_size=4) as f:
+                assert f.readlines() == [b'first\n', b'second\n']
+
+        def it_should_write_every_buffer_type(client):
+            with client.open('/data.bin', b'w') as f:
+                assert f.write(b'ab') == 2
+                assert f.write(bytearray(b'cd')) == 2
+                assert f.write(memoryview(b'xefx')[1:3]) == 2
+                assert f.write(b'') == 0
+
+            with client.open('/data.bin') as f:
+                assert f.read() == b'abcdef'
+
+        def it_should_seek_tell_and_truncate(client, photo):
+            with client.open(photo, b'r+') as f:
+                assert f.seek(5) == 5
+                assert f.tell() == 5
+                assert f.read() == b'data'
+                assert f.seek(-4, io.SEEK_END) == 5
+                assert f.truncate() == 5
+
+            assert client.stat(photo).st_size == 5
+
+        def it_should_report_its_mode(client, photo):
+            with client.open(photo) as f:
+                assert f.readable() and not f.writable() and f.seekable()
+            with client.open(photo, b'a') as f:
+                assert f.writable() and not f.readable()
+
+        def it_should_close_once(client, photo):
+            f = client.open(photo)
+            f.close()
+            f.close()
+            assert f.closed
+
+    def describe_transfers():
+        @fixture
+        def files(client):
+            client.make_directory('/DCIM/100APPLE')
+            for name, data in (('IMG_0001.JPG', b'one'), ('IMG_0002.JPG', b'two' * 1000)):
+                with client.open('/DCIM/100APPLE/' + name, b'w') as f:
+                    f.write(data)
+            return ['/DCIM/100APPLE/IMG_0001.JPG', '/DCIM/100APPLE/IMG_0002.JPG']
+
+        def it_should_pull_files_below_dest_dir(client, files, tmp_path):
+            results = client.pull_many(files, str(tmp_path), workers=2, chunk_size=512)
+
+            assert [result.source for result in results] == files
+            assert all(result.ok for result in results)
+            assert [result.bytes_transferred for result in results] == [3, 3000]
+            assert (tmp_path / 'DCIM' / '100APPLE' / 'IMG_0002.JPG').read_bytes() == b'two' * 1000
+
+        def it_should_pull_to_explicit_destinations(client, files, tmp_path):
+            destination = str(tmp_path / 'first.jpg')
+            result, = client.pull_many([(files[0], destination)], str(tmp_path / 'unused'))
+
+            assert result.ok and result.destination == destination
+            assert (tmp_path / 'first.jpg').read_bytes() == b'one'
+
+        def it_should_report_failures_per_file(client, files, tmp_path):
+            missing, present = client.pull_many(['/DCIM/missing.jpg', files[0]], str(tmp_path))
+
+            assert not missing.ok and missing.bytes_transferred == 0
+            assert present.ok
+
+        def it_should_reject_paths_outside_dest_dir(client, files, tmp_path):
+            dest_dir = tmp_path / 'dest'
+            escaping, present = client.pull_many(['/DCIM/../../escaped.jpg', files[0]], str(dest_dir))
+
+            assert isinstance(escaping.error, ValueError)
+            assert not (tmp_path / 'escaped.jpg').exists()
+            assert present.ok
+
+        def it_should_push_files_into_a_directory(client, tmp_path):
+            sources = []
+            for name in ('a.txt', 'b.txt'):
+                (tmp_path / name).write_bytes(name.encode('utf-8') * 100)
+                sources.append(str(tmp_path / name))
+
+            results = client.push_many(sources, '/Uploads/text', workers=2, chunk_size=64)
+
+            assert [result.destination for result in results] == ['/Uploads/text/a.txt', '/Uploads/text/b.txt']
+            assert all(result.ok for result in results)
+            with client.open('/Uploads/text/b.txt') as f:
+                assert f.read() == b'b.txt' * 100
+
+        def it_should_report_a_failed_directory_for_its_files_only(client, tmp_path):
+            with client.open('/blocked', b'w') as f:
+                f.write(b'not a directory')
+            (tmp_path / 'a.txt').write_bytes(b'a')
+            (tmp_path / 'b.txt').write_bytes(b'b')
+
+            blocked, uploaded = client.push_many([(str(tmp_path / 'a.txt'), '/blocked/a.txt'),
+                                                  (str(tmp_path / 'b.txt'), '/ok/b.txt')], '/')
+
+            assert not blocked.ok
+            assert uploaded.ok
+            with client.open('/ok/b.txt') as f:
+                assert f.read() == b'b'
+
+    def describe_walk():
+        @fixture
+        def tree(client):
+            for directory in ('/Media/DCIM/100APPLE', '/Media/DCIM/101APPLE', '/Media/Books'):
+                client.make_directory(directory)
+            for path in ('/Media/DCIM/100APPLE/IMG_0001.JPG', '/Media/DCIM/101APPLE/IMG_0002.JPG',
+                         '/Media/Books/book.epub'):
+                with client.open(path, b'w') as f:
+                    f.write(path.encode('utf-8'))
+            client.symlink('/Media/DCIM', '/Media/Photos')
+            return '/Media'
+
+        def it_should_scan_a_directory_with_stats(client, tree):
+            entries = {entry.name: entry for entry in client.scandir(tree, workers=2)}
+
+            assert sorted(entries) == ['Books', 'DCIM', 'Photos']
+            assert entries['DCIM'].is_dir() and entries['DCIM'].path == '/Media/DCIM'
+            assert entries['Photos'].is_symlink()
+            assert entries['Photos'].stat().link_target == '/Media/DCIM'
+
+        def it_should_walk_top_down(client, tree):
+            walked = [(top, sorted(entry.name for entry in dirs), sorted(entry.name for entry in files))
+                      for top, dirs, files in client.walk(tree, workers=2)]
+
+            assert walked[0] == ('/Media', ['Books', 'DCIM'], ['Photos'])
+            assert sorted(walked[1:]) == [
+                ('/Media/Books', [], ['book.epub']),
+                ('/Media/DCIM', ['100APPLE', '101APPLE'], []),
+                ('/Media/DCIM/100APPLE', [], ['IMG_0001.JPG']),
+                ('/Media/DCIM/101APPLE', [], ['IMG_0002.JPG']),
+            ]
+
+        def it_should_prune_removed_directories(client, tree):
+            tops = []
+            for top, dirs, files in client.walk(tree):
+                tops.append(top)
+                dirs[:] = [entry for entry in dirs if entry.name != 'DCIM']
+
+            assert tops == ['/Media', '/Media/Books']
+
+        def it_should_walk_bottom_up(client, tree):
+            tops = [top for top, _, _ in client.walk(tree, topdown=False)]
+
+            assert tops[-1] == '/Media'
+            assert tops.index('/Media/DCIM/100APPLE') < tops.index('/Media/DCIM')
+
+        def it_should_not_open_connections_it_does_not_need(client, monkeypatch):
+            client.make_directory('/Lonely')
+            with client.open('/Lonely/note.txt', b'w') as f:
+                f.write(b'note')
+            opened = []
+            init = AfcClient.__init__
+
+            def spy_init(extra, *args, **kwargs):
+                opened.append(extra)
+                init(extra, *args, **kwargs)
+
+            monkeypatch.setattr(AfcClient, '__init__', spy_init)
+
+            assert [entry.name for entry in client.scandir('/Lonely', workers=8)] == ['note.txt']
+            assert opened == []
+
+            with client.pool(3) as connections:
+                with connections.checkout() as first, connections.checkout() as second:
+                    assert first is client and second is not client
+                with connections.checkout(), connections.checkout():
+                    pass
+            assert len(opened) == 1 and not opened[0].client
+
+    def describe_sync():
+        @fixture
+        def cache_dir(tmp_path, monkeypatch):
+            monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+            return tmp_path / 'cache'
+
+        @fixture
+        def dest_dir(tmp_path):
+            return tmp_path / 'mirror'
+
+        @fixture
+        def notes(client):
+            client.make_directory('/Notes/2021')
+            for path, data in (('/Notes/todo.txt', b'milk'), ('/Notes/2021/june.txt', b'june')):
+                with client.open(path, b'w') as f:
+                    f.write(data)
+            return '/Notes'
+
+        def it_should_mirror_new_files(client, notes, dest_dir, cache_dir):
+            report = client.sync(notes, str(dest_dir))
+
+            assert sorted(report.added) == ['/Notes/2021/june.txt', '/Notes/todo.txt']
+            assert not report.errors and report.bytes_transferred == 8
+            assert mirrored(dest_dir) == ['2021/june.txt', 'todo.txt']
+            assert (dest_dir / 'todo.txt').stat().st_mtime_ns == client.stat('/Notes/todo.txt').st_mtime_ns
+
+        def it_should_keep_its_manifest_out_of_dest_dir(client, notes, dest_dir, cache_dir):
+            client.sync(notes, str(dest_dir))
+
+            assert mirrored(dest_dir) == ['2021/june.txt', 'todo.txt']
+            assert len(list(cache_dir.rglob('*.json'))) == 1
+
+        def it_should_only_transfer_changes(client, notes, dest_dir, cache_dir):
+            client.sync(notes, str(dest_dir))
+            with client.open('/Notes/todo.txt', b'a') as f:
+                f.write(b' and eggs')
+
+            report = client.sync(notes, str(dest_dir))
+
+            assert report.changed == ['/Notes/todo.txt']
+            assert report.unchanged == ['/Notes/2021/june.txt']
+            assert (dest_dir / 'todo.txt').read_bytes() == b'milk and eggs'
+
+        def it_should_restore_files_missing_locally(client, notes, dest_dir, cache_dir):
+            client.sync(notes, str(dest_dir))
+            (dest_dir / 'todo.txt').unlink()
+
+            assert client.sync(notes, str(dest_dir)).changed == ['/Notes/todo.txt']
+            assert (dest_dir / 'todo.txt').read_bytes() == b'milk'
+
+        def it_should_tombstone_removed_files(client, notes, dest_dir, cache_dir):
+            client.sync(notes, str(dest_dir))
+            client.remove_path('/Notes/todo.txt')
+
+            assert client.sync(notes, str(dest_dir)).removed == ['/Notes/todo.txt']
+            assert (dest_dir / 'todo.txt').exists()
+
+        def it_should_delete_removed_files(client, notes, dest_dir, cache_dir):
+            client.sync(notes, str(dest_dir))
+            client.remove_path('/Notes/todo.txt')
+
+            assert client.sync(notes, str(dest_dir), delete=True).removed == ['/Notes/todo.txt']
+            assert mirrored(dest_dir) == ['2021/june.txt']
+
+        def it_should_change_nothing_in_a_dry_run(client, notes, dest_dir, cache_dir):
+            report = client.sync(notes, str(dest_dir), dry_run=True)
+
+            assert len(report.added) == 2 and not report.transfers
+            assert not dest_dir.exists()
+            assert not cache_dir.exists()
+
+        def it_should_use_an_explicit_manifest(client, notes, dest_dir, cache_dir, tmp_path):
+            manifest = tmp_path / 'notes.json'
+            client.sync(notes, str(dest_dir), manifest_path=str(manifest))
 
-    def it_should_create_a_client():
-        client = AfcClient(device=device)
+            assert manifest.exists()
+            assert not cache_dir.exists()
+            assert client.sync(notes, str(dest_dir), manifest_path=str(manifest)).added == []
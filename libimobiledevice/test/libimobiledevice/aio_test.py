@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+import asyncio
+import threading
+
+from pytest import fixture
+from libimobiledevice import aio
+from libimobiledevice import afc as _afc
+from libimobiledevice.device import Device
+from libimobiledevice.simulator import Simulator
+
+
+UDID = '3ac82354b0a59ba46a03e8ae4937617063e26647'
+PHOTOS = ['/DCIM/IMG_%04d.JPG' % i for i in range(8)]
+
+
+async def connect(udid=UDID):
+    return await aio.AfcClient.connect(await aio.open_device(udid))
+
+
+def describe_aio():
+    @fixture
+    def simulator():
+        with Simulator().activate() as simulator:
+            simulator.add_device(UDID)
+            yield simulator
+        aio.shutdown()
+
+    @fixture
+    def spy(monkeypatch):
+        """Records the pool sizes and the threads every AFC file is opened on."""
+        calls = {'pools': [], 'threads': set()}
+        pool = _afc.AfcClient.pool
+        open_file = _afc.AfcClient.open
+
+        def spy_pool(client, size=_afc.AFC_DEFAULT_WORKERS):
+            calls['pools'].append(size)
+            return pool(client, size)
+
+        def spy_open(client, *args, **kwargs):
+            calls['threads'].add(threading.current_thread().name)
+            return open_file(client, *args, **kwargs)
+
+        monkeypatch.setattr(_afc.AfcClient, 'pool', spy_pool)
+        monkeypatch.setattr(_afc.AfcClient, 'open', spy_open)
+        return calls
+
+    @fixture
+    def photos(simulator):
+        async def write():
+            async with await connect() as client:
+                await client.make_directory('/DCIM')
+                for path in PHOTOS:
+                    await client.write(path, path.encode('utf-8'))
+
+        asyncio.run(write())
+        return PHOTOS
+
+    def it_should_read_and_write(simulator):
+        async def main():
+            async with await connect() as client:
+                assert await client.write('/note.txt', memoryview(b'hello')) == 5
+                assert (await client.stat('/note.txt')).st_size == 5
+                return await client.read('/note.txt'), await client.read('/note.txt', 4)
+
+        assert asyncio.run(main()) == (b'hello', b'hell')
+
+    def it_should_not_ask_an_opened_device_for_its_udid(simulator, monkeypatch):
+        async def main():
+            device = await aio.open_device(UDID)
+            monkeypatch.setattr(Device, 'udid', property(lambda device: 1 / 0))
+            client = await aio.AfcClient.connect(device)
+            await client.close()
+
+        asyncio.run(main())
+
+    def it_should_resolve_other_devices_off_the_event_loop(simulator, monkeypatch):
+        threads = []
+        udid = Device.udid
+
+        def spy_udid(device):
+            threads.append(threading.current_thread())
+            return udid.fget(device)
+
+        async def main():
+            monkeypatch.setattr(Device, 'udid', property(spy_udid))
+            client = await aio.AfcClient.connect(Device(UDID))
+            await client.close()
+
+        asyncio.run(main())
+        assert threads and threading.main_thread() not in threads
+
+    def it_should_pull_on_the_device_executor(photos, spy, tmp_path):
+        async def main():
+            async with await connect() as client:
+                return await client.pull(photos, str(tmp_path), workers=16)
+
+        results = asyncio.run(main())
+
+        assert all(result.ok for result in results)
+        assert (tmp_path / 'DCIM' / 'IMG_0007.JPG').read_bytes() == b'/DCIM/IMG_0007.JPG'
+        assert spy['pools'] == [aio.AIO_DEVICE_WORKERS]
+        assert all(name.startswith('libimobiledevice-%s' % UDID) for name in spy['threads'])
+
+    def it_should_push_on_the_device_executor(simulator, spy, tmp_path):
+        (tmp_path / 'a.txt').write_bytes(b'a')
+        (tmp_path / 'b.txt').write_bytes(b'b')
+
+        async def main():
+            async with await connect() as client:
+                results = await client.push([str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')], '/Uploads')
+                return results, await client.read('/Uploads/b.txt')
+
+        results, data = asyncio.run(main())
+
+        assert all(result.ok for result in results) and data == b'b'
+        assert all(name.startswith('libimobiledevice-%s' % UDID) for name in spy['threads'])
+
+    def it_should_walk(photos, spy):
+        async def main():
+            async with await connect() as client:
+                return [(top, [entry.name for entry in dirs], sorted(entry.name for entry in files))
+                        async for top, dirs, files in client.walk('/', workers=16)]
+
+        assert asyncio.run(main()) == [('/', ['DCIM'], []), ('/DCIM', [], [path[6:] for path in PHOTOS])]
+        assert spy['pools'] == [aio.AIO_DEVICE_WORKERS]
+
+    def it_should_sync(photos, spy, tmp_path, monkeypatch):
+        monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+
+        async def main():
+            async with await connect() as client:
+                return await client.sync('/DCIM', str(tmp_path / 'mirror'), workers=16)
+
+        report = asyncio.run(main())
+
+        assert sorted(report.added) == photos and not report.errors
+        assert spy['pools'] == [aio.AIO_DEVICE_WORKERS, aio.AIO_DEVICE_WORKERS]
+        assert all(name.startswith('libimobiledevice-%s' % UDID) for name in spy['threads'])
@@ -1,8 +1,18 @@
 #!/usr/bin/env python
 
+import asyncio
+import threading
+import time
+
 from pytest import fixture
 from pytest_describe import behaves_like
-from libimobiledevice.device import Device
+from libimobiledevice.afc import AfcClient
+from libimobiledevice.device import Device, DeviceConnectionType, DeviceEventType, DeviceInfo, DeviceLookup, \
+    DeviceMonitor
+from libimobiledevice.simulator import MemoryFilesystem, Simulator
+
+
+UDID = '3ac82354b0a59ba46a03e8ae4937617063e26647'
 
 
 def describe_devices():
@@ -17,4 +27,144 @@ def describe_devices():
         devices = Device.devices()
         device = Device(devices[0])
 
-        assert(device.udid == devices[0])
\ No newline at end of file
+        assert(device.udid == devices[0])
+
+OTHER_UDID = '00008030-001a35e40c38802e'
+USB = DeviceConnectionType.CONNECTION_USBMUXD
+NETWORK = DeviceConnectionType.CONNECTION_NETWORK
+
+
+def connections(infos):
+    return sorted((info.udid, info.connection_type.name, info.address) for info in infos)
+
+
+def connected_over(device):
+    """The connection the simulator served device over, as recorded in its filesystem."""
+    client = AfcClient(device=device)
+    try:
+        return [name for name in client.read_directory('/') if name.startswith('via-')]
+    finally:
+        client.close()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def describe_device_monitor():
+    @fixture
+    def simulator():
+        with Simulator().activate() as simulator:
+            simulator.add_device(UDID)
+            yield simulator
+
+    @fixture
+    def events():
+        return []
+
+    @fixture
+    def monitor(simulator, events):
+        with DeviceMonitor(events.append) as monitor:
+            yield monitor
+
+    def it_should_seed_attached_devices(monitor):
+        assert monitor.running
+        assert monitor.devices == {UDID}
+        wait_for(lambda: monitor.connection_types(UDID))
+        assert monitor.connection_types(UDID) == {DeviceConnectionType.CONNECTION_USBMUXD}
+
+    def it_should_track_added_and_removed_devices(simulator, monitor, events):
+        simulator.add_device(OTHER_UDID)
+        wait_for(lambda: OTHER_UDID in monitor.devices)
+        simulator.remove_device(OTHER_UDID)
+        wait_for(lambda: OTHER_UDID not in monitor.devices)
+
+        assert [(event.event, event.connection_type) for event in events if event.udid == OTHER_UDID] == [
+            (DeviceEventType.IDEVICE_DEVICE_ADD, DeviceConnectionType.CONNECTION_USBMUXD),
+            (DeviceEventType.IDEVICE_DEVICE_REMOVE, DeviceConnectionType.CONNECTION_USBMUXD),
+        ]
+        assert monitor.devices == {UDID}
+        assert monitor.connection_types(OTHER_UDID) == frozenset()
+
+    def it_should_stop_once(monitor):
+        monitor.stop()
+        monitor.stop()
+        assert not monitor.running
+
+    def it_should_iterate_until_stopped(simulator, monitor):
+        threading.Timer(0.1, simulator.add_device, [OTHER_UDID]).start()
+        seen = []
+        for event in monitor:
+            seen.append(event)
+            if event.udid == OTHER_UDID:
+                threading.Timer(0.1, monitor.stop).start()
+
+        assert [event.event for event in seen if event.udid == OTHER_UDID] == [DeviceEventType.IDEVICE_DEVICE_ADD]
+        assert not monitor.running
+
+    def it_should_iterate_asynchronously(simulator, monitor):
+        async def main():
+            asyncio.get_running_loop().call_later(0.1, simulator.add_device, OTHER_UDID)
+            async for event in monitor:
+                if event.udid == OTHER_UDID:
+                    return event
+
+        event = asyncio.run(main())
+        assert event.event == DeviceEventType.IDEVICE_DEVICE_ADD
+        assert monitor.devices == {UDID, OTHER_UDID}
+
+
+def describe_device_lookup():
+    @fixture
+    def simulator():
+        with Simulator().activate() as simulator:
+            for udid, address in ((UDID, None), (UDID, ('192.168.1.20', 62078)), (OTHER_UDID, ('fe80::1', 62078))):
+                filesystem = MemoryFilesystem()
+                filesystem.mkdir('/via-network' if address else '/via-usb')
+                simulator.add_device(udid, filesystem, network_address=address)
+            yield simulator
+
+    def it_should_list_each_device_once(simulator):
+        assert sorted(Device.devices()) == sorted([UDID, OTHER_UDID])
+
+    def it_should_list_every_connection(simulator):
+        assert connections(Device.devices_extended()) == connections([
+            DeviceInfo(UDID, USB),
+            DeviceInfo(UDID, NETWORK, ('192.168.1.20', 62078)),
+            DeviceInfo(OTHER_UDID, NETWORK, ('fe80::1', 62078)),
+        ])
+
+    def it_should_filter_by_connection_type(simulator):
+        assert connections(Device.devices_extended(DeviceLookup.USB_ONLY)) == [(UDID, USB.name, None)]
+        assert [info.udid for info in Device.devices_extended(DeviceLookup.NETWORK_ONLY)] == [UDID, OTHER_UDID]
+
+    def it_should_prefer_a_connection_type(simulator):
+        preferred = {info.udid: info for info in Device.devices_extended(DeviceLookup.PREFER_USB)}
+        assert preferred[UDID].connection_type == USB
+        assert preferred[OTHER_UDID].connection_type == NETWORK
+
+        preferred = {info.udid: info for info in Device.devices_extended(DeviceLookup.PREFER_NETWORK)}
+        assert preferred[UDID].address == ('192.168.1.20', 62078)
+        assert repr(preferred[UDID]) == '<DeviceInfo: %s via CONNECTION_NETWORK at 192.168.1.20>' % UDID
+
+    def it_should_open_the_listed_connection(simulator):
+        for info in Device.devices_extended():
+            device = info.open()
+            assert device.udid == info.udid
+            assert connected_over(device) == ['via-network' if info.is_network else 'via-usb']
+
+    def it_should_open_by_lookup(simulator):
+        assert connected_over(Device(UDID, DeviceLookup.PREFER_NETWORK)) == ['via-network']
+        assert connected_over(Device(UDID, DeviceLookup.PREFER_USB)) == ['via-usb']
+        assert connected_over(Device(OTHER_UDID, DeviceLookup.PREFER_USB)) == ['via-network']
+
+    def it_should_track_connections_per_device(simulator):
+        with DeviceMonitor() as monitor:
+            wait_for(lambda: len(monitor.connection_types(UDID)) == 2)
+            simulator.remove_device(UDID, network=True)
+            wait_for(lambda: monitor.connection_types(UDID) == {USB})
+            simulator.remove_device(UDID)
+            wait_for(lambda: UDID not in monitor.devices)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+from pytest import fixture, raises
+from libimobiledevice.afc import AfcClient
+from libimobiledevice.pool import DevicePool
+from libimobiledevice.simulator import Simulator
+
+
+UDID = '3ac82354b0a59ba46a03e8ae4937617063e26647'
+
+
+def describe_device_pool():
+    @fixture
+    def simulator():
+        with Simulator().activate() as simulator:
+            simulator.add_device(UDID)
+            yield simulator
+
+    @fixture
+    def pool(simulator):
+        with DevicePool(max_sessions=1) as pool:
+            yield pool
+
+    def it_should_reuse_returned_clients(pool):
+        with pool.checkout(UDID, AfcClient) as first:
+            first.make_directory('/Pooled')
+        with pool.checkout(UDID, AfcClient) as second:
+            assert second.stat('/Pooled').st_ifmt == 'S_IFDIR'
+
+        assert second is first
+        assert pool.metrics.snapshot() == {'hits': 1, 'misses': 1, 'reconnects': 0, 'evictions': 0}
+
+    def it_should_time_out_without_a_free_session(pool):
+        with pool.checkout(UDID, AfcClient):
+            with raises(TimeoutError):
+                with pool.checkout(UDID, AfcClient, timeout=0.05):
+                    pass
+
+        with pool.checkout(UDID, AfcClient, timeout=0.05) as client:
+            assert client.get_device_info() is not None
+
+    def it_should_close_clients_whose_use_raised(pool):
+        with raises(RuntimeError):
+            with pool.checkout(UDID, AfcClient) as failed:
+                raise RuntimeError("not a BaseError")
+
+        with pool.checkout(UDID, AfcClient) as client:
+            assert client is not failed
+
+        assert not failed.client
+        assert pool.metrics.misses == 2 and pool.metrics.hits == 0
+
+    def it_should_evict_idle_clients(pool):
+        with pool.checkout(UDID, AfcClient) as client:
+            pass
+
+        assert pool.evict_idle(max_idle=-1.0) == 1
+        assert not client.client
+        assert pool.metrics.evictions == 1
+
+    def it_should_close_clients_of_devices_evicted_during_checkout(pool, monkeypatch):
+        acquire = pool._acquire
+
+        def evicting_acquire(*args):
+            client = acquire(*args)
+            pool.close()
+            return client
+
+        monkeypatch.setattr(pool, '_acquire', evicting_acquire)
+        with pool.checkout(UDID, AfcClient) as client:
+            pass
+
+        assert not client.client
+
+    def it_should_reconnect_clients_failing_their_health_check(pool, monkeypatch):
+        with pool.checkout(UDID, AfcClient) as first:
+            pass
+        monkeypatch.setattr(AfcClient, 'get_device_info', lambda client: [])
+
+        with pool.checkout(UDID, AfcClient) as second:
+            assert second is not first
+
+        assert not first.client
+        assert pool.metrics.reconnects == 1
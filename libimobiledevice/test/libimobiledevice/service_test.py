@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+import asyncio
+import plistlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from pytest import fixture, raises, skip
+from libimobiledevice import aio
+from libimobiledevice import service as _service
+from libimobiledevice.service import FRAME_HEADER, PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT, PropertyListService, \
+    PropertyListServiceError
+from plist import libplist
+
+
+MESSAGES = [{'Request': 'GetValue', 'Key': 'ProductVersion'}, {'Value': '15.0'}, {'Status': 'Complete'}]
+
+
+class ScriptedService(PropertyListService):
+    """Receives the scripted chunks in order; an int in the script is returned as an error code."""
+
+    def __init__(self, script):
+        self.script = deque(script)
+        self.sent = bytearray()
+        self.reads = 0
+
+    def _receive(self, c_node):
+        c_node.value = libplist.native_to_plist_t(self.script.popleft())
+        return 0
+
+    def _receive_with_timeout(self, c_node, timeout_ms):
+        self.reads += 1
+        return PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT
+
+    def _send_raw(self, data, size, sent):
+        self.sent += data[:size]
+        sent.value = size
+        return 0
+
+    def _receive_raw(self, buffer, size, received):
+        self.reads += 1
+        chunk = self.script.popleft() if self.script else PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT
+        if isinstance(chunk, int):
+            received.value = 0
+            return chunk
+        if len(chunk) > size:
+            self.script.appendleft(chunk[size:])
+            chunk = chunk[:size]
+        buffer[:len(chunk)] = chunk
+        received.value = len(chunk)
+        return 0
+
+    def _receive_raw_with_timeout(self, buffer, size, received, timeout_ms):
+        return self._receive_raw(buffer, size, received)
+
+
+def frame(value, fmt=plistlib.FMT_BINARY):
+    data = plistlib.dumps(value, fmt=fmt)
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def chopped(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def describe_property_list_service():
+    @fixture
+    def stream():
+        return b''.join(frame(message) for message in MESSAGES)
+
+    def it_should_read_ahead_in_one_chunk(stream):
+        service = ScriptedService([stream])
+
+        assert [service.receive_native() for _ in MESSAGES] == MESSAGES
+        assert service.reads == 1
+
+    def it_should_join_partial_frames(stream):
+        service = ScriptedService(chopped(stream, 3))
+
+        assert service.receive_many(2) == MESSAGES[:2]
+        assert service.receive_many(1) == MESSAGES[2:]
+
+    def it_should_decode_xml_frames():
+        service = ScriptedService([frame(MESSAGES[0], plistlib.FMT_XML)])
+
+        assert service.receive_native() == MESSAGES[0]
+
+    def it_should_keep_messages_received_before_a_timeout(stream):
+        service = ScriptedService([stream[:-5], PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT, stream[-5:]])
+
+        with raises(PropertyListServiceError) as error:
+            service.receive_many(3)
+
+        assert service.is_receive_timeout(error.value)
+        assert service.receive_many(3) == MESSAGES
+
+    def it_should_poll_until_an_async_receive_times_out():
+        service = ScriptedService([])
+        try:
+            with raises(asyncio.TimeoutError):
+                asyncio.run(aio.PropertyListService(service).areceive(timeout=0.05))
+        finally:
+            aio.shutdown()
+
+        assert service.reads > 1
+
+    def it_should_drop_only_a_malformed_frame(stream):
+        malformed = b'bplist00' + bytes(4)
+        service = ScriptedService([frame(MESSAGES[0]) + FRAME_HEADER.pack(len(malformed)) + malformed +
+                                   frame(MESSAGES[1])])
+
+        with raises(ValueError):
+            service.receive_many(3)
+
+        assert service.receive_many(2) == MESSAGES[:2]
+        with raises(PropertyListServiceError):
+            service.receive_native()
+
+    def it_should_send_framed_messages():
+        service = ScriptedService([])
+        for message in MESSAGES:
+            service.send_native(message)
+
+        assert ScriptedService([bytes(service.sent)]).receive_many(3) == MESSAGES
+
+    def it_should_match_pipelined_replies(stream):
+        service = ScriptedService(chopped(stream, 7))
+        with service.batch(depth=2) as pipeline:
+            futures = [pipeline.submit({'Request': index}) for index in range(3)]
+
+        assert [future.result() for future in futures] == MESSAGES
+        assert ScriptedService([bytes(service.sent)]).receive_many(3) == [{'Request': index} for index in range(3)]
+
+    def it_should_decode_nodes_with_the_plist_package():
+        assert _service.plist_t_to_node is libplist.plist_t_to_node
+        assert _service.Node is libplist.Node
+
+    def it_should_receive_lazy_nodes():
+        if libplist.LIBPLIST is None:
+            skip("libplist is not installed")
+        service = ScriptedService([MESSAGES[0]])
+
+        node = service.receive(lazy=True)
+
+        assert isinstance(node, libplist.Dict) and node.get_value() == MESSAGES[0]
+
+    def it_should_leave_a_timed_out_request_outstanding(stream):
+        first = frame(MESSAGES[0])
+        service = ScriptedService([first[:-3], PROPERTY_LIST_SERVICE_E_RECEIVE_TIMEOUT, first[-3:]])
+        future = service.pipeline().submit({'Request': 0})
+
+        with raises(FutureTimeoutError):
+            future.result(timeout=1)
+
+        assert not future.done()
+        assert future.result(timeout=1) == MESSAGES[0]
+
+    def it_should_resolve_futures_waited_on_from_other_threads(stream):
+        service = ScriptedService(chopped(stream, 5))
+        pipeline = service.pipeline(depth=3)
+        futures = [pipeline.submit({'Request': index}) for index in range(3)]
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(lambda future: future.result(), reversed(futures)))
+
+        assert results == MESSAGES[::-1]
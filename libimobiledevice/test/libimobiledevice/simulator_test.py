@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+import plistlib
+import socket
+import struct
+
+from pytest import fixture
+from libimobiledevice.simulator import Simulator
+from libimobiledevice.simulator.afc import AFC_HEADER, AFC_MAGIC, AFC_OP_DATA, AFC_OP_FILE_OPEN, AFC_OP_FILE_READ, \
+    AFC_OP_FILE_WRITE, AFC_OP_FILE_CLOSE, AFC_OP_STATUS, AFC_OP_FILE_OPEN_RES, AFC_OP_READ_DIR
+from libimobiledevice.simulator.lockdown import LOCKDOWN_PORT
+from libimobiledevice.simulator.usbmux import USBMUX_HEADER
+
+
+def usbmux_request(sock, message):
+    data = plistlib.dumps(message)
+    sock.sendall(USBMUX_HEADER.pack(USBMUX_HEADER.size + len(data), 1, 8, 1) + data)
+    length = USBMUX_HEADER.unpack(sock.recv(USBMUX_HEADER.size, socket.MSG_WAITALL))[0]
+    return plistlib.loads(sock.recv(length - USBMUX_HEADER.size, socket.MSG_WAITALL))
+
+
+def lockdown_request(sock, message):
+    data = plistlib.dumps(message)
+    sock.sendall(struct.pack('>I', len(data)) + data)
+    length = struct.unpack('>I', sock.recv(4, socket.MSG_WAITALL))[0]
+    return plistlib.loads(sock.recv(length, socket.MSG_WAITALL))
+
+
+def afc_request(sock, operation, params=b'', payload=b''):
+    this_length = AFC_HEADER.size + len(params)
+    sock.sendall(AFC_HEADER.pack(AFC_MAGIC, this_length + len(payload), this_length, 0, operation) + params + payload)
+    _, entire_length, _, _, operation = AFC_HEADER.unpack(sock.recv(AFC_HEADER.size, socket.MSG_WAITALL))
+    return operation, sock.recv(entire_length - AFC_HEADER.size, socket.MSG_WAITALL)
+
+
+def connect(simulator, port):
+    sock = socket.socket(socket.AF_UNIX)
+    sock.connect(simulator.socket_path)
+    result = usbmux_request(sock, {'MessageType': 'Connect', 'DeviceID': 1, 'PortNumber': socket.htons(port)})
+    assert result['Number'] == 0
+    return sock
+
+
+def describe_simulator():
+    @fixture
+    def simulator():
+        with Simulator() as simulator:
+            simulator.add_device('3ac82354b0a59ba46a03e8ae4937617063e26647')
+            yield simulator
+
+    def it_should_list_devices(simulator):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.connect(simulator.socket_path)
+        devices = usbmux_request(sock, {'MessageType': 'ListDevices'})['DeviceList']
+        sock.close()
+
+        assert [device['Properties']['SerialNumber'] for device in devices] == \
+            ['3ac82354b0a59ba46a03e8ae4937617063e26647']
+
+    def it_should_start_services_in_a_session(simulator):
+        lockdown = connect(simulator, LOCKDOWN_PORT)
+        assert lockdown_request(lockdown, {'Request': 'QueryType'})['Type'] == 'com.apple.mobile.lockdown'
+        assert 'Error' in lockdown_request(lockdown, {'Request': 'StartService', 'Service': 'com.apple.afc'})
+
+        lockdown_request(lockdown, {'Request': 'StartSession'})
+        assert lockdown_request(lockdown, {'Request': 'StartService', 'Service': 'com.apple.afc'})['Port']
+
+    def it_should_serve_afc(simulator):
+        lockdown = connect(simulator, LOCKDOWN_PORT)
+        lockdown_request(lockdown, {'Request': 'StartSession'})
+        port = lockdown_request(lockdown, {'Request': 'StartService', 'Service': 'com.apple.afc'})['Port']
+        afc = connect(simulator, port)
+
+        operation, data = afc_request(afc, AFC_OP_FILE_OPEN, struct.pack('<Q', 3) + b'/photo.jpg\0')
+        assert operation == AFC_OP_FILE_OPEN_RES
+        handle = struct.unpack('<Q', data)[0]
+        assert afc_request(afc, AFC_OP_FILE_WRITE, struct.pack('<Q', handle), b'jpeg') == \
+            (AFC_OP_STATUS, bytes(8))
+        afc_request(afc, AFC_OP_FILE_CLOSE, struct.pack('<Q', handle))
+
+        handle = struct.unpack('<Q', afc_request(afc, AFC_OP_FILE_OPEN, struct.pack('<Q', 1) + b'/photo.jpg\0')[1])[0]
+        assert afc_request(afc, AFC_OP_FILE_READ, struct.pack('<QQ', handle, 100)) == (AFC_OP_DATA, b'jpeg')
+        assert afc_request(afc, AFC_OP_READ_DIR, b'/\0') == (AFC_OP_DATA, b'.\0..\0photo.jpg\0')
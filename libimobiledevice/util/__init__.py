@@ -1,5 +1,11 @@
 from ctypes import *
 from typing import *
+import socket
+
+
+# usbmuxd reports network addresses as Darwin sockaddrs, whatever the host
+DARWIN_AF_INET = 0x02
+DARWIN_AF_INET6 = 0x1E
 
 
 def parse_c_string_list(list) -> List[str]:
@@ -13,3 +19,23 @@ def parse_c_string_list(list) -> List[str]:
         domain = list[index]
 
     return result
+
+
+def darwin_sockaddr(address: Tuple[str, int]) -> bytes:
+    host, port = address
+    if ':' in host:
+        return bytes([28, DARWIN_AF_INET6]) + port.to_bytes(2, 'big') + bytes(4) + \
+            socket.inet_pton(socket.AF_INET6, host) + bytes(4)
+    return bytes([16, DARWIN_AF_INET]) + port.to_bytes(2, 'big') + socket.inet_pton(socket.AF_INET, host) + bytes(8)
+
+
+def parse_darwin_sockaddr(data: bytes) -> Optional[Tuple[str, int]]:
+    if len(data) < 2:
+        return None
+
+    family = data[1]
+    if family == DARWIN_AF_INET and len(data) >= 8:
+        return socket.inet_ntop(socket.AF_INET, data[4:8]), int.from_bytes(data[2:4], 'big')
+    if family == DARWIN_AF_INET6 and len(data) >= 24:
+        return socket.inet_ntop(socket.AF_INET6, data[8:24]), int.from_bytes(data[2:4], 'big')
+    return None
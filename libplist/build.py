@@ -0,0 +1,38 @@
+import os
+
+# See if Cython is installed
+try:
+    from Cython.Build import cythonize
+# Do nothing if Cython is not available, plist.bindings falls back to the ctypes binding
+except ImportError:
+    # Got to provide this function. Otherwise, poetry will fail
+    def build(setup_kwargs):
+        pass
+# Cython is installed. Compile
+else:
+    from setuptools import Extension
+    from distutils.command.build_ext import build_ext
+
+    # This function will be executed in setup.py:
+    def build(setup_kwargs):
+        # The compiled binding links against the same library libplist.py loads at runtime
+        extensions = [
+            Extension(
+                'plist.plist',
+                ['plist/plist.pyx'],
+                libraries=['plist-2.0'],
+                include_dirs=[path for path in os.environ.get('LIBPLIST_INCLUDE', '').split(os.pathsep) if path],
+            )
+        ]
+
+        # gcc arguments hack: enable optimizations
+        os.environ['CFLAGS'] = '-O3'
+
+        # Build
+        setup_kwargs.update({
+            'ext_modules': cythonize(
+                extensions,
+                language_level=3,
+            ),
+            'cmdclass': {'build_ext': build_ext}
+        })
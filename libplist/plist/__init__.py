@@ -1 +1,6 @@
 __version__ = '0.1.0'
+
+from .batch import load_dir, loads_many
+from .bplist import load_mmap
+from .diff import diff, patch
+from .xmlplist import iterparse
@@ -0,0 +1,129 @@
+"""Decode many small property lists at once, fanned out over a process pool."""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import *
+import os
+
+
+DEFAULT_CHUNKSIZE = 64
+
+
+class PlistResult(object):
+    """The outcome for one input: either value or error is set."""
+    __slots__ = ('index', 'source', 'value', 'error')
+
+    index: int
+    source: object
+    value: object
+    error: Optional[BaseException]
+
+    def __init__(self, index: int, source: object, value: object = None, error: BaseException = None):
+        self.index = index
+        self.source = source
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return '<PlistResult: %d %r error=%r>' % (self.index, self.source, self.error)
+        return '<PlistResult: %d %r>' % (self.index, self.source)
+
+
+def _decode(data) -> object:
+    # Imported here so only workers pay for loading libplist
+    from . import libplist
+    value = libplist.loads(data, native=True)
+    if value is None:
+        # libplist reports unparseable input as an empty result rather than an error
+        raise ValueError('Not a property list')
+    return value
+
+
+def _decode_chunk(chunk: List[Tuple[int, object, object]], from_files: bool) -> List[PlistResult]:
+    results = []
+    for index, source, data in chunk:
+        try:
+            if from_files:
+                with open(data, 'rb') as fp:
+                    data = fp.read()
+            results.append(PlistResult(index, source, _decode(data)))
+        except Exception as e:
+            results.append(PlistResult(index, source, error=e))
+    return results
+
+
+def _chunks(items: Iterable[Tuple[int, object, object]], chunksize: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _drain(pending: deque, ordered: bool) -> Iterator[PlistResult]:
+    """Yields the results of at least one finished chunk, the oldest one when ordered."""
+    if ordered:
+        yield from pending.popleft().result()
+        return
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        yield from future.result()
+
+
+def _run(items: Iterable[Tuple[int, object, object]], from_files: bool, workers: Optional[int], chunksize: int,
+         ordered: bool) -> Iterator[PlistResult]:
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+
+    if workers is not None and workers <= 1:
+        for chunk in _chunks(items, chunksize):
+            yield from _decode_chunk(chunk, from_files)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Two chunks per worker keeps every process busy without queueing the whole input
+        window = 2 * (workers or os.cpu_count() or 1)
+        chunks = _chunks(items, chunksize)
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append(executor.submit(_decode_chunk, chunk, from_files))
+            if len(pending) >= window:
+                yield from _drain(pending, ordered)
+
+        while pending:
+            yield from _drain(pending, ordered)
+
+
+def loads_many(iterable: Iterable, workers: int = None, chunksize: int = DEFAULT_CHUNKSIZE,
+               ordered: bool = True) -> Iterator[PlistResult]:
+    """Decode each XML or binary plist in iterable to native objects.
+
+    Results come back in input order, or as soon as their chunk is done when
+    ordered is False. A plist that fails to decode yields a result with its
+    error set instead of stopping the batch. workers=1 decodes in-process.
+    """
+    return _run(((index, index, data) for index, data in enumerate(iterable)), False, workers, chunksize, ordered)
+
+
+def load_dir(path: str, pattern: str = '*.plist', recursive: bool = True, workers: int = None,
+             chunksize: int = DEFAULT_CHUNKSIZE, ordered: bool = True) -> Iterator[PlistResult]:
+    """Decode every file under path matching pattern, see loads_many().
+
+    Workers read the files themselves, so only paths and decoded values
+    cross process boundaries. Each result's source is the file path.
+    """
+    root = Path(path)
+    paths = root.rglob(pattern) if recursive else root.glob(pattern)
+    files = (str(file) for file in paths if file.is_file())
+    return _run(((index, file, file) for index, file in enumerate(files)), True, workers, chunksize, ordered)
@@ -0,0 +1,69 @@
+"""The libplist node API, from the compiled extension when it is built and through ctypes otherwise.
+
+Both bindings expose the same names, so code written against this module
+runs unchanged on either. Set PLIST_BINDING=ctypes to force the fallback.
+"""
+
+import os
+from types import ModuleType
+from typing import Optional
+
+BINDING_CYTHON = 'cython'
+BINDING_CTYPES = 'ctypes'
+
+
+def compiled_binding() -> Optional[ModuleType]:
+    """The compiled extension, or None when it is not built or its libplist cannot be loaded."""
+    try:
+        from . import plist as compiled
+        return compiled
+    except ImportError:
+        return None
+
+
+def native_bindings() -> dict:
+    """Every binding by name, None for those that cannot reach libplist here."""
+    from . import libplist
+    return {
+        BINDING_CTYPES: libplist if libplist.LIBPLIST is not None else None,
+        BINDING_CYTHON: compiled_binding(),
+    }
+
+
+def _load_binding():
+    if os.environ.get('PLIST_BINDING') != BINDING_CTYPES:
+        compiled = compiled_binding()
+        if compiled is not None:
+            return BINDING_CYTHON, compiled
+
+    from . import libplist
+    return BINDING_CTYPES, libplist
+
+
+BINDING, _binding = _load_binding()
+
+Node = _binding.Node
+Bool = _binding.Bool
+Integer = _binding.Integer
+Real = _binding.Real
+Uid = _binding.Uid
+Key = _binding.Key
+String = _binding.String
+Date = _binding.Date
+Data = _binding.Data
+Dict = _binding.Dict
+Array = _binding.Array
+
+from_xml = _binding.from_xml
+from_bin = _binding.from_bin
+load = _binding.load
+loads = _binding.loads
+dump = _binding.dump
+dumps = _binding.dumps
+plist_t_to_node = _binding.plist_t_to_node
+plist_t_to_native = _binding.plist_t_to_native
+
+FMT_XML = _binding.FMT_XML
+FMT_BINARY = _binding.FMT_BINARY
+BACKEND_LIBPLIST = _binding.BACKEND_LIBPLIST
+BACKEND_PYTHON = _binding.BACKEND_PYTHON
@@ -0,0 +1,471 @@
+from collections.abc import Mapping, Sequence as SequenceABC
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from plistlib import UID
+from struct import pack, unpack_from
+from typing import *
+import mmap
+
+
+BPLIST_MAGIC = b'bplist00'
+BPLIST_TRAILER_SIZE = 32
+
+MAC_EPOCH_DATETIME = datetime(2001, 1, 1)
+
+_INT_FORMATS = {1: 'B', 2: 'H', 4: 'L', 8: 'Q'}
+
+# Scalars that are written once and referenced from every place they occur
+_DEDUPLICATED_TYPES = (str, bytes, int, float, datetime, UID)
+
+
+def _unpack_uints(buffer: memoryview, offset: int, size: int, count: int) -> Sequence[int]:
+    if offset + size * count > len(buffer):
+        raise ValueError('Truncated binary property list at offset %d' % offset)
+
+    fmt = _INT_FORMATS.get(size)
+    if fmt is not None:
+        return unpack_from('>%d%s' % (count, fmt), buffer, offset)
+
+    # Odd widths (3, 5, 6, 7 bytes) are legal but have no struct format
+    return [int.from_bytes(buffer[offset + i * size:offset + (i + 1) * size], 'big') for i in range(count)]
+
+
+def _byte_view(data) -> memoryview:
+    buffer = memoryview(data)
+    if buffer.format != 'B' or buffer.ndim != 1:
+        buffer = buffer.cast('B')
+    return buffer
+
+
+def _read_trailer(buffer: memoryview) -> Tuple[int, int, int, int, int]:
+    """(offset_size, ref_size, num_objects, top_object, offset_table) of a bplist00 buffer."""
+    if len(buffer) < len(BPLIST_MAGIC) + BPLIST_TRAILER_SIZE or buffer[:8] != BPLIST_MAGIC:
+        raise ValueError('Not a binary property list')
+
+    offset_size, ref_size, num_objects, top_object, offset_table = \
+        unpack_from('>6xBBQQQ', buffer, len(buffer) - BPLIST_TRAILER_SIZE)
+
+    if offset_size == 0 or ref_size == 0 or top_object >= num_objects or \
+            offset_table + offset_size * num_objects > len(buffer):
+        raise ValueError('Invalid binary property list trailer')
+
+    return offset_size, ref_size, num_objects, top_object, offset_table
+
+
+class BinaryPlistReader(object):
+    _buffer: memoryview
+    _offsets: Sequence[int]
+    _ref_size: int
+    _objects: list
+
+    def __init__(self, data):
+        buffer = _byte_view(data)
+        offset_size, self._ref_size, num_objects, self._top_object, offset_table = _read_trailer(buffer)
+
+        self._buffer = buffer
+        self._offsets = _unpack_uints(buffer, offset_table, offset_size, num_objects)
+        self._objects = [None] * num_objects
+        self._decoded = bytearray(num_objects)
+
+    def parse(self) -> object:
+        return self._read_object(self._top_object)
+
+    def _read_refs(self, offset: int, count: int) -> Sequence[int]:
+        return _unpack_uints(self._buffer, offset, self._ref_size, count)
+
+    def _check_bounds(self, offset: int, size: int):
+        if offset + size > len(self._buffer):
+            raise ValueError('Truncated binary property list at offset %d' % offset)
+
+    def _read_count(self, offset: int, marker_low: int) -> Tuple[int, int]:
+        if marker_low != 0xF:
+            return marker_low, offset + 1
+
+        self._check_bounds(offset, 2)
+        int_marker = self._buffer[offset + 1]
+        if int_marker & 0xF0 != 0x10:
+            raise ValueError('Invalid object length at offset %d' % offset)
+        size = 1 << (int_marker & 0x0F)
+        self._check_bounds(offset + 2, size)
+        return int.from_bytes(self._buffer[offset + 2:offset + 2 + size], 'big'), offset + 2 + size
+
+    def _read_object(self, ref: int) -> object:
+        if ref >= len(self._decoded):
+            raise ValueError('Object reference %d out of range' % ref)
+
+        decoded = self._decoded[ref]
+        if decoded == 1:
+            return self._objects[ref]
+        if decoded == 2:
+            raise ValueError('Recursive object reference %d' % ref)
+
+        self._decoded[ref] = 2
+        result = self._decode(self._offsets[ref])
+        self._objects[ref] = result
+        self._decoded[ref] = 1
+        return result
+
+    def _decode(self, offset: int) -> object:
+        buffer = self._buffer
+        self._check_bounds(offset, 1)
+        marker = buffer[offset]
+        marker_high = marker & 0xF0
+        marker_low = marker & 0x0F
+
+        if marker == 0x00:
+            return None
+        if marker == 0x08:
+            return False
+        if marker == 0x09:
+            return True
+        if marker_high == 0x10:
+            size = 1 << marker_low
+            self._check_bounds(offset + 1, size)
+            return int.from_bytes(buffer[offset + 1:offset + 1 + size], 'big', signed=size >= 8)
+        if marker == 0x22:
+            self._check_bounds(offset + 1, 4)
+            return unpack_from('>f', buffer, offset + 1)[0]
+        if marker == 0x23:
+            self._check_bounds(offset + 1, 8)
+            return unpack_from('>d', buffer, offset + 1)[0]
+        if marker == 0x33:
+            self._check_bounds(offset + 1, 8)
+            try:
+                return MAC_EPOCH_DATETIME + timedelta(seconds=unpack_from('>d', buffer, offset + 1)[0])
+            except OverflowError:
+                raise ValueError('Date out of range at offset %d' % offset) from None
+        if marker_high == 0x80:
+            self._check_bounds(offset + 1, marker_low + 1)
+            return UID(int.from_bytes(buffer[offset + 1:offset + 2 + marker_low], 'big'))
+
+        count, start = self._read_count(offset, marker_low)
+
+        if marker_high == 0x40:
+            self._check_bounds(start, count)
+            return bytes(buffer[start:start + count])
+        if marker_high == 0x50:
+            self._check_bounds(start, count)
+            return str(buffer[start:start + count], 'ascii')
+        if marker_high == 0x60:
+            self._check_bounds(start, count * 2)
+            return str(buffer[start:start + count * 2], 'utf-16be')
+        if marker_high == 0xA0:
+            return self._decode_array(start, count)
+        if marker_high == 0xD0:
+            return self._decode_dict(start, count, offset)
+
+        raise ValueError('Unknown object marker 0x%02x at offset %d' % (marker, offset))
+
+    def _decode_array(self, start: int, count: int) -> list:
+        return [self._read_object(ref) for ref in self._read_refs(start, count)]
+
+    def _decode_dict(self, start: int, count: int, offset: int) -> dict:
+        refs = self._read_refs(start, count * 2)
+        result = {}
+        for i in range(count):
+            key = self._read_object(refs[i])
+            if not isinstance(key, str):
+                raise ValueError('Dictionary key at offset %d is not a string' % offset)
+            result[key] = self._read_object(refs[count + i])
+        return result
+
+
+class LazyBinaryPlistReader(BinaryPlistReader):
+    """Decodes objects only when they are accessed, straight out of the buffer.
+
+    Neither the offset table nor the objects are copied up front, so a
+    memory mapped file is only paged in where it is read. Dictionaries and
+    arrays come back as read-only BinaryPlistDict and BinaryPlistArray views.
+    """
+    _offset_size: int
+    _offset_table: int
+
+    def __init__(self, data):
+        buffer = _byte_view(data)
+        self._offset_size, self._ref_size, self._num_objects, self._top_object, self._offset_table = \
+            _read_trailer(buffer)
+        self._buffer = buffer
+
+    def _object_offset(self, ref: int) -> int:
+        if ref >= self._num_objects:
+            raise ValueError('Object reference %d out of range' % ref)
+        return _unpack_uints(self._buffer, self._offset_table + ref * self._offset_size, self._offset_size, 1)[0]
+
+    def _read_object(self, ref: int) -> object:
+        return self._decode(self._object_offset(ref))
+
+    def _decode_array(self, start: int, count: int) -> 'BinaryPlistArray':
+        return BinaryPlistArray(self, start, count)
+
+    def _decode_dict(self, start: int, count: int, offset: int) -> 'BinaryPlistDict':
+        return BinaryPlistDict(self, start, count, offset)
+
+
+# Lookups on a BinaryPlistDict scan its keys until this many have been made, then index them
+BINARY_PLIST_DICT_SCAN_LIMIT = 8
+BINARY_PLIST_SCAN_BATCH = 4096
+
+
+class BinaryPlistDict(Mapping):
+    """A dictionary in a lazily read binary plist, values are decoded on every lookup."""
+    __slots__ = ('_reader', '_start', '_count', '_offset', '_index', '_scans')
+
+    def __init__(self, reader: LazyBinaryPlistReader, start: int, count: int, offset: int):
+        self._reader = reader
+        self._start = start
+        self._count = count
+        self._offset = offset
+        self._index = None
+        self._scans = 0
+
+    def _scan(self, key: str) -> Optional[int]:
+        # Compares the encoded key against each key object in place, nothing is decoded
+        reader = self._reader
+        buffer = reader._buffer
+        target = BinaryPlistWriter()._encode(key)
+        ref_size = reader._ref_size
+        # Key refs are read in batches so huge dictionaries never materialize their whole ref list
+        for first in range(0, self._count, BINARY_PLIST_SCAN_BATCH):
+            batch = min(BINARY_PLIST_SCAN_BATCH, self._count - first)
+            for i, ref in enumerate(reader._read_refs(self._start + first * ref_size, batch)):
+                offset = reader._object_offset(ref)
+                if buffer[offset:offset + len(target)] == target:
+                    return reader._read_refs(self._start + (self._count + first + i) * ref_size, 1)[0]
+        return None
+
+    def _refs_by_key(self) -> Dict[str, int]:
+        # Only the keys are decoded, once, the first time the dictionary is used
+        if self._index is None:
+            reader = self._reader
+            refs = reader._read_refs(self._start, self._count * 2)
+            index = {}
+            for i in range(self._count):
+                key = reader._read_object(refs[i])
+                if not isinstance(key, str):
+                    raise ValueError('Dictionary key at offset %d is not a string' % self._offset)
+                index[key] = refs[self._count + i]
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key: str) -> object:
+        if self._index is None and self._scans < BINARY_PLIST_DICT_SCAN_LIMIT and isinstance(key, str):
+            self._scans += 1
+            ref = self._scan(key)
+            if ref is not None:
+                return self._reader._read_object(ref)
+            # Writers may encode an ASCII key as UTF-16, only the decoded index is authoritative
+
+        return self._reader._read_object(self._refs_by_key()[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._refs_by_key())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __repr__(self):
+        return '<BinaryPlistDict: %d keys>' % self._count
+
+
+class BinaryPlistArray(SequenceABC):
+    """An array in a lazily read binary plist, items are decoded on every access."""
+    __slots__ = ('_reader', '_start', '_count')
+
+    def __init__(self, reader: LazyBinaryPlistReader, start: int, count: int):
+        self._reader = reader
+        self._start = start
+        self._count = count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('array index out of range')
+
+        reader = self._reader
+        return reader._read_object(reader._read_refs(self._start + index * reader._ref_size, 1)[0])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, BinaryPlistArray)):
+            return NotImplemented
+        return len(other) == self._count and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return '<BinaryPlistArray: %d items>' % self._count
+
+
+def _int_size(value: int) -> int:
+    if value < 1 << 8:
+        return 1
+    if value < 1 << 16:
+        return 2
+    if value < 1 << 32:
+        return 4
+    return 8
+
+
+class BinaryPlistWriter(object):
+    _objects: list
+    _refs: Dict[tuple, int]
+    _sort_keys: bool
+    _skipkeys: bool
+
+    def __init__(self, sort_keys: bool = True, skipkeys: bool = False):
+        self._sort_keys = sort_keys
+        self._skipkeys = skipkeys
+
+    def write(self, value, fp=None) -> Optional[bytes]:
+        """Encode value into fp one object at a time, or return the encoding when fp is None."""
+        self._objects = []
+        self._refs = {}
+        self._flatten(value)
+        # The de-duplication table is only needed while flattening
+        self._refs = {}
+
+        num_objects = len(self._objects)
+        self._ref_size = _int_size(num_objects)
+
+        out = fp if fp is not None else BytesIO()
+        out.write(BPLIST_MAGIC)
+        offsets = []
+        position = len(BPLIST_MAGIC)
+        for obj in self._objects:
+            offsets.append(position)
+            chunk = self._encode(obj)
+            out.write(chunk)
+            position += len(chunk)
+        self._objects = []
+
+        offset_size = _int_size(position)
+        offset_format = '>%d%s' % (num_objects, _INT_FORMATS[offset_size])
+        out.write(pack(offset_format, *offsets))
+        out.write(pack('>6xBBQQQ', offset_size, self._ref_size, num_objects, 0, position))
+
+        if fp is None:
+            return out.getvalue()
+        return None
+
+    def _flatten(self, value) -> int:
+        ref = len(self._objects)
+
+        if isinstance(value, dict):
+            items = value.items()
+            if self._skipkeys:
+                items = [(key, item) for key, item in items if isinstance(key, str)]
+            items = sorted(items) if self._sort_keys else list(items)
+            entry = [value, [], []]
+            self._objects.append(entry)
+            for key, _ in items:
+                if not isinstance(key, str):
+                    raise TypeError('Dictionary keys must be strings, got %s' % type(key))
+                entry[1].append(self._flatten(key))
+            for _, item in items:
+                entry[2].append(self._flatten(item))
+        elif isinstance(value, (list, tuple)):
+            entry = [value, []]
+            self._objects.append(entry)
+            for item in value:
+                entry[1].append(self._flatten(item))
+        elif isinstance(value, _DEDUPLICATED_TYPES):
+            # Keyed by type as well, True == 1 and 1 == 1.0 must stay distinct objects. Floats go by
+            # their bytes so that -0.0 stays apart from 0.0
+            key = (type(value), pack('>d', value) if isinstance(value, float) else value)
+            existing = self._refs.get(key)
+            if existing is not None:
+                return existing
+            self._refs[key] = ref
+            self._objects.append(value)
+        else:
+            self._objects.append(value)
+
+        return ref
+
+    def _encode_count(self, marker: int, count: int) -> bytes:
+        if count < 15:
+            return bytes((marker | count,))
+        return bytes((marker | 0xF,)) + self._encode_int(count)
+
+    def _encode_refs(self, refs: List[int]) -> bytes:
+        return pack('>%d%s' % (len(refs), _INT_FORMATS[self._ref_size]), *refs)
+
+    @staticmethod
+    def _encode_int(value: int) -> bytes:
+        if value < 0:
+            return b'\x13' + pack('>q', value)
+        if value < 1 << 8:
+            return b'\x10' + pack('>B', value)
+        if value < 1 << 16:
+            return b'\x11' + pack('>H', value)
+        if value < 1 << 32:
+            return b'\x12' + pack('>L', value)
+        if value < 1 << 63:
+            return b'\x13' + pack('>q', value)
+        if value < 1 << 64:
+            return b'\x14' + value.to_bytes(16, 'big')
+        raise OverflowError(value)
+
+    def _encode(self, obj) -> bytes:
+        if isinstance(obj, list):
+            value = obj[0]
+            if isinstance(value, dict):
+                return self._encode_count(0xD0, len(obj[1])) + self._encode_refs(obj[1]) + self._encode_refs(obj[2])
+            return self._encode_count(0xA0, len(obj[1])) + self._encode_refs(obj[1])
+
+        if obj is None:
+            return b'\x00'
+        if obj is False:
+            return b'\x08'
+        if obj is True:
+            return b'\x09'
+        if isinstance(obj, UID):
+            size = _int_size(obj.data)
+            return bytes((0x80 | (size - 1),)) + obj.data.to_bytes(size, 'big')
+        if isinstance(obj, int):
+            return self._encode_int(obj)
+        if isinstance(obj, float):
+            return b'\x23' + pack('>d', obj)
+        if isinstance(obj, datetime):
+            if obj.tzinfo is not None:
+                # Plist dates are UTC, aware datetimes are converted rather than compared with the naive epoch
+                obj = obj.astimezone(timezone.utc).replace(tzinfo=None)
+            return b'\x33' + pack('>d', (obj - MAC_EPOCH_DATETIME).total_seconds())
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return self._encode_count(0x40, len(obj)) + bytes(obj)
+        if isinstance(obj, str):
+            if obj.isascii():
+                return self._encode_count(0x50, len(obj)) + obj.encode('ascii')
+            encoded = obj.encode('utf-16be')
+            return self._encode_count(0x60, len(encoded) // 2) + encoded
+
+        raise TypeError('Unsupported type for binary property list: %s' % type(obj))
+
+
+def loads(data) -> object:
+    return BinaryPlistReader(data).parse()
+
+
+def load_mmap(path: str) -> object:
+    """Memory map a binary plist and return its top object, decoding the rest lazily on access.
+
+    Values share the mapping, which stays open for as long as any of them is referenced.
+    """
+    with open(path, 'rb') as fp:
+        mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapping, 'madvise'):
+        # Lookups jump around the file, read-ahead would only inflate RSS
+        mapping.madvise(mmap.MADV_RANDOM)
+    return LazyBinaryPlistReader(mapping).parse()
+
+
+def dumps(value, sort_keys: bool = True, skipkeys: bool = False) -> bytes:
+    return BinaryPlistWriter(sort_keys, skipkeys).write(value)
+
+
+def dump(value, fp, sort_keys: bool = True, skipkeys: bool = False):
+    BinaryPlistWriter(sort_keys, skipkeys).write(value, fp)
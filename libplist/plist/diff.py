@@ -0,0 +1,216 @@
+"""Structural diff and patch for plist trees, native or Node based.
+
+A patch is a list of operations, each a tuple of op name, path and
+(except for removals) the new native value:
+
+    ('set', ('Applications', 'com.example.app', 'Version'), '2.0')
+    ('insert', ('Domains', 1), 'MediaDomain')
+    ('remove', ('Domains', 3))
+
+Paths are dictionary keys and array indexes from the root. Patches are
+plain plist values themselves, so they can be stored and shipped with
+dumps() and applied after a round trip, when tuples come back as lists.
+"""
+
+from collections.abc import Mapping, Sequence
+from hashlib import blake2b
+from typing import *
+
+from . import bplist
+
+
+OP_SET = 'set'
+OP_INSERT = 'insert'
+OP_REMOVE = 'remove'
+
+DIGEST_SIZE = 16
+
+_SCALAR = 0
+_DICT = 1
+_ARRAY = 2
+
+
+def _is_node(value) -> bool:
+    return hasattr(value, 'to_bin') and hasattr(value, 'get_value')
+
+
+def _kind(value) -> int:
+    if isinstance(value, (str, bytes, bytearray)):
+        return _SCALAR
+    if isinstance(value, Mapping) or (_is_node(value) and hasattr(value, 'keys')):
+        return _DICT
+    if isinstance(value, Sequence) or (_is_node(value) and hasattr(value, 'append')):
+        return _ARRAY
+    return _SCALAR
+
+
+def _native(value) -> object:
+    if _is_node(value):
+        return value.get_value()
+    if isinstance(value, (str, bytes, bytearray)):
+        return value
+    if isinstance(value, Mapping) and not isinstance(value, dict):
+        return {key: _native(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (list, tuple)):
+        return [_native(item) for item in value]
+    return value
+
+
+def digest(value) -> bytes:
+    """A digest of value's binary plist encoding, equal digests mean equal trees.
+
+    Node trees are encoded by libplist in a single call without converting
+    them to native objects first.
+    """
+    data = value.to_bin() if _is_node(value) else bplist.dumps(_native(value))
+    return blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+# Scalars are hashed by their binary plist encoding, so True, 1 and 1.0 stay apart at any depth
+_LEAF_WRITER = bplist.BinaryPlistWriter()
+
+
+class _SubtreeDigests(object):
+    """Digests of every subtree of one tree, each computed once from its children's.
+
+    Unlike digest(), equal digests here mean equal trees whether they are
+    made of Nodes or native values, and comparing two subtrees costs a lookup.
+    """
+    __slots__ = ('_digests',)
+
+    def __init__(self):
+        # Keyed by id, with the value kept alive so its id cannot be reused meanwhile
+        self._digests = {}
+
+    def of(self, value) -> bytes:
+        known = self._digests.get(id(value))
+        if known is not None:
+            return known[1]
+
+        kind = _kind(value)
+        h = blake2b(digest_size=DIGEST_SIZE)
+        if kind == _DICT:
+            h.update(b'd')
+            for key in sorted(value.keys()):
+                h.update(_LEAF_WRITER._encode(key))
+                h.update(self.of(value[key]))
+        elif kind == _ARRAY:
+            h.update(b'a')
+            for item in value:
+                h.update(self.of(item))
+        else:
+            h.update(b's')
+            h.update(_LEAF_WRITER._encode(_native(value)))
+
+        result = h.digest()
+        self._digests[id(value)] = (value, result)
+        return result
+
+
+def diff(a, b) -> List[tuple]:
+    """The operations that turn a into b, skipping subtrees that are identical."""
+    ops = []
+    _diff(a, b, (), ops, (_SubtreeDigests(), _SubtreeDigests()))
+    return ops
+
+
+def _same(a, b, digests: Tuple[_SubtreeDigests, _SubtreeDigests]) -> bool:
+    return a is b or digests[0].of(a) == digests[1].of(b)
+
+
+def _diff(a, b, path: tuple, ops: list, digests: Tuple[_SubtreeDigests, _SubtreeDigests]):
+    if _same(a, b, digests):
+        return
+
+    kind = _kind(a)
+    if kind != _kind(b) or kind == _SCALAR:
+        ops.append((OP_SET, path, _native(b)))
+    elif kind == _DICT:
+        _diff_dict(a, b, path, ops, digests)
+    else:
+        _diff_array(a, b, path, ops, digests)
+
+
+def _diff_dict(a, b, path: tuple, ops: list, digests: Tuple[_SubtreeDigests, _SubtreeDigests]):
+    for key in list(a.keys()):
+        if key in b:
+            _diff(a[key], b[key], path + (key,), ops, digests)
+        else:
+            ops.append((OP_REMOVE, path + (key,)))
+
+    for key in list(b.keys()):
+        if key not in a:
+            ops.append((OP_SET, path + (key,), _native(b[key])))
+
+
+def _diff_array(a, b, path: tuple, ops: list, digests: Tuple[_SubtreeDigests, _SubtreeDigests]):
+    a_length = len(a)
+    b_length = len(b)
+
+    # Unchanged runs at either end are skipped so an insertion does not rewrite the rest of the array
+    prefix = 0
+    while prefix < a_length and prefix < b_length and _same(a[prefix], b[prefix], digests):
+        prefix += 1
+    suffix = 0
+    while suffix < min(a_length, b_length) - prefix and \
+            _same(a[a_length - 1 - suffix], b[b_length - 1 - suffix], digests):
+        suffix += 1
+
+    a_middle = a_length - prefix - suffix
+    b_middle = b_length - prefix - suffix
+    for i in range(prefix, prefix + min(a_middle, b_middle)):
+        _diff(a[i], b[i], path + (i,), ops, digests)
+    for i in range(prefix + a_middle, prefix + b_middle):
+        ops.append((OP_INSERT, path + (i,), _native(b[i])))
+    for i in reversed(range(prefix + b_middle, prefix + a_middle)):
+        ops.append((OP_REMOVE, path + (i,)))
+
+
+def patch(target, ops: Iterable[Sequence]) -> object:
+    """Apply diff() operations to target in place and return it.
+
+    Node trees are modified directly in the underlying C tree. Only
+    replacing the root with a value of another kind returns a new object.
+    """
+    for op in ops:
+        name, path = op[0], tuple(op[1])
+
+        if not path:
+            if name != OP_SET:
+                raise ValueError('Cannot %s the root' % name)
+            target = _replace_root(target, op[2])
+            continue
+
+        parent = target
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+
+        if name == OP_SET:
+            if _kind(parent) == _ARRAY and key == len(parent):
+                parent.append(op[2])
+            else:
+                parent[key] = op[2]
+        elif name == OP_INSERT:
+            parent.insert(key, op[2])
+        elif name == OP_REMOVE:
+            del parent[key]
+        else:
+            raise ValueError('Unknown patch operation %r' % (name,))
+
+    return target
+
+
+def _replace_root(target, value) -> object:
+    if isinstance(target, dict) and isinstance(value, dict):
+        target.clear()
+        target.update(value)
+        return target
+    if isinstance(target, list) and isinstance(value, list):
+        target[:] = value
+        return target
+    if _is_node(target) and _kind(target) == _kind(value) and hasattr(target, 'set_value'):
+        if _kind(value) != _SCALAR or type(target.get_value()) is type(value):
+            target.set_value(value)
+            return target
+    return value
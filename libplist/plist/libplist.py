@@ -1,15 +1,118 @@
 from enum import Enum
 from ctypes import *
-from datetime import datetime
+from ctypes.util import find_library
+from datetime import datetime, timedelta
+from plistlib import UID
 from time import gmtime
+import plistlib
 
+from . import bplist, xmlplist
+from .bplist import MAC_EPOCH_DATETIME
 
-LIBPLIST = cdll.LoadLibrary('plist-2.0.dylib')
+
+def _initialize_bindings():
+    try:
+        module = cdll.LoadLibrary(find_library('plist-2.0') or 'plist-2.0.dylib')
+    except OSError:
+        # Binary property lists can still be handled by the pure Python backend
+        return None
+
+    # Every prototype is declared here once, hot paths must not touch argtypes/restype
+    module.plist_new_bool.argtypes = [c_uint8]
+    module.plist_new_bool.restype = c_void_p
+    module.plist_get_bool_val.argtypes = [c_void_p, POINTER(c_uint8)]
+    module.plist_set_bool_val.argtypes = [c_void_p, c_uint8]
+
+    module.plist_new_uint.argtypes = [c_uint64]
+    module.plist_new_uint.restype = c_void_p
+    module.plist_get_uint_val.argtypes = [c_void_p, POINTER(c_uint64)]
+    module.plist_set_uint_val.argtypes = [c_void_p, c_uint64]
+
+    module.plist_new_real.argtypes = [c_double]
+    module.plist_new_real.restype = c_void_p
+    module.plist_get_real_val.argtypes = [c_void_p, POINTER(c_double)]
+    module.plist_set_real_val.argtypes = [c_void_p, c_double]
+
+    module.plist_new_date.argtypes = [c_int32, c_int32]
+    module.plist_new_date.restype = c_void_p
+    module.plist_get_date_val.argtypes = [c_void_p, POINTER(c_int32), POINTER(c_int32)]
+    module.plist_set_date_val.argtypes = [c_void_p, c_int32, c_int32]
+
+    module.plist_get_key_val.argtypes = [c_void_p, POINTER(c_void_p)]
+    module.plist_set_key_val.argtypes = [c_void_p, c_char_p]
+
+    module.plist_new_uid.argtypes = [c_uint64]
+    module.plist_new_uid.restype = c_void_p
+    module.plist_get_uid_val.argtypes = [c_void_p, POINTER(c_uint64)]
+    module.plist_set_uid_val.argtypes = [c_void_p, c_uint64]
+
+    module.plist_new_string.argtypes = [c_char_p]
+    module.plist_new_string.restype = c_void_p
+    module.plist_get_string_val.argtypes = [c_void_p, POINTER(c_char_p)]
+    module.plist_get_string_ptr.argtypes = [c_void_p, POINTER(c_uint64)]
+    module.plist_get_string_ptr.restype = c_void_p
+    module.plist_set_string_val.argtypes = [c_void_p, c_char_p]
+
+    module.plist_new_data.argtypes = [c_char_p, c_uint64]
+    module.plist_new_data.restype = c_void_p
+    module.plist_get_data_val.argtypes = [c_void_p, POINTER(c_char_p), POINTER(c_uint64)]
+    module.plist_get_data_ptr.argtypes = [c_void_p, POINTER(c_uint64)]
+    module.plist_get_data_ptr.restype = c_void_p
+    module.plist_set_data_val.argtypes = [c_void_p, c_char_p, c_uint64]
+
+    module.plist_new_dict.argtypes = []
+    module.plist_new_dict.restype = c_void_p
+    module.plist_dict_get_size.argtypes = [c_void_p]
+    module.plist_dict_get_size.restype = c_uint32
+    module.plist_dict_get_item.argtypes = [c_void_p, c_char_p]
+    module.plist_dict_get_item.restype = c_void_p
+    module.plist_dict_set_item.argtypes = [c_void_p, c_char_p, c_void_p]
+    module.plist_dict_remove_item.argtypes = [c_void_p, c_char_p]
+    module.plist_dict_new_iter.argtypes = [c_void_p, POINTER(c_void_p)]
+    module.plist_dict_next_item.argtypes = [c_void_p, c_void_p, POINTER(c_void_p), POINTER(c_void_p)]
+
+    module.plist_new_array.argtypes = []
+    module.plist_new_array.restype = c_void_p
+    module.plist_array_get_size.argtypes = [c_void_p]
+    module.plist_array_get_size.restype = c_uint32
+    module.plist_array_get_item.argtypes = [c_void_p, c_uint32]
+    module.plist_array_get_item.restype = c_void_p
+    module.plist_array_set_item.argtypes = [c_void_p, c_void_p, c_uint32]
+    module.plist_array_append_item.argtypes = [c_void_p, c_void_p]
+    module.plist_array_insert_item.argtypes = [c_void_p, c_void_p, c_uint32]
+    module.plist_array_remove_item.argtypes = [c_void_p, c_uint32]
+
+    module.plist_free.argtypes = [c_void_p]
+    module.plist_copy.argtypes = [c_void_p]
+    module.plist_copy.restype = c_void_p
+    module.plist_get_parent.argtypes = [c_void_p]
+    module.plist_get_parent.restype = c_void_p
+    module.plist_get_node_type.argtypes = [c_void_p]
+    module.plist_get_node_type.restype = c_int32
+
+    module.plist_to_xml.argtypes = [c_void_p, POINTER(c_void_p), POINTER(c_uint32)]
+    module.plist_to_xml_free.argtypes = [c_void_p]
+    module.plist_to_bin.argtypes = [c_void_p, POINTER(c_void_p), POINTER(c_uint32)]
+    module.plist_to_bin_free.argtypes = [c_void_p]
+    module.plist_from_xml.argtypes = [c_char_p, c_uint32, POINTER(c_void_p)]
+    module.plist_from_bin.argtypes = [c_char_p, c_uint32, POINTER(c_void_p)]
+
+    return module
+
+
+LIBPLIST = _initialize_bindings()
+
+LIBC = cdll.LoadLibrary(find_library('c'))
+LIBC.free.argtypes = [c_void_p]
+LIBC.free.restype = None
 
 
 FMT_XML = 1
 FMT_BINARY = 2
 
+BACKEND_LIBPLIST = 1
+BACKEND_PYTHON = 2
+
 MAC_EPOCH = 978307200
 
 
@@ -38,25 +141,34 @@ class Node:
             LIBPLIST.plist_free(self._c_node)
 
     def __deepcopy__(self, memo={}) -> 'Node':
-        return LIBPLIST.plist_t_to_node(LIBPLIST.plist_copy(self._c_node))
+        return plist_t_to_node(LIBPLIST.plist_copy(self._c_node))
 
     def copy(self) -> 'Node':
         c_node = LIBPLIST.plist_copy(self._c_node)
-        return LIBPLIST.plist_t_to_node(c_node)
+        return plist_t_to_node(c_node)
 
     def to_xml(self) -> str:
-        out : c_char_p = None
+        out = c_void_p()
         length = c_uint32(0)
-        LIBPLIST.plist_to_xml(self._c_node, out, pointer(length))
+        LIBPLIST.plist_to_xml(self._c_node, pointer(out), pointer(length))
 
-        return bytes.decode(bytes(out), 'utf-8')
+        try:
+            return string_at(out, length.value).decode('utf-8')
+        finally:
+            LIBPLIST.plist_to_xml_free(out)
 
     def to_bin(self) -> bytes:
-        out = c_char_p()
+        out = c_void_p()
         length = c_uint32(0)
-        LIBPLIST.plist_to_bin(self._c_node, out, pointer(length))
+        LIBPLIST.plist_to_bin(self._c_node, pointer(out), pointer(length))
 
-        return bytes(out[:length])
+        try:
+            return string_at(out, length.value)
+        finally:
+            LIBPLIST.plist_to_bin_free(out)
+
+    def to_native(self) -> object:
+        return plist_t_to_native(self._c_node)
 
     def get_parent(self):
         c_parent = None
@@ -66,7 +178,7 @@ class Node:
         if c_parent is None:
             return None
 
-        return LIBPLIST.plist_t_to_node(c_parent)
+        return plist_t_to_node(c_parent, False)
 
     def __str__(self):
         return str(self.get_value())
@@ -106,7 +218,6 @@ class Bool(Node):
 
     def get_value(self) -> bool:
         value = c_uint8()
-        LIBPLIST.plist_get_bool_val.argtypes = [c_void_p, POINTER(c_uint8)]
         LIBPLIST.plist_get_bool_val(self._c_node, pointer(value))
         return bool(value)
 
@@ -148,7 +259,6 @@ class Integer(Node):
 
     def get_value(self) -> int:
         result = c_uint64()
-        LIBPLIST.plist_get_uint_val.argtypes = [c_void_p, POINTER(c_uint64)]
         LIBPLIST.plist_get_uint_val(self._c_node, pointer(result))
         return result.value
 
@@ -186,9 +296,9 @@ class Real(Node):
         LIBPLIST.plist_set_real_val(self._c_node, float(value))
 
     def get_value(self) -> float:
-        value = c_float(0.0)
+        value = c_double(0.0)
         LIBPLIST.plist_get_real_val(self._c_node, pointer(value))
-        return value
+        return value.value
 
 
 
@@ -227,10 +337,10 @@ class Uid(Node):
     def set_value(self, value):
         LIBPLIST.plist_set_uid_val(self._c_node, int(value))
 
-    def get_value(self) -> c_uint64:
-        value: c_uint64
+    def get_value(self) -> int:
+        value = c_uint64()
         LIBPLIST.plist_get_uid_val(self._c_node, pointer(value))
-        return value
+        return value.value
 
 
 
@@ -247,7 +357,7 @@ class Key(Node):
             else:
                 raise ValueError("Requires unicode input, got %s" % type(value))
             c_utf8_data = utf8_data
-            self._c_node = LIBPLIST.plist_new_string("")
+            self._c_node = LIBPLIST.plist_new_string(b"")
             LIBPLIST.plist_set_key_val(self._c_node, c_utf8_data)
 
     def __repr__(self):
@@ -283,9 +393,9 @@ class Key(Node):
             LIBPLIST.plist_set_key_val(self._c_node, c_utf8_data)
 
     def get_value(self) -> str:
-        c_value = c_char_p()
-        LIBPLIST.plist_get_key_val(self._c_node, pointer(c_value))
-        return bytes.decode(c_value, 'utf-8')
+        c_value = c_void_p()
+        LIBPLIST.plist_get_key_val(self._c_node, byref(c_value))
+        return _take_key(c_value)
 
 
 
@@ -293,7 +403,7 @@ class String(Node):
     def __init__(self, value=None):
         c_utf8_data = c_char_p()
         if value is None:
-            self._c_node = LIBPLIST.plist_new_string("")
+            self._c_node = LIBPLIST.plist_new_string(b"")
         else:
             if isinstance(value, str):
                 utf8_data = value.encode('utf-8')
@@ -335,15 +445,14 @@ class String(Node):
             LIBPLIST.plist_set_string_val(self._c_node, c_utf8_data)
 
     def get_value(self) -> str:
-        c_value = c_char_p()
-        LIBPLIST.plist_get_string_val.argtypes = [c_void_p, POINTER(c_char_p)]
-        LIBPLIST.plist_get_string_val(self._c_node, pointer(c_value))
-        return c_value.value
+        length = c_uint64(0)
+        c_value = LIBPLIST.plist_get_string_ptr(self._c_node, pointer(length))
+        return string_at(c_value, length.value).decode('utf-8')
 
 
 class Date(Node):
     def __init__(self, value = None):
-        self._c_node = LIBPLIST.create_date_plist(value)
+        self._c_node = create_date_plist(value)
 
     def __repr__(self):
         d = self.get_value()
@@ -374,15 +483,14 @@ class Date(Node):
         secs = c_int32(0)
         usecs = c_int32(0)
         LIBPLIST.plist_get_date_val(self._c_node, pointer(secs), pointer(usecs))
-        secs.value += MAC_EPOCH
-        return Date.ints_to_datetime(secs.value, usecs.value)
+        return MAC_EPOCH_DATETIME + timedelta(seconds=secs.value, microseconds=usecs.value)
 
     def set_value(self, value: object):
         secs = c_int32(0)
         usecs = c_int32(0)
-        if not LIBPLIST.check_datetime(value):
+        if not isinstance(value, datetime):
             raise ValueError("Expected a datetime")
-        LIBPLIST.datetime_to_ints(value, pointer(secs), pointer(usecs))
+        secs, usecs = datetime_to_ints(value)
         LIBPLIST.plist_set_date_val(self._c_node, secs, usecs)
 
 
@@ -413,12 +521,12 @@ class Data(Node):
             return d >= other
 
     def get_value(self) -> bytes:
-        val = c_char_p()
         length = c_uint64(0)
-        LIBPLIST.plist_get_data_val.argtypes = [c_void_p, POINTER(c_char_p), POINTER(c_uint64)]
-        LIBPLIST.plist_get_data_val(self._c_node, pointer(val), pointer(length))
+        c_value = LIBPLIST.plist_get_data_ptr(self._c_node, pointer(length))
+        if not c_value:
+            return b''
 
-        return bytes(val.value)
+        return string_at(c_value, length.value)
 
 
     def set_value(self, value):
@@ -428,35 +536,56 @@ class Data(Node):
 
 
 
+def _take_key(c_key: c_void_p) -> str:
+    # Keys handed out by libplist are malloc'ed copies owned by the caller
+    try:
+        return string_at(c_key).decode('utf-8')
+    finally:
+        LIBC.free(c_key)
+
+
 class Dict(Node):
+    _map: dict
+    _lazy: bool = False
+
     def __init__(self, value=None):
-        self._c_node = LIBPLIST.create_dict_plist(value)
+        self._c_node = create_dict_plist(value)
+        self._init()
 
-    def _init(self):
+    def _init(self, lazy=False):
         it = c_void_p()
-        key = c_char_p()
+        key = c_void_p()
         subnode = c_void_p()
 
         self._map = {}
+        self._lazy = lazy
 
-        LIBPLIST.plist_dict_new_iter.argtypes = [c_void_p, POINTER(c_void_p)]
-        LIBPLIST.plist_dict_new_iter(self._c_node, pointer(it))
-        LIBPLIST.plist_dict_next_item.argtypes = [c_void_p, c_void_p, POINTER(c_char_p), POINTER(c_void_p)]
-        LIBPLIST.plist_dict_next_item(self._c_node, it, pointer(key), pointer(subnode))
-
-        while subnode is not None:
-            py_key = key.value
-
-            if py_key is None:
-                break
+        # In lazy mode children are wrapped on first access by __getitem__
+        if lazy:
+            return
 
-            py_key = py_key.decode('utf-8')
+        LIBPLIST.plist_dict_new_iter(self._c_node, byref(it))
+        try:
+            LIBPLIST.plist_dict_next_item(self._c_node, it, byref(key), byref(subnode))
+            while key.value is not None:
+                self._map[_take_key(key)] = plist_t_to_node(subnode, False)
+                LIBPLIST.plist_dict_next_item(self._c_node, it, byref(key), byref(subnode))
+        finally:
+            LIBC.free(it)
+
+    def _iter_keys(self):
+        it = c_void_p()
+        key = c_void_p()
 
-            self._map[py_key] = plist_t_to_node(subnode, False)
-            subnode = c_void_p()
-            key = c_char_p()
-            LIBPLIST.plist_dict_next_item.argtypes = [c_void_p, c_void_p, POINTER(c_char_p), POINTER(c_void_p)]
-            LIBPLIST.plist_dict_next_item(self._c_node, it, pointer(key), pointer(subnode))
+        LIBPLIST.plist_dict_new_iter(self._c_node, byref(it))
+        try:
+            LIBPLIST.plist_dict_next_item(self._c_node, it, byref(key), None)
+            while key.value is not None:
+                yield _take_key(key)
+                LIBPLIST.plist_dict_next_item(self._c_node, it, byref(key), None)
+        finally:
+            # Also runs when an abandoned generator is closed or collected
+            LIBC.free(it)
 
     def __dealloc__(self):
         self._map = None
@@ -477,82 +606,123 @@ class Dict(Node):
             return d >= other
 
     def __len__(self):
+        if self._lazy:
+            return LIBPLIST.plist_dict_get_size(self._c_node)
         return len(self._map)
 
     def __repr__(self):
+        if self._lazy:
+            return '<Dict: %s>' % dict(self.items())
         return '<Dict: %s>' % self._map
 
     def get_value(self) -> dict:
-        return dict([(key, value.get_value()) for key, value in self.items()])
+        return plist_t_to_native(self._c_node)
 
     def set_value(self, value : dict):
         LIBPLIST.plist_free(self._c_node)
         self._map = {}
         self._c_node = None
-        self._c_node = LIBPLIST.create_dict_plist(value)
-        self._init()
+        self._c_node = create_dict_plist(value)
+        self._init(self._lazy)
 
     def __iter__(self):
+        if self._lazy:
+            return self._iter_keys()
         return self._map.__iter__()
 
+    def __contains__(self, key):
+        if self._lazy:
+            return key in self._map or bool(LIBPLIST.plist_dict_get_item(self._c_node, key.encode('utf-8')))
+        return key in self._map
+
     def has_key(self, key) -> Bool:
-        return self._map.has_key(key)
+        return key in self
 
     def get(self, key, default=None):
+        if self._lazy:
+            try:
+                return self[key]
+            except KeyError:
+                return default
         return self._map.get(key, default)
 
     def keys(self) -> list:
+        if self._lazy:
+            return list(self._iter_keys())
         return self._map.keys()
 
     def iterkeys(self):
-        return self._map.iterkeys()
+        return iter(self)
 
     def items(self) -> list:
+        if self._lazy:
+            return [(key, self[key]) for key in self._iter_keys()]
         return self._map.items()
 
     def iteritems(self):
-        return self._map.iteritems()
+        return iter(self.items())
 
     def values(self) -> list:
+        if self._lazy:
+            return [self[key] for key in self._iter_keys()]
         return self._map.values()
 
     def itervalues(self):
-        return self._map.itervalues()
+        return iter(self.values())
 
     def __getitem__(self, key):
-        return self._map[key]
+        if not self._lazy:
+            return self._map[key]
+
+        node = self._map.get(key)
+        if node is None:
+            c_subnode = LIBPLIST.plist_dict_get_item(self._c_node, key.encode('utf-8'))
+            if not c_subnode:
+                raise KeyError(key)
+            node = plist_t_to_node(c_subnode, False, True)
+            self._map[key] = node
+        return node
 
     def __setitem__(self, key, value):
         n: Node
         if isinstance(value, Node):
             n = value.copy()
         else:
-            n = LIBPLIST.plist_t_to_node(native_to_plist_t(value), False)
+            n = plist_t_to_node(native_to_plist_t(value), False)
 
-        LIBPLIST.plist_dict_set_item(self._c_node, key, n._c_node)
+        LIBPLIST.plist_dict_set_item(self._c_node, key.encode('utf-8'), n._c_node)
         self._map[key] = n
 
     def __delitem__(self, key):
-        self._map.__delitem__(key)
-        LIBPLIST.plist_dict_remove_item(self._c_node, key)
+        if self._lazy:
+            if key not in self:
+                raise KeyError(key)
+            self._map.pop(key, None)
+        else:
+            self._map.__delitem__(key)
+        LIBPLIST.plist_dict_remove_item(self._c_node, key.encode('utf-8'))
 
 
 class Array(Node):
     _array: []
+    _lazy: bool = False
 
     def __init__(self, value: 'Array'):
-        self._c_node = LIBPLIST.create_array_plist(value)
+        self._c_node = create_array_plist(value)
+        self._init()
 
-    def _init(self):
+    def _init(self, lazy=False):
         self._array = []
-        LIBPLIST.plist_array_get_size.argtypes = [c_void_p]
-        LIBPLIST.plist_array_get_size.restype = c_uint32
+        self._lazy = lazy
         size: c_uint32 = LIBPLIST.plist_array_get_size(self._c_node)
         subnode = None
 
+        # In lazy mode slots stay empty until __getitem__ wraps them
+        if lazy:
+            self._array = [None] * size
+            return
+
         for i in range(size):
-            LIBPLIST.plist_array_get_item.argtypes = [c_void_p, c_uint32]
-            LIBPLIST.plist_array_get_item.restype = c_void_p
             subnode = LIBPLIST.plist_array_get_item(self._c_node, i)
             self._array.append(plist_t_to_node(subnode, False))
 
@@ -575,30 +745,47 @@ class Array(Node):
         return len(self._array)
 
     def __repr__(self):
+        if self._lazy:
+            return '<Array: %s>' % list(self)
         return '<Array: %s>' % self._array
 
     def get_value(self) -> list:
-        return [i.get_value() for i in self]
+        return plist_t_to_native(self._c_node)
 
     def set_value(self, value):
         self._array = []
         LIBPLIST.plist_free(self._c_node)
         self._c_node = None
-        self._c_node = LIBPLIST.create_array_plist(value)
-        self._init()
+        self._c_node = create_array_plist(value)
+        self._init(self._lazy)
 
     def __iter__(self):
+        if self._lazy:
+            return (self[i] for i in range(len(self._array)))
         return self._array.__iter__()
 
     def __getitem__(self, index):
-        return self._array[index]
+        if not self._lazy:
+            return self._array[index]
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._array)))]
+
+        node = self._array[index]
+        if node is None:
+            if index < 0:
+                index = len(self._array) + index
+            c_subnode = LIBPLIST.plist_array_get_item(self._c_node, index)
+            node = plist_t_to_node(c_subnode, False, True)
+            self._array[index] = node
+        return node
 
     def __setitem__(self, index, value):
         n : Node
         if isinstance(value, Node):
             n = value.copy()
         else:
-            n = LIBPLIST.plist_t_to_node(native_to_plist_t(value), False)
+            n = plist_t_to_node(native_to_plist_t(value), False)
 
         if index < 0:
             index = len(self) + index
@@ -618,13 +805,30 @@ class Array(Node):
         if isinstance(item, Node):
             n = item.copy()
         else:
-            n = LIBPLIST.plist_t_to_node(native_to_plist_t(item), False)
+            n = plist_t_to_node(native_to_plist_t(item), False)
 
         LIBPLIST.plist_array_append_item(self._c_node, n._c_node)
         self._array.append(n)
 
+    def insert(self, index, item):
+        n: Node
+
+        if index < 0:
+            index = max(0, len(self) + index)
+        if index >= len(self):
+            self.append(item)
+            return
+
+        if isinstance(item, Node):
+            n = item.copy()
+        else:
+            n = plist_t_to_node(native_to_plist_t(item), False)
+
+        LIBPLIST.plist_array_insert_item(self._c_node, n._c_node, index)
+        self._array.insert(index, n)
+
 
-def from_xml(xml: bytes):
+def from_xml(xml: bytes, lazy=False, native=False):
     c_node = c_void_p()
 
     if isinstance(xml, str):
@@ -638,15 +842,44 @@ def from_xml(xml: bytes):
     c_data = c_char_p(xml)
     length = len(xml)
 
-    LIBPLIST.plist_from_xml.argtypes = [c_char_p, c_uint32, POINTER(c_void_p)]
     LIBPLIST.plist_from_xml(c_data, length, pointer(c_node))
-    return plist_t_to_node(c_node)
+    if native:
+        return plist_t_to_native(c_node, True)
+    return plist_t_to_node(c_node, lazy=lazy)
 
 
-def from_bin(binary: bytes):
+def from_bin(binary: bytes, lazy=False, native=False):
     c_node = c_void_p()
     LIBPLIST.plist_from_bin(binary, len(binary), pointer(c_node))
-    return plist_t_to_node(c_node)
+    if native:
+        return plist_t_to_native(c_node, True)
+    return plist_t_to_node(c_node, lazy=lazy)
+
+
+def python_from_xml(xml: bytes, lazy=False, native=True):
+    if isinstance(xml, str):
+        xml = bytes(xml, 'utf-8')
+    return plistlib.loads(xml, fmt=plistlib.FMT_XML)
+
+
+def python_from_bin(binary: bytes, lazy=False, native=True):
+    return bplist.loads(binary)
+
+
+_PYTHON_DECODERS = {
+    from_xml: python_from_xml,
+    from_bin: python_from_bin,
+}
+
+
+def _resolve_backend(backend):
+    if backend is None:
+        return BACKEND_LIBPLIST if LIBPLIST is not None else BACKEND_PYTHON
+    if backend not in (BACKEND_LIBPLIST, BACKEND_PYTHON):
+        raise ValueError('Backend must be constant BACKEND_LIBPLIST or BACKEND_PYTHON')
+    if backend == BACKEND_LIBPLIST and LIBPLIST is None:
+        raise RuntimeError('libplist could not be loaded')
+    return backend
 
 
 def native_to_plist_t(native):
@@ -659,7 +892,9 @@ def native_to_plist_t(native):
         node = native
         return LIBPLIST.plist_copy(node._c_node)
     if isinstance(native, str):
-        return LIBPLIST.plist_new_string(native)
+        return LIBPLIST.plist_new_string(native.encode('utf-8'))
+    if isinstance(native, (bytes, bytearray)):
+        return LIBPLIST.plist_new_data(bytes(native), len(native))
     if isinstance(native, bool):
         return LIBPLIST.plist_new_bool(native)
     if isinstance(native, int) or isinstance(native, c_long):
@@ -667,22 +902,22 @@ def native_to_plist_t(native):
     if isinstance(native, float):
         return LIBPLIST.plist_new_real(native)
     if isinstance(native, dict):
-        return LIBPLIST.create_dict_plist(native)
+        return create_dict_plist(native)
     if isinstance(native, list) or isinstance(native, tuple):
-        return LIBPLIST.create_array_plist(native)
-    if LIBPLIST.check_datetime(native):
-        return LIBPLIST.create_date_plist(native)
+        return create_array_plist(native)
+    if isinstance(native, datetime):
+        return create_date_plist(native)
 
 
-def load(fp, fmt=None, use_builtin_types=True, dict_type=dict) -> object:
-    is_binary = fp.read(6) == 'bplist'
+def load(fp, fmt=None, use_builtin_types=True, dict_type=dict, lazy=False, native=False, backend=None) -> object:
+    is_binary = fp.read(6) in (b'bplist', 'bplist')
     fp.seek(0)
 
     cb = None
 
     if not fmt:
         if is_binary:
-            if 'b' not in fp.mode:
+            if 'b' not in getattr(fp, 'mode', 'b'):
                 raise IOError('File handle must be opened in binary (b) mode to read binary property lists')
             cb = from_bin
         else:
@@ -700,11 +935,14 @@ def load(fp, fmt=None, use_builtin_types=True, dict_type=dict) -> object:
     elif not is_binary and fmt == FMT_BINARY:
         raise ValueError('Cannot parse XML property list as binary')
 
-    return cb(fp.read())
+    if _resolve_backend(backend) == BACKEND_PYTHON:
+        cb = _PYTHON_DECODERS[cb]
 
+    return cb(fp.read(), lazy, native)
 
-def loads(data, fmt=None, use_builtin_types=True, dict_type=dict) -> object:
-    is_binary = data[0:6] == 'bplist'
+
+def loads(data, fmt=None, use_builtin_types=True, dict_type=dict, lazy=False, native=False, backend=None) -> object:
+    is_binary = data[0:6] in (b'bplist', 'bplist')
 
     cb = None
 
@@ -726,18 +964,50 @@ def loads(data, fmt=None, use_builtin_types=True, dict_type=dict) -> object:
     elif not is_binary and fmt == FMT_BINARY:
         raise ValueError('Cannot parse XML property list as binary')
 
-    return cb(data)
+    if _resolve_backend(backend) == BACKEND_PYTHON:
+        cb = _PYTHON_DECODERS[cb]
+
+    return cb(data, lazy, native)
+
+
+def _serialize_directly(value, backend) -> bool:
+    # Native values skip libplist unless it is asked for explicitly: building a C node tree
+    # first would hold the whole document in memory twice
+    if _resolve_backend(backend) == BACKEND_PYTHON:
+        return True
+    return backend is None and not isinstance(value, Node)
+
 
+def dump(value, fp, fmt=FMT_XML, sort_keys=True, skipkeys=False, backend=None) -> object:
+    if fmt not in (FMT_XML, FMT_BINARY):
+        raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
+
+    if _serialize_directly(value, backend):
+        if isinstance(value, Node):
+            value = value.to_native()
+        if fmt == FMT_BINARY:
+            bplist.dump(value, fp, sort_keys, skipkeys)
+        else:
+            xmlplist.dump(value, fp, sort_keys, skipkeys)
+        return
 
-def dump(value, fp, fmt=FMT_XML, sort_keys=True, skipkeys=False) -> object:
-    fp.write(dumps(value, fmt=fmt))
+    fp.write(dumps(value, fmt=fmt, sort_keys=sort_keys, skipkeys=skipkeys, backend=backend))
 
 
-def dumps(value, fmt=FMT_XML, sort_keys=True, skipkeys=False) -> object:
+def dumps(value, fmt=FMT_XML, sort_keys=True, skipkeys=False, backend=None) -> object:
     if fmt not in (FMT_XML, FMT_BINARY):
         raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
 
-    if LIBPLIST.check_datetime(value):
+    if _serialize_directly(value, backend):
+        if isinstance(value, Node):
+            value = value.to_native()
+        if fmt == FMT_BINARY:
+            return bplist.dumps(value, sort_keys, skipkeys)
+        return xmlplist.dumps(value, sort_keys, skipkeys)
+
+    if isinstance(value, Node):
+        node = value
+    elif isinstance(value, datetime):
         node = Date(value)
     elif isinstance(value, str):
         node = String(value)
@@ -772,7 +1042,7 @@ def create_array_plist(value=None):
     node = LIBPLIST.plist_new_array()
     if value is not None and (isinstance(value, list) or isinstance(value, tuple)):
         for item in value:
-            c_node = LIBPLIST.native_to_plist_t(item)
+            c_node = native_to_plist_t(item)
             LIBPLIST.plist_array_append_item(node, c_node)
             c_node = None
     return node
@@ -791,11 +1061,11 @@ def Real_factory(c_node, managed=True) -> Real:
     return instance
 
 
-def Dict_factory(c_node, managed=True) -> dict:
+def Dict_factory(c_node, managed=True, lazy=False) -> dict:
     instance = Dict.__new__(Dict)
     instance._c_managed = managed
     instance._c_node = c_node
-    instance._init()
+    instance._init(lazy)
     return instance
 
 
@@ -813,11 +1083,11 @@ def Key_factory(c_node, managed=True) -> Key:
     return instance
 
 
-def Array_factory(c_node, managed=True) -> Array:
+def Array_factory(c_node, managed=True, lazy=False) -> Array:
     instance = Array.__new__(Array)
     instance._c_managed = managed
     instance._c_node = c_node
-    instance._init()
+    instance._init(lazy)
     return instance
 
 
@@ -855,28 +1125,28 @@ def create_dict_plist(value=None):
     node = LIBPLIST.plist_new_dict()
     if value is not None and isinstance(value, dict):
         for key, item in value.items():
-            c_node = LIBPLIST.native_to_plist_t(item)
-            LIBPLIST.plist_dict_set_item(node, key, c_node)
+            c_node = native_to_plist_t(item)
+            LIBPLIST.plist_dict_set_item(node, key.encode('utf-8'), c_node)
             c_node = None
     return node
 
 
+def datetime_to_ints(value: datetime) -> tuple:
+    delta = value - MAC_EPOCH_DATETIME
+    return delta.days * 86400 + delta.seconds, delta.microseconds
+
+
 def create_date_plist(value=None):
     node = None
-    secs: c_int32
-    usecs: c_int32
     if value is None:
         node = LIBPLIST.plist_new_date(0, 0)
-    elif LIBPLIST.check_datetime(value):
-        LIBPLIST.datetime_to_ints(value, pointer(secs), pointer(usecs))
-        secs -= MAC_EPOCH
+    elif isinstance(value, datetime):
+        secs, usecs = datetime_to_ints(value)
         node = LIBPLIST.plist_new_date(secs, usecs)
     return node
 
 
-def plist_t_to_node(c_plist, managed=True):
-    LIBPLIST.plist_get_node_type.argtypes = [c_void_p]
-    LIBPLIST.plist_get_node_type.restype = c_int32
+def plist_t_to_node(c_plist, managed=True, lazy=False):
     t = PlistType(LIBPLIST.plist_get_node_type(c_plist))
     if t == PlistType.PLIST_BOOLEAN:
         return Bool_factory(c_plist, managed)
@@ -889,9 +1159,9 @@ def plist_t_to_node(c_plist, managed=True):
     if t == PlistType.PLIST_STRING:
         return String_factory(c_plist, managed)
     if t == PlistType.PLIST_ARRAY:
-        return Array_factory(c_plist, managed)
+        return Array_factory(c_plist, managed, lazy)
     if t == PlistType.PLIST_DICT:
-        return Dict_factory(c_plist, managed)
+        return Dict_factory(c_plist, managed, lazy)
     if t == PlistType.PLIST_DATE:
         return Date_factory(c_plist, managed)
     if t == PlistType.PLIST_DATA:
@@ -902,5 +1172,99 @@ def plist_t_to_node(c_plist, managed=True):
         return None
 
 
+class _NativeConverter:
+    # Out-parameters are allocated once per conversion and reused for every node
+    def __init__(self):
+        self._bool = c_uint8()
+        self._uint = c_uint64()
+        self._real = c_double()
+        self._secs = c_int32()
+        self._usecs = c_int32()
+        self._length = c_uint64()
+        self._key = c_void_p()
+        self._convert = {
+            PlistType.PLIST_BOOLEAN.value: self._convert_bool,
+            PlistType.PLIST_UINT.value: self._convert_uint,
+            PlistType.PLIST_REAL.value: self._convert_real,
+            PlistType.PLIST_STRING.value: self._convert_string,
+            PlistType.PLIST_ARRAY.value: self._convert_array,
+            PlistType.PLIST_DICT.value: self._convert_dict,
+            PlistType.PLIST_DATE.value: self._convert_date,
+            PlistType.PLIST_DATA.value: self._convert_data,
+            PlistType.PLIST_KEY.value: self._convert_key,
+            PlistType.PLIST_UID.value: self._convert_uid,
+        }
+
+    def convert(self, c_plist) -> object:
+        converter = self._convert.get(LIBPLIST.plist_get_node_type(c_plist))
+        if converter is None:
+            return None
+        return converter(c_plist)
+
+    def _convert_bool(self, c_plist) -> bool:
+        LIBPLIST.plist_get_bool_val(c_plist, byref(self._bool))
+        return bool(self._bool.value)
+
+    def _convert_uint(self, c_plist) -> int:
+        LIBPLIST.plist_get_uint_val(c_plist, byref(self._uint))
+        return self._uint.value
+
+    def _convert_uid(self, c_plist) -> UID:
+        LIBPLIST.plist_get_uid_val(c_plist, byref(self._uint))
+        return UID(self._uint.value)
+
+    def _convert_real(self, c_plist) -> float:
+        LIBPLIST.plist_get_real_val(c_plist, byref(self._real))
+        return self._real.value
+
+    def _convert_string(self, c_plist) -> str:
+        c_value = LIBPLIST.plist_get_string_ptr(c_plist, byref(self._length))
+        return string_at(c_value, self._length.value).decode('utf-8')
+
+    def _convert_key(self, c_plist) -> str:
+        LIBPLIST.plist_get_key_val(c_plist, byref(self._key))
+        return _take_key(self._key)
+
+    def _convert_data(self, c_plist) -> bytes:
+        c_value = LIBPLIST.plist_get_data_ptr(c_plist, byref(self._length))
+        if not c_value:
+            return b''
+        return string_at(c_value, self._length.value)
+
+    def _convert_date(self, c_plist) -> datetime:
+        LIBPLIST.plist_get_date_val(c_plist, byref(self._secs), byref(self._usecs))
+        return MAC_EPOCH_DATETIME + timedelta(seconds=self._secs.value, microseconds=self._usecs.value)
+
+    def _convert_array(self, c_plist) -> list:
+        get_item = LIBPLIST.plist_array_get_item
+        return [self.convert(get_item(c_plist, i)) for i in range(LIBPLIST.plist_array_get_size(c_plist))]
+
+    def _convert_dict(self, c_plist) -> dict:
+        result = {}
+        it = c_void_p()
+        key = c_void_p()
+        subnode = c_void_p()
+        next_item = LIBPLIST.plist_dict_next_item
+
+        LIBPLIST.plist_dict_new_iter(c_plist, byref(it))
+        try:
+            next_item(c_plist, it, byref(key), byref(subnode))
+            while key.value is not None:
+                result[_take_key(key)] = self.convert(subnode)
+                next_item(c_plist, it, byref(key), byref(subnode))
+        finally:
+            LIBC.free(it)
+
+        return result
+
+
+def plist_t_to_native(c_plist, free=False) -> object:
+    try:
+        return _NativeConverter().convert(c_plist)
+    finally:
+        if free:
+            LIBPLIST.plist_free(c_plist)
+
+
 def plist_free(value: object):
     LIBPLIST.plist_free(value)
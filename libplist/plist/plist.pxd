@@ -11,6 +11,7 @@ cdef class Node:
     cpdef object __deepcopy__(self, memo=*)
     cpdef unicode to_xml(self)
     cpdef bytes to_bin(self)
+    cpdef object to_native(self)
     cpdef object copy(self)
 
 cdef class Bool(Node):
@@ -31,7 +32,7 @@ cdef class Key(Node):
 
 cdef class Real(Node):
     cpdef set_value(self, object value)
-    cpdef float get_value(self)
+    cpdef double get_value(self)
 
 cdef class String(Node):
     cpdef set_value(self, object value)
@@ -47,7 +48,10 @@ cdef class Data(Node):
 
 cdef class Dict(Node):
     cdef dict _map
-    cdef void _init(self)
+    cdef bint _lazy
+    cdef int _init(self, bint lazy) except -1
+    cdef list _keys(self)
+    cdef object _child(self, unicode key)
     cpdef set_value(self, dict value)
     cpdef dict get_value(self)
     cpdef bint has_key(self, key)
@@ -61,18 +65,16 @@ cdef class Dict(Node):
 
 cdef class Array(Node):
     cdef list _array
-    cdef void _init(self)
+    cdef bint _lazy
+    cdef int _init(self, bint lazy) except -1
+    cdef object _child(self, Py_ssize_t index)
     cpdef set_value(self, value)
     cpdef list get_value(self)
     cpdef append(self, object item)
 
-cpdef object from_xml(xml)
-cpdef object from_bin(bytes bin)
+cpdef object from_xml(xml, bint lazy=*, bint native=*)
+cpdef object from_bin(binary, bint lazy=*, bint native=*)
 
-cpdef object load(fp, fmt=*, use_builtin_types=*, dict_type=*)
-cpdef object loads(data, fmt=*, use_builtin_types=*, dict_type=*)
-cpdef object dump(value, fp, fmt=*, sort_keys=*, skipkeys=*)
-cpdef object dumps(value, fmt=*, sort_keys=*, skipkeys=*)
-
-cdef object plist_t_to_node(plist_t c_plist, bint managed=*)
-cdef plist_t native_to_plist_t(object native)
+cdef object _plist_t_to_node(plist_t c_plist, bint managed=*, bint lazy=*)
+cdef object _to_native(plist_t c_plist)
+cdef plist_t native_to_plist_t(object native) except? NULL
@@ -1,6 +1,23 @@
+# cython: language_level=3
+"""Compiled counterpart of libplist.py.
+
+Same classes and functions as the ctypes binding, but every call goes
+straight to libplist's C API. plist.bindings imports this module when it
+has been built and falls back to libplist.py otherwise.
+"""
+
 cimport cpython
 cimport libc.stdlib
 from libc.stdint cimport *
+from libc.string cimport strlen
+
+from datetime import datetime, timedelta
+from plistlib import UID
+
+from . import libplist as _ctypes_binding
+from .bplist import MAC_EPOCH_DATETIME
+from .libplist import BACKEND_LIBPLIST, BACKEND_PYTHON, FMT_BINARY, FMT_XML, MAC_EPOCH, PlistType, \
+    datetime_to_ints
 
 cdef extern from *:
     ctypedef enum plist_type:
@@ -33,26 +50,25 @@ cdef extern from *:
     void plist_set_date_val(plist_t node, int32_t sec, int32_t usec)
 
     void plist_get_key_val(plist_t node, char **val)
-    void plist_set_key_val(plist_t node, char *val)
+    void plist_set_key_val(plist_t node, const char *val)
 
     plist_t plist_new_uid(uint64_t val)
     void plist_get_uid_val(plist_t node, uint64_t *val)
     void plist_set_uid_val(plist_t node, uint64_t val)
 
-    plist_t plist_new_string(char *val)
-    void plist_get_string_val(plist_t node, char **val)
-    void plist_set_string_val(plist_t node, char *val)
+    plist_t plist_new_string(const char *val)
+    const char *plist_get_string_ptr(plist_t node, uint64_t *length)
+    void plist_set_string_val(plist_t node, const char *val)
 
-    plist_t plist_new_data(char *val, uint64_t length)
-    void plist_get_data_val(plist_t node, char **val, uint64_t * length)
-    void plist_set_data_val(plist_t node, char *val, uint64_t length)
+    plist_t plist_new_data(const char *val, uint64_t length)
+    const char *plist_get_data_ptr(plist_t node, uint64_t *length)
+    void plist_set_data_val(plist_t node, const char *val, uint64_t length)
 
     plist_t plist_new_dict()
-    int plist_dict_get_size(plist_t node)
-    plist_t plist_dict_get_item(plist_t node, char* key)
-    void plist_dict_set_item(plist_t node, char* key, plist_t item)
-    void plist_dict_insert_item(plist_t node, char* key, plist_t item)
-    void plist_dict_remove_item(plist_t node, char* key)
+    uint32_t plist_dict_get_size(plist_t node)
+    plist_t plist_dict_get_item(plist_t node, const char* key)
+    void plist_dict_set_item(plist_t node, const char* key, plist_t item)
+    void plist_dict_remove_item(plist_t node, const char* key)
 
     void plist_dict_new_iter(plist_t node, plist_dict_iter *iter)
     void plist_dict_next_item(plist_t node, plist_dict_iter iter, char **key, plist_t *val)
@@ -60,22 +76,51 @@ cdef extern from *:
     plist_t plist_new_array()
     uint32_t plist_array_get_size(plist_t node)
     plist_t plist_array_get_item(plist_t node, uint32_t n)
-    uint32_t plist_array_get_item_index(plist_t node)
     void plist_array_set_item(plist_t node, plist_t item, uint32_t n)
     void plist_array_append_item(plist_t node, plist_t item)
     void plist_array_insert_item(plist_t node, plist_t item, uint32_t n)
     void plist_array_remove_item(plist_t node, uint32_t n)
 
-    void plist_free(plist_t plist)
     plist_t plist_copy(plist_t plist)
     void plist_to_xml(plist_t plist, char **plist_xml, uint32_t *length)
+    void plist_to_xml_free(char *plist_xml)
     void plist_to_bin(plist_t plist, char **plist_bin, uint32_t *length)
+    void plist_to_bin_free(char *plist_bin)
 
     plist_t plist_get_parent(plist_t node)
     plist_type plist_get_node_type(plist_t node)
 
-    void plist_from_xml(char *plist_xml, uint32_t length, plist_t * plist)
-    void plist_from_bin(char *plist_bin, uint32_t length, plist_t * plist)
+    void plist_from_xml(const char *plist_xml, uint32_t length, plist_t * plist)
+    void plist_from_bin(const char *plist_bin, uint32_t length, plist_t * plist)
+
+
+# Passed to __cinit__ by _wrap() so wrapping an existing plist_t does not allocate a throwaway node
+cdef object _WRAP = object()
+
+
+cdef inline unicode _decode(const char* value, size_t length):
+    return value[:length].decode('utf-8')
+
+
+cdef Node _wrap(type cls, plist_t c_node, bint managed):
+    cdef Node instance = cls.__new__(cls, _WRAP)
+    instance._c_node = c_node
+    instance._c_managed = managed
+    return instance
+
+
+cdef plist_t _adopt(object value) except? NULL:
+    """A plist_t for value that the caller takes ownership of, copying nodes rather than sharing them."""
+    cdef Node node
+    cdef plist_t c_node
+    if isinstance(value, Node):
+        node = value
+        return plist_copy(node._c_node)
+    c_node = native_to_plist_t(value)
+    if c_node is NULL:
+        raise TypeError('Unsupported type: %s' % type(value))
+    return c_node
+
 
 cdef class Node:
     def __init__(self, *args, **kwargs):
@@ -86,63 +131,65 @@ cdef class Node:
             plist_free(self._c_node)
 
     cpdef object __deepcopy__(self, memo={}):
-        return plist_t_to_node(plist_copy(self._c_node))
+        return _plist_t_to_node(plist_copy(self._c_node))
 
     cpdef object copy(self):
-        cdef plist_t c_node = NULL
-        c_node = plist_copy(self._c_node)
-        return plist_t_to_node(c_node)
+        return _plist_t_to_node(plist_copy(self._c_node))
 
     cpdef unicode to_xml(self):
         cdef:
             char* out = NULL
-            uint32_t length
+            uint32_t length = 0
         plist_to_xml(self._c_node, &out, &length)
 
         try:
-            return cpython.PyUnicode_DecodeUTF8(out, length, 'strict')
+            return _decode(out, length)
         finally:
             if out != NULL:
-                libc.stdlib.free(out)
+                plist_to_xml_free(out)
 
     cpdef bytes to_bin(self):
         cdef:
             char* out = NULL
-            uint32_t length
+            uint32_t length = 0
         plist_to_bin(self._c_node, &out, &length)
 
         try:
-            return bytes(out[:length])
+            return out[:length]
         finally:
             if out != NULL:
-                libc.stdlib.free(out)
+                plist_to_bin_free(out)
 
-    property parent:
-        def __get__(self):
-            cdef plist_t c_parent = NULL
-            cdef Node node
+    cpdef object to_native(self):
+        return _to_native(self._c_node)
 
-            c_parent = plist_get_parent(self._c_node)
-            if c_parent == NULL:
-                return None
+    def get_parent(self):
+        cdef plist_t c_parent = plist_get_parent(self._c_node)
+        if c_parent == NULL:
+            return None
 
-            return plist_t_to_node(c_parent)
+        return _plist_t_to_node(c_parent, False)
+
+    property parent:
+        def __get__(self):
+            return self.get_parent()
 
     def __str__(self):
         return str(self.get_value())
 
+
 cdef class Bool(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        if value is None:
-            self._c_node = plist_new_bool(0)
-        else:
-            self._c_node = plist_new_bool(bool(value))
+        if value is _WRAP:
+            return
+        self._c_node = plist_new_bool(bool(value))
+        self._c_managed = True
 
-    def __nonzero__(self):
+    def __bool__(self):
         return self.get_value()
 
     def __richcmp__(self, other, op):
-        cdef bint b = self.get_value()
+        b = self.get_value()
         if op == 0:
             return b < other
         if op == 1:
@@ -157,33 +204,26 @@ cdef class Bool(Node):
             return b >= other
 
     def __repr__(self):
-        b = self.get_value()
-        return '<Bool: %s>' % b
+        return '<Bool: %s>' % self.get_value()
 
     cpdef set_value(self, object value):
         plist_set_bool_val(self._c_node, bool(value))
 
     cpdef bint get_value(self):
-        cdef uint8_t value
+        cdef uint8_t value = 0
         plist_get_bool_val(self._c_node, &value)
-        return bool(value)
+        return value != 0
 
-cdef Bool Bool_factory(plist_t c_node, bint managed=True):
-    cdef Bool instance = Bool.__new__(Bool)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
 cdef class Integer(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        if value is None:
-            self._c_node = plist_new_uint(0)
-        else:
-            self._c_node = plist_new_uint(int(value))
+        if value is _WRAP:
+            return
+        self._c_node = plist_new_uint(int(value or 0))
+        self._c_managed = True
 
     def __repr__(self):
-        cdef uint64_t i = self.get_value()
-        return '<Integer: %s>' % i
+        return '<Integer: %s>' % self.get_value()
 
     def __int__(self):
         return self.get_value()
@@ -192,7 +232,7 @@ cdef class Integer(Node):
         return float(self.get_value())
 
     def __richcmp__(self, other, op):
-        cdef int i = self.get_value()
+        i = self.get_value()
         if op == 0:
             return i < other
         if op == 1:
@@ -210,26 +250,20 @@ cdef class Integer(Node):
         plist_set_uint_val(self._c_node, int(value))
 
     cpdef uint64_t get_value(self):
-        cdef uint64_t value
+        cdef uint64_t value = 0
         plist_get_uint_val(self._c_node, &value)
         return value
 
-cdef Integer Integer_factory(plist_t c_node, bint managed=True):
-    cdef Integer instance = Integer.__new__(Integer)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
 cdef class Real(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        if value is None:
-            self._c_node = plist_new_real(0.0)
-        else:
-            self._c_node = plist_new_real(float(value))
+        if value is _WRAP:
+            return
+        self._c_node = plist_new_real(float(value or 0.0))
+        self._c_managed = True
 
     def __repr__(self):
-        r = self.get_value()
-        return '<Real: %s>' % r
+        return '<Real: %s>' % self.get_value()
 
     def __float__(self):
         return self.get_value()
@@ -238,7 +272,7 @@ cdef class Real(Node):
         return int(self.get_value())
 
     def __richcmp__(self, other, op):
-        cdef float f = self.get_value()
+        f = self.get_value()
         if op == 0:
             return f < other
         if op == 1:
@@ -255,27 +289,21 @@ cdef class Real(Node):
     cpdef set_value(self, object value):
         plist_set_real_val(self._c_node, float(value))
 
-    cpdef float get_value(self):
-        cdef double value
+    cpdef double get_value(self):
+        cdef double value = 0
         plist_get_real_val(self._c_node, &value)
         return value
 
-cdef Real Real_factory(plist_t c_node, bint managed=True):
-    cdef Real instance = Real.__new__(Real)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
 cdef class Uid(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        if value is None:
-            self._c_node = plist_new_uid(0)
-        else:
-            self._c_node = plist_new_uid(int(value))
+        if value is _WRAP:
+            return
+        self._c_node = plist_new_uid(int(value or 0))
+        self._c_managed = True
 
     def __repr__(self):
-        cdef uint64_t i = self.get_value()
-        return '<Uid: %s>' % i
+        return '<Uid: %s>' % self.get_value()
 
     def __int__(self):
         return self.get_value()
@@ -284,7 +312,7 @@ cdef class Uid(Node):
         return float(self.get_value())
 
     def __richcmp__(self, other, op):
-        cdef int i = self.get_value()
+        i = self.get_value()
         if op == 0:
             return i < other
         if op == 1:
@@ -302,43 +330,34 @@ cdef class Uid(Node):
         plist_set_uid_val(self._c_node, int(value))
 
     cpdef uint64_t get_value(self):
-        cdef uint64_t value
+        cdef uint64_t value = 0
         plist_get_uid_val(self._c_node, &value)
         return value
 
-cdef Uid Uid_factory(plist_t c_node, bint managed=True):
-    cdef Uid instance = Uid.__new__(Uid)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
-from cpython cimport PY_MAJOR_VERSION
+cdef bytes _utf8(object value):
+    if not isinstance(value, str):
+        raise ValueError("Requires unicode input, got %s" % type(value))
+    return value.encode('utf-8')
+
 
 cdef class Key(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        cdef:
-            char* c_utf8_data = NULL
-            bytes utf8_data
+        cdef bytes utf8_data
+        if value is _WRAP:
+            return
         if value is None:
             raise ValueError("Requires a value")
-        else:
-            if isinstance(value, unicode):
-                utf8_data = value.encode('utf-8')
-            elif (PY_MAJOR_VERSION < 3) and isinstance(value, str):
-                value.encode('ascii') # trial decode
-                utf8_data = value.encode('ascii')
-            else:
-                raise ValueError("Requires unicode input, got %s" % type(value))
-            c_utf8_data = utf8_data
-            self._c_node = plist_new_string("")
-            plist_set_key_val(self._c_node, c_utf8_data)
+        utf8_data = _utf8(value)
+        self._c_node = plist_new_string(b"")
+        self._c_managed = True
+        plist_set_key_val(self._c_node, utf8_data)
 
     def __repr__(self):
-        s = self.get_value()
-        return '<Key: %s>' % s.encode('utf-8')
+        return '<Key: %s>' % self.get_value()
 
     def __richcmp__(self, other, op):
-        cdef unicode s = self.get_value()
+        s = self.get_value()
         if op == 0:
             return s < other
         if op == 1:
@@ -353,61 +372,32 @@ cdef class Key(Node):
             return s >= other
 
     cpdef set_value(self, object value):
-        cdef:
-            char* c_utf8_data = NULL
-            bytes utf8_data
-        if value is None:
-            plist_set_key_val(self._c_node, c_utf8_data)
-        else:
-            if isinstance(value, unicode):
-                utf8_data = value.encode('utf-8')
-            elif (PY_MAJOR_VERSION < 3) and isinstance(value, str):
-                value.encode('ascii') # trial decode
-                utf8_data = value.encode('ascii')
-            else:
-                raise ValueError("Requires unicode input, got %s" % type(value))
-            c_utf8_data = utf8_data
-            plist_set_key_val(self._c_node, c_utf8_data)
+        cdef bytes utf8_data = _utf8(value)
+        plist_set_key_val(self._c_node, utf8_data)
 
     cpdef unicode get_value(self):
-        cdef:
-            char* c_value = NULL
+        cdef char* c_value = NULL
         plist_get_key_val(self._c_node, &c_value)
         try:
-            return cpython.PyUnicode_DecodeUTF8(c_value, len(c_value), 'strict')
+            return _decode(c_value, strlen(c_value))
         finally:
             libc.stdlib.free(c_value)
 
-cdef Key Key_factory(plist_t c_node, bint managed=True):
-    cdef Key instance = Key.__new__(Key)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
 cdef class String(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        cdef:
-            char* c_utf8_data = NULL
-            bytes utf8_data
-        if value is None:
-            self._c_node = plist_new_string("")
-        else:
-            if isinstance(value, unicode):
-                utf8_data = value.encode('utf-8')
-            elif (PY_MAJOR_VERSION < 3) and isinstance(value, str):
-                value.encode('ascii') # trial decode
-                utf8_data = value.encode('ascii')
-            else:
-                raise ValueError("Requires unicode input, got %s" % type(value))
-            c_utf8_data = utf8_data
-            self._c_node = plist_new_string(c_utf8_data)
+        cdef bytes utf8_data
+        if value is _WRAP:
+            return
+        utf8_data = b"" if value is None else _utf8(value)
+        self._c_node = plist_new_string(utf8_data)
+        self._c_managed = True
 
     def __repr__(self):
-        s = self.get_value()
-        return '<String: %s>' % s.encode('utf-8')
+        return '<String: %s>' % self.get_value()
 
     def __richcmp__(self, other, op):
-        cdef unicode s = self.get_value()
+        s = self.get_value()
         if op == 0:
             return s < other
         if op == 1:
@@ -422,63 +412,33 @@ cdef class String(Node):
             return s >= other
 
     cpdef set_value(self, object value):
-        cdef:
-            char* c_utf8_data = NULL
-            bytes utf8_data
-        if value is None:
-            plist_set_string_val(self._c_node, c_utf8_data)
-        else:
-            if isinstance(value, unicode):
-                utf8_data = value.encode('utf-8')
-            elif (PY_MAJOR_VERSION < 3) and isinstance(value, str):
-                value.encode('ascii') # trial decode
-                utf8_data = value.encode('ascii')
-            else:
-                raise ValueError("Requires unicode input, got %s" % type(value))
-            c_utf8_data = utf8_data
-            plist_set_string_val(self._c_node, c_utf8_data)
+        cdef bytes utf8_data = _utf8(value)
+        plist_set_string_val(self._c_node, utf8_data)
 
     cpdef unicode get_value(self):
-        cdef:
-            char* c_value = NULL
-        plist_get_string_val(self._c_node, &c_value)
-        try:
-            return cpython.PyUnicode_DecodeUTF8(c_value, len(c_value), 'strict')
-        finally:
-            libc.stdlib.free(c_value)
-
-cdef String String_factory(plist_t c_node, bint managed=True):
-    cdef String instance = String.__new__(String)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
-
-MAC_EPOCH = 978307200
+        cdef uint64_t length = 0
+        cdef const char* c_value = plist_get_string_ptr(self._c_node, &length)
+        return _decode(c_value, length)
 
-cdef extern from "plist_util.h":
-    void datetime_to_ints(object obj, int32_t* sec, int32_t* usec)
-    object ints_to_datetime(int32_t sec, int32_t usec)
-    int check_datetime(object obj)
 
-cdef plist_t create_date_plist(value=None):
-    cdef plist_t node = NULL
-    cdef int32_t secs
-    cdef int32_t usecs
+cdef plist_t create_date_plist(object value=None):
     if value is None:
-        node = plist_new_date(0, 0)
-    elif check_datetime(value):
-        datetime_to_ints(value, &secs, &usecs)
-        secs -= MAC_EPOCH
-        node = plist_new_date(secs, usecs)
-    return node
+        return plist_new_date(0, 0)
+    if isinstance(value, datetime):
+        secs, usecs = datetime_to_ints(value)
+        return plist_new_date(secs, usecs)
+    return NULL
+
 
 cdef class Date(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
+        if value is _WRAP:
+            return
         self._c_node = create_date_plist(value)
+        self._c_managed = True
 
     def __repr__(self):
-        d = self.get_value()
-        return '<Date: %s>' % d.ctime()
+        return '<Date: %s>' % self.get_value().ctime()
 
     def __richcmp__(self, other, op):
         d = self.get_value()
@@ -499,36 +459,29 @@ cdef class Date(Node):
         cdef int32_t secs = 0
         cdef int32_t usecs = 0
         plist_get_date_val(self._c_node, &secs, &usecs)
-        secs += MAC_EPOCH
-        return ints_to_datetime(secs, usecs)
+        return MAC_EPOCH_DATETIME + timedelta(seconds=secs, microseconds=usecs)
 
     cpdef set_value(self, object value):
-        cdef int32_t secs
-        cdef int32_t usecs
-        if not check_datetime(value):
+        if not isinstance(value, datetime):
             raise ValueError("Expected a datetime")
-        datetime_to_ints(value, &secs, &usecs)
+        secs, usecs = datetime_to_ints(value)
         plist_set_date_val(self._c_node, secs, usecs)
 
-cdef Date Date_factory(plist_t c_node, bint managed=True):
-    cdef Date instance = Date.__new__(Date)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
 cdef class Data(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
-        if value is None:
-            self._c_node = plist_new_data(NULL, 0)
-        else:
-            self._c_node = plist_new_data(value, len(value))
+        cdef bytes py_val
+        if value is _WRAP:
+            return
+        py_val = b"" if value is None else bytes(value)
+        self._c_node = plist_new_data(py_val, len(py_val))
+        self._c_managed = True
 
     def __repr__(self):
-        d = self.get_value()
-        return '<Data: %s>' % d
+        return '<Data: %s>' % self.get_value()
 
     def __richcmp__(self, other, op):
-        cdef bytes d = self.get_value()
+        d = self.get_value()
         if op == 0:
             return d < other
         if op == 1:
@@ -543,75 +496,101 @@ cdef class Data(Node):
             return d >= other
 
     cpdef bytes get_value(self):
-        cdef:
-            char* val = NULL
-            uint64_t length = 0
-        plist_get_data_val(self._c_node, &val, &length)
-
-        try:
-            return bytes(val[:length])
-        finally:
-            libc.stdlib.free(val)
+        cdef uint64_t length = 0
+        cdef const char* c_value = plist_get_data_ptr(self._c_node, &length)
+        if c_value == NULL:
+            return b''
+        return c_value[:length]
 
     cpdef set_value(self, object value):
-        cdef:
-            bytes py_val = value
-        plist_set_data_val(self._c_node, py_val, len(value))
+        cdef bytes py_val = bytes(value)
+        plist_set_data_val(self._c_node, py_val, len(py_val))
 
-cdef Data Data_factory(plist_t c_node, bint managed=True):
-    cdef Data instance = Data.__new__(Data)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    return instance
 
-cdef plist_t create_dict_plist(object value=None):
-    cdef plist_t node = NULL
-    cdef plist_t c_node = NULL
-    node = plist_new_dict()
+cdef plist_t create_dict_plist(object value=None) except? NULL:
+    cdef plist_t node = plist_new_dict()
+    cdef bytes c_key
     if value is not None and isinstance(value, dict):
         for key, item in value.items():
-            c_node = native_to_plist_t(item)
-            plist_dict_set_item(node, key, c_node)
-            c_node = NULL
+            c_key = _utf8(key)
+            plist_dict_set_item(node, c_key, _adopt(item))
     return node
 
-cimport cpython
 
 cdef class Dict(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
+        if value is _WRAP:
+            return
         self._c_node = create_dict_plist(value)
+        self._c_managed = True
 
     def __init__(self, value=None, *args, **kwargs):
-        self._init()
+        self._init(False)
 
-    cdef void _init(self):
+    cdef int _init(self, bint lazy) except -1:
         cdef plist_dict_iter it = NULL
         cdef char* key = NULL
         cdef plist_t subnode = NULL
 
-        self._map = cpython.PyDict_New()
+        self._map = {}
+        self._lazy = lazy
 
-        plist_dict_new_iter(self._c_node, &it);
-        plist_dict_next_item(self._c_node, it, &key, &subnode);
+        # In lazy mode children are wrapped on first access by __getitem__
+        if lazy:
+            return 0
 
-        while subnode is not NULL:
-            py_key = key
+        plist_dict_new_iter(self._c_node, &it)
+        try:
+            plist_dict_next_item(self._c_node, it, &key, &subnode)
+            while key != NULL:
+                try:
+                    self._map[_decode(key, strlen(key))] = _plist_t_to_node(subnode, False)
+                finally:
+                    libc.stdlib.free(key)
+                key = NULL
+                subnode = NULL
+                plist_dict_next_item(self._c_node, it, &key, &subnode)
+        finally:
+            libc.stdlib.free(it)
+        return 0
 
-            if PY_MAJOR_VERSION >= 3:
-                py_key = py_key.decode('utf-8')
+    cdef list _keys(self):
+        cdef plist_dict_iter it = NULL
+        cdef char* key = NULL
+        cdef list keys = []
 
-            cpython.PyDict_SetItem(self._map, py_key, plist_t_to_node(subnode, False))
-            subnode = NULL
-            libc.stdlib.free(key)
-            key = NULL
-            plist_dict_next_item(self._c_node, it, &key, &subnode);
-        libc.stdlib.free(it)
+        plist_dict_new_iter(self._c_node, &it)
+        try:
+            plist_dict_next_item(self._c_node, it, &key, NULL)
+            while key != NULL:
+                try:
+                    keys.append(_decode(key, strlen(key)))
+                finally:
+                    libc.stdlib.free(key)
+                key = NULL
+                plist_dict_next_item(self._c_node, it, &key, NULL)
+        finally:
+            libc.stdlib.free(it)
+        return keys
+
+    cdef object _child(self, unicode key):
+        cdef plist_t c_subnode
+        cdef bytes c_key
+        node = self._map.get(key)
+        if node is None:
+            c_key = _utf8(key)
+            c_subnode = plist_dict_get_item(self._c_node, c_key)
+            if c_subnode == NULL:
+                raise KeyError(key)
+            node = _plist_t_to_node(c_subnode, False, True)
+            self._map[key] = node
+        return node
 
     def __dealloc__(self):
         self._map = None
 
     def __richcmp__(self, other, op):
-        cdef dict d = self.get_value()
+        d = self.get_value()
         if op == 0:
             return d < other
         if op == 1:
@@ -626,101 +605,139 @@ cdef class Dict(Node):
             return d >= other
 
     def __len__(self):
-        return cpython.PyDict_Size(self._map)
+        if self._lazy:
+            return plist_dict_get_size(self._c_node)
+        return len(self._map)
 
     def __repr__(self):
+        if self._lazy:
+            return '<Dict: %s>' % dict(self.items())
         return '<Dict: %s>' % self._map
 
     cpdef dict get_value(self):
-        return dict([(key, value.get_value()) for key, value in self.items()])
+        return _to_native(self._c_node)
 
     cpdef set_value(self, dict value):
         plist_free(self._c_node)
         self._map = {}
         self._c_node = NULL
         self._c_node = create_dict_plist(value)
-        self._init()
+        self._init(self._lazy)
 
     def __iter__(self):
-        return self._map.__iter__()
+        if self._lazy:
+            return iter(self._keys())
+        return iter(self._map)
+
+    def __contains__(self, key):
+        cdef bytes c_key
+        if self._lazy:
+            if key in self._map:
+                return True
+            c_key = _utf8(key)
+            return plist_dict_get_item(self._c_node, c_key) != NULL
+        return key in self._map
 
     cpdef bint has_key(self, key):
-        return self._map.has_key(key)
+        return key in self
 
     cpdef object get(self, key, default=None):
+        if self._lazy:
+            try:
+                return self._child(key)
+            except KeyError:
+                return default
         return self._map.get(key, default)
 
     cpdef list keys(self):
-        return cpython.PyDict_Keys(self._map)
+        if self._lazy:
+            return self._keys()
+        return list(self._map)
 
     cpdef object iterkeys(self):
-        return self._map.iterkeys()
+        return iter(self)
 
     cpdef list items(self):
-        return cpython.PyDict_Items(self._map)
+        if self._lazy:
+            return [(key, self._child(key)) for key in self._keys()]
+        return list(self._map.items())
 
     cpdef object iteritems(self):
-        return self._map.iteritems()
+        return iter(self.items())
 
     cpdef list values(self):
-        return cpython.PyDict_Values(self._map)
+        if self._lazy:
+            return [self._child(key) for key in self._keys()]
+        return list(self._map.values())
 
     cpdef object itervalues(self):
-        return self._map.itervalues()
+        return iter(self.values())
 
     def __getitem__(self, key):
+        if self._lazy:
+            return self._child(key)
         return self._map[key]
 
     def __setitem__(self, key, value):
-        cdef Node n
-        if isinstance(value, Node):
-            n = value.copy()
-        else:
-            n = plist_t_to_node(native_to_plist_t(value), False)
-
-        plist_dict_set_item(self._c_node, key, n._c_node)
+        cdef bytes c_key = _utf8(key)
+        cdef Node n = _plist_t_to_node(_adopt(value), False)
+        plist_dict_set_item(self._c_node, c_key, n._c_node)
         self._map[key] = n
 
     def __delitem__(self, key):
-        cpython.PyDict_DelItem(self._map, key)
-        plist_dict_remove_item(self._c_node, key)
+        cdef bytes c_key = _utf8(key)
+        if self._lazy:
+            if key not in self:
+                raise KeyError(key)
+            self._map.pop(key, None)
+        else:
+            del self._map[key]
+        plist_dict_remove_item(self._c_node, c_key)
 
-cdef Dict Dict_factory(plist_t c_node, bint managed=True):
-    cdef Dict instance = Dict.__new__(Dict)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    instance._init()
-    return instance
 
-cdef plist_t create_array_plist(object value=None):
-    cdef plist_t node = NULL
-    cdef plist_t c_node = NULL
-    node = plist_new_array()
+cdef plist_t create_array_plist(object value=None) except? NULL:
+    cdef plist_t node = plist_new_array()
     if value is not None and (isinstance(value, list) or isinstance(value, tuple)):
         for item in value:
-            c_node = native_to_plist_t(item)
-            plist_array_append_item(node, c_node)
-            c_node = NULL
+            plist_array_append_item(node, _adopt(item))
     return node
 
+
 cdef class Array(Node):
     def __cinit__(self, object value=None, *args, **kwargs):
+        if value is _WRAP:
+            return
         self._c_node = create_array_plist(value)
+        self._c_managed = True
 
     def __init__(self, value=None, *args, **kwargs):
-        self._init()
+        self._init(False)
 
-    cdef void _init(self):
-        self._array = []
+    cdef int _init(self, bint lazy) except -1:
         cdef uint32_t size = plist_array_get_size(self._c_node)
-        cdef plist_t subnode = NULL
+        cdef uint32_t i
+
+        self._lazy = lazy
+
+        # In lazy mode slots stay empty until __getitem__ wraps them
+        if lazy:
+            self._array = [None] * size
+            return 0
+
+        self._array = [_plist_t_to_node(plist_array_get_item(self._c_node, i), False) for i in range(size)]
+        return 0
 
-        for i in range(size):
-            subnode = plist_array_get_item(self._c_node, i)
-            self._array.append(plist_t_to_node(subnode, False))
+    cdef object _child(self, Py_ssize_t index):
+        if index < 0:
+            index += len(self._array)
+        node = self._array[index]
+        if node is None:
+            node = _plist_t_to_node(plist_array_get_item(self._c_node, <uint32_t>index), False, True)
+            self._array[index] = node
+        return node
 
     def __richcmp__(self, other, op):
-        cdef list l = self.get_value()
+        l = self.get_value()
         if op == 0:
             return l < other
         if op == 1:
@@ -738,30 +755,36 @@ cdef class Array(Node):
         return len(self._array)
 
     def __repr__(self):
+        if self._lazy:
+            return '<Array: %s>' % list(self)
         return '<Array: %s>' % self._array
 
     cpdef list get_value(self):
-        return [i.get_value() for i in self]
+        return _to_native(self._c_node)
 
-    cpdef set_value(self, object value):
+    cpdef set_value(self, value):
         self._array = []
         plist_free(self._c_node)
         self._c_node = NULL
         self._c_node = create_array_plist(value)
-        self._init()
+        self._init(self._lazy)
 
     def __iter__(self):
-        return self._array.__iter__()
+        if self._lazy:
+            return (self._child(i) for i in range(len(self._array)))
+        return iter(self._array)
 
     def __getitem__(self, index):
-        return self._array[index]
+        if not self._lazy:
+            return self._array[index]
+
+        if isinstance(index, slice):
+            return [self._child(i) for i in range(*index.indices(len(self._array)))]
+
+        return self._child(index)
 
     def __setitem__(self, index, value):
-        cdef Node n
-        if isinstance(value, Node):
-            n = value.copy()
-        else:
-            n = plist_t_to_node(native_to_plist_t(value), False)
+        cdef Node n = _plist_t_to_node(_adopt(value), False)
 
         if index < 0:
             index = len(self) + index
@@ -776,47 +799,39 @@ cdef class Array(Node):
         plist_array_remove_item(self._c_node, index)
 
     cpdef append(self, object item):
-        cdef Node n
-
-        if isinstance(item, Node):
-            n = item.copy()
-        else:
-            n = plist_t_to_node(native_to_plist_t(item), False)
-
+        cdef Node n = _plist_t_to_node(_adopt(item), False)
         plist_array_append_item(self._c_node, n._c_node)
         self._array.append(n)
 
-cdef Array Array_factory(plist_t c_node, bint managed=True):
-    cdef Array instance = Array.__new__(Array)
-    instance._c_managed = managed
-    instance._c_node = c_node
-    instance._init()
-    return instance
+    def insert(self, index, item):
+        cdef Node n
 
-cpdef object from_xml(xml):
-    cdef plist_t c_node = NULL
-    plist_from_xml(xml, len(xml), &c_node)
-    return plist_t_to_node(c_node)
+        if index < 0:
+            index = max(0, len(self) + index)
+        if index >= len(self):
+            self.append(item)
+            return
 
-cpdef object from_bin(bytes bin):
-    cdef plist_t c_node = NULL
-    plist_from_bin(bin, len(bin), &c_node)
-    return plist_t_to_node(c_node)
+        n = _plist_t_to_node(_adopt(item), False)
+        plist_array_insert_item(self._c_node, n._c_node, index)
+        self._array.insert(index, n)
 
-cdef plist_t native_to_plist_t(object native):
-    cdef plist_t c_node
-    cdef plist_t child_c_node
-    cdef int32_t secs = 0
-    cdef int32_t usecs = 0
+
+cdef plist_t native_to_plist_t(object native) except? NULL:
     cdef Node node
+    cdef bytes data
     if isinstance(native, Node):
         node = native
         return plist_copy(node._c_node)
-    if isinstance(native, basestring):
-        return plist_new_string(native)
+    if isinstance(native, str):
+        data = _utf8(native)
+        return plist_new_string(data)
+    if isinstance(native, (bytes, bytearray)):
+        data = bytes(native)
+        return plist_new_data(data, len(data))
     if isinstance(native, bool):
-        return plist_new_bool(<bint>native)
-    if isinstance(native, int) or isinstance(native, long):
+        return plist_new_bool(native)
+    if isinstance(native, int):
         return plist_new_uint(native)
     if isinstance(native, float):
         return plist_new_real(native)
@@ -824,124 +839,234 @@ cdef plist_t native_to_plist_t(object native):
         return create_dict_plist(native)
     if isinstance(native, list) or isinstance(native, tuple):
         return create_array_plist(native)
-    if check_datetime(native):
+    if isinstance(native, datetime):
         return create_date_plist(native)
+    return NULL
+
 
-cdef object plist_t_to_node(plist_t c_plist, bint managed=True):
+cdef object _plist_t_to_node(plist_t c_plist, bint managed=True, bint lazy=False):
     cdef plist_type t = plist_get_node_type(c_plist)
+    cdef Node node
     if t == PLIST_BOOLEAN:
-        return Bool_factory(c_plist, managed)
+        return _wrap(Bool, c_plist, managed)
     if t == PLIST_UINT:
-        return Integer_factory(c_plist, managed)
+        return _wrap(Integer, c_plist, managed)
     if t == PLIST_KEY:
-        return Key_factory(c_plist, managed)
+        return _wrap(Key, c_plist, managed)
     if t == PLIST_REAL:
-        return Real_factory(c_plist, managed)
+        return _wrap(Real, c_plist, managed)
     if t == PLIST_STRING:
-        return String_factory(c_plist, managed)
+        return _wrap(String, c_plist, managed)
     if t == PLIST_ARRAY:
-        return Array_factory(c_plist, managed)
+        node = _wrap(Array, c_plist, managed)
+        (<Array>node)._init(lazy)
+        return node
     if t == PLIST_DICT:
-        return Dict_factory(c_plist, managed)
+        node = _wrap(Dict, c_plist, managed)
+        (<Dict>node)._init(lazy)
+        return node
     if t == PLIST_DATE:
-        return Date_factory(c_plist, managed)
+        return _wrap(Date, c_plist, managed)
     if t == PLIST_DATA:
-        return Data_factory(c_plist, managed)
+        return _wrap(Data, c_plist, managed)
     if t == PLIST_UID:
-        return Uid_factory(c_plist, managed)
-    if t == PLIST_NONE:
-        return None
-
-# This is to match up with the new plistlib API
-# http://docs.python.org/dev/library/plistlib.html
-# dump() and dumps() are not yet implemented
-FMT_XML = 1
-FMT_BINARY = 2
-
-cpdef object load(fp, fmt=None, use_builtin_types=True, dict_type=dict):
-    is_binary = fp.read(6) == 'bplist'
-    fp.seek(0)
-
-    cdef object cb = None
-
-    if not fmt:
-        if is_binary:
-            if 'b' not in fp.mode:
-                raise IOError('File handle must be opened in binary (b) mode to read binary property lists')
-            cb = from_bin
-        else:
-            cb = from_xml
-    else:
-        if fmt not in (FMT_XML, FMT_BINARY):
-            raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
-        if fmt == FMT_BINARY:
-            cb = from_bin
-        elif fmt == FMT_XML:
-            cb = from_xml
+        return _wrap(Uid, c_plist, managed)
+    return None
 
-    if is_binary and fmt == FMT_XML:
-        raise ValueError('Cannot parse binary property list as XML')
-    elif not is_binary and fmt == FMT_BINARY:
-        raise ValueError('Cannot parse XML property list as binary')
 
-    return cb(fp.read())
+cdef object _to_native(plist_t c_plist):
+    cdef plist_type t = plist_get_node_type(c_plist)
+    cdef uint8_t b = 0
+    cdef uint64_t u = 0
+    cdef double r = 0
+    cdef int32_t secs = 0
+    cdef int32_t usecs = 0
+    cdef uint64_t length = 0
+    cdef const char* c_value = NULL
+    cdef char* key = NULL
+    cdef plist_t subnode = NULL
+    cdef plist_dict_iter it = NULL
+    cdef uint32_t i
+    cdef dict result
+
+    if t == PLIST_STRING:
+        c_value = plist_get_string_ptr(c_plist, &length)
+        return _decode(c_value, length)
+    if t == PLIST_UINT:
+        plist_get_uint_val(c_plist, &u)
+        return u
+    if t == PLIST_DICT:
+        result = {}
+        plist_dict_new_iter(c_plist, &it)
+        try:
+            plist_dict_next_item(c_plist, it, &key, &subnode)
+            while key != NULL:
+                try:
+                    result[_decode(key, strlen(key))] = _to_native(subnode)
+                finally:
+                    libc.stdlib.free(key)
+                key = NULL
+                subnode = NULL
+                plist_dict_next_item(c_plist, it, &key, &subnode)
+        finally:
+            libc.stdlib.free(it)
+        return result
+    if t == PLIST_ARRAY:
+        return [_to_native(plist_array_get_item(c_plist, i)) for i in range(plist_array_get_size(c_plist))]
+    if t == PLIST_BOOLEAN:
+        plist_get_bool_val(c_plist, &b)
+        return b != 0
+    if t == PLIST_REAL:
+        plist_get_real_val(c_plist, &r)
+        return r
+    if t == PLIST_DATA:
+        c_value = plist_get_data_ptr(c_plist, &length)
+        if c_value == NULL:
+            return b''
+        return c_value[:length]
+    if t == PLIST_DATE:
+        plist_get_date_val(c_plist, &secs, &usecs)
+        return MAC_EPOCH_DATETIME + timedelta(seconds=secs, microseconds=usecs)
+    if t == PLIST_KEY:
+        plist_get_key_val(c_plist, &key)
+        try:
+            return _decode(key, strlen(key))
+        finally:
+            libc.stdlib.free(key)
+    if t == PLIST_UID:
+        plist_get_uid_val(c_plist, &u)
+        return UID(u)
+    return None
+
+
+cdef plist_t _address(object c_plist) except? NULL:
+    # Accepts what the ctypes binding hands around: an int address or a c_void_p
+    value = getattr(c_plist, 'value', c_plist)
+    if value is None:
+        return NULL
+    return <plist_t><uintptr_t>value
+
+
+def plist_t_to_node(c_plist, managed=True, lazy=False):
+    return _plist_t_to_node(_address(c_plist), managed, lazy)
+
+
+def plist_t_to_native(c_plist, free=False) -> object:
+    cdef plist_t c_node = _address(c_plist)
+    try:
+        return _to_native(c_node)
+    finally:
+        if free:
+            plist_free(c_node)
+
+
+cpdef object from_xml(xml, bint lazy=False, bint native=False):
+    cdef plist_t c_node = NULL
+    cdef bytes data = xml.encode('utf-8') if isinstance(xml, str) else bytes(xml)
+    plist_from_xml(data, len(data), &c_node)
+    if native:
+        try:
+            return _to_native(c_node)
+        finally:
+            plist_free(c_node)
+    return _plist_t_to_node(c_node, True, lazy)
+
+
+cpdef object from_bin(binary, bint lazy=False, bint native=False):
+    cdef plist_t c_node = NULL
+    cdef bytes data = binary if isinstance(binary, bytes) else bytes(binary)
+    plist_from_bin(data, len(data), &c_node)
+    if native:
+        try:
+            return _to_native(c_node)
+        finally:
+            plist_free(c_node)
+    return _plist_t_to_node(c_node, True, lazy)
 
-cpdef object loads(data, fmt=None, use_builtin_types=True, dict_type=dict):
-    is_binary = data[0:6] == 'bplist'
 
-    cdef object cb = None
+def _resolve_backend(backend):
+    if backend is None:
+        return BACKEND_LIBPLIST
+    if backend not in (BACKEND_LIBPLIST, BACKEND_PYTHON):
+        raise ValueError('Backend must be constant BACKEND_LIBPLIST or BACKEND_PYTHON')
+    return backend
+
+
+def load(fp, fmt=None, use_builtin_types=True, dict_type=dict, lazy=False, native=False, backend=None) -> object:
+    data = fp.read()
+    if not fmt and data[0:6] in (b'bplist', 'bplist') and 'b' not in getattr(fp, 'mode', 'b'):
+        raise IOError('File handle must be opened in binary (b) mode to read binary property lists')
+    return loads(data, fmt, use_builtin_types, dict_type, lazy, native, backend)
+
+
+def loads(data, fmt=None, use_builtin_types=True, dict_type=dict, lazy=False, native=False, backend=None) -> object:
+    if _resolve_backend(backend) == BACKEND_PYTHON:
+        return _ctypes_binding.loads(data, fmt, use_builtin_types, dict_type, lazy, native, BACKEND_PYTHON)
+
+    is_binary = data[0:6] in (b'bplist', 'bplist')
 
     if fmt is not None:
         if fmt not in (FMT_XML, FMT_BINARY):
             raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
-        if fmt == FMT_BINARY:
-            cb = from_bin
-        else:
-            cb = from_xml
+        cb = from_bin if fmt == FMT_BINARY else from_xml
     else:
-        if is_binary:
-            cb = from_bin
-        else:
-            cb = from_xml
+        cb = from_bin if is_binary else from_xml
 
     if is_binary and fmt == FMT_XML:
         raise ValueError('Cannot parse binary property list as XML')
     elif not is_binary and fmt == FMT_BINARY:
         raise ValueError('Cannot parse XML property list as binary')
 
-    return cb(data)
+    return cb(data, lazy, native)
 
-cpdef object dump(value, fp, fmt=FMT_XML, sort_keys=True, skipkeys=False):
-    fp.write(dumps(value, fmt=fmt))
 
-cpdef object dumps(value, fmt=FMT_XML, sort_keys=True, skipkeys=False):
+def _serialize_directly(value, backend) -> bool:
+    # The ctypes binding's rule, so both produce the same output for the same call
+    if _resolve_backend(backend) == BACKEND_PYTHON:
+        return True
+    return backend is None and not isinstance(value, Node)
+
+
+def dump(value, fp, fmt=FMT_XML, sort_keys=True, skipkeys=False, backend=None) -> object:
     if fmt not in (FMT_XML, FMT_BINARY):
         raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
 
-    if check_datetime(value):
-        node = Date(value)
-    elif isinstance(value, unicode):
-        node = String(value)
-    elif PY_MAJOR_VERSION >= 3 and isinstance(value, bytes):
-        node = Data(value)
-    elif isinstance(value, str):
-        # See if this is binary
+    if _serialize_directly(value, backend):
+        if isinstance(value, Node):
+            value = value.to_native()
+        _ctypes_binding.dump(value, fp, fmt, sort_keys, skipkeys, BACKEND_PYTHON)
+        return
+
+    fp.write(dumps(value, fmt=fmt, sort_keys=sort_keys, skipkeys=skipkeys, backend=backend))
+
+
+def dumps(value, fmt=FMT_XML, sort_keys=True, skipkeys=False, backend=None) -> object:
+    cdef plist_t c_node = NULL
+    cdef char* out = NULL
+    cdef uint32_t length = 0
+
+    if fmt not in (FMT_XML, FMT_BINARY):
+        raise ValueError('Format must be constant FMT_XML or FMT_BINARY')
+
+    if _serialize_directly(value, backend):
+        if isinstance(value, Node):
+            value = value.to_native()
+        return _ctypes_binding.dumps(value, fmt, sort_keys, skipkeys, BACKEND_PYTHON)
+
+    # Encode straight from the temporary plist_t, no Node wrappers are needed
+    c_node = _adopt(value)
+    try:
+        if fmt == FMT_XML:
+            plist_to_xml(c_node, &out, &length)
+            try:
+                return _decode(out, length)
+            finally:
+                plist_to_xml_free(out)
+
+        plist_to_bin(c_node, &out, &length)
         try:
-            node = String(value)
-        except ValueError:
-            node = Data(value)
-    elif isinstance(value, bool):
-        node = Bool(value)
-    elif isinstance(value, int):
-        node = Integer(value)
-    elif isinstance(value, float):
-        node = Real(value)
-    elif isinstance(value, dict):
-        node = Dict(value)
-    elif type(value) in (list, set, tuple):
-        node = Array(value)
-
-    if fmt == FMT_XML:
-        return node.to_xml()
-
-    return node.to_bin()
+            return out[:length]
+        finally:
+            plist_to_bin_free(out)
+    finally:
+        plist_free(c_node)
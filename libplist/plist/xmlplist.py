@@ -0,0 +1,282 @@
+from base64 import b64decode
+from binascii import b2a_base64
+from datetime import datetime, timezone
+from io import StringIO, TextIOBase
+from plistlib import UID
+from typing import *
+from xml.etree.ElementTree import XMLPullParser
+import re
+
+
+XML_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+XML_PLIST_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+                   '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" ' \
+                   '"http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n' \
+                   '<plist version="1.0">\n'
+XML_PLIST_FOOTER = '</plist>\n'
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _parse_integer(text: str) -> int:
+    text = text.strip()
+    if text[:2] in ('0x', '0X'):
+        return int(text, 16)
+    return int(text)
+
+
+_SCALAR_PARSERS = {
+    'string': lambda text: text,
+    'integer': _parse_integer,
+    'real': lambda text: float(text.strip()),
+    'true': lambda text: True,
+    'false': lambda text: False,
+    'date': lambda text: datetime.strptime(text.strip(), XML_DATE_FORMAT),
+    'data': lambda text: b64decode(text),
+}
+
+
+class _Frame(object):
+    __slots__ = ('path', 'value', 'is_dict', 'key', 'index')
+
+    def __init__(self, path: tuple, value, is_dict: bool):
+        self.path = path
+        self.value = value
+        self.is_dict = is_dict
+        self.key = None
+        self.index = 0
+
+    def child_path(self) -> tuple:
+        if self.is_dict:
+            if self.key is None:
+                raise ValueError('Dictionary value has no key')
+            return self.path + (self.key,)
+        return self.path + (self.index,)
+
+
+def iterparse(fp, depth: int = 1, prefix: tuple = (), chunk_size: int = DEFAULT_CHUNK_SIZE) \
+        -> Iterator[Tuple[tuple, object]]:
+    """Yield ``(path, value)`` for every value ``depth`` levels below the root of an XML plist.
+
+    Values above ``depth`` are never materialized and values whose path does not
+    start with ``prefix`` are skipped, so memory stays bounded by the largest
+    selected value rather than by the size of the document.
+    """
+    if len(prefix) > depth:
+        raise ValueError('prefix cannot be longer than depth')
+
+    parser = XMLPullParser(events=('start', 'end'))
+    elements = []
+    frames: List[_Frame] = []
+    building = 0
+
+    def emit(value):
+        frame = frames[-1] if frames else None
+        path = frame.child_path() if frame is not None else ()
+
+        if frame is not None:
+            if frame.is_dict:
+                if frame.value is not None:
+                    frame.value[frame.key] = value
+                frame.key = None
+            else:
+                if frame.value is not None:
+                    frame.value.append(value)
+                frame.index += 1
+
+        if selected(path):
+            return path, value
+        return None
+
+    def selected(path: tuple) -> bool:
+        return len(path) == depth and path[:len(prefix)] == prefix
+
+    first = True
+    while True:
+        chunk = fp.read(chunk_size)
+        if first:
+            if chunk[:6] in (b'bplist', 'bplist'):
+                raise ValueError('Cannot parse binary property list as XML')
+            first = False
+        if not chunk:
+            parser.close()
+        else:
+            parser.feed(chunk)
+
+        for event, element in parser.read_events():
+            tag = element.tag
+
+            if event == 'start':
+                elements.append(element)
+                if tag in ('dict', 'array'):
+                    path = frames[-1].child_path() if frames else ()
+                    if building or selected(path):
+                        building += 1
+                        frames.append(_Frame(path, {} if tag == 'dict' else [], tag == 'dict'))
+                    else:
+                        frames.append(_Frame(path, None, tag == 'dict'))
+                continue
+
+            elements.pop()
+            text = element.text or ''
+
+            if tag == 'key':
+                if not frames or not frames[-1].is_dict or frames[-1].key is not None:
+                    raise ValueError('Unexpected key %r' % text)
+                frames[-1].key = text
+            elif tag in ('dict', 'array'):
+                frame = frames.pop()
+                if frame.key is not None:
+                    raise ValueError('Missing value for key %r' % frame.key)
+                if frame.value is not None:
+                    building -= 1
+                result = emit(frame.value)
+                if result is not None:
+                    yield result
+            elif tag in _SCALAR_PARSERS:
+                parent = frames[-1] if frames else None
+                path = parent.child_path() if parent is not None else ()
+                value = _SCALAR_PARSERS[tag](text) if building or selected(path) else None
+                result = emit(value)
+                if result is not None:
+                    yield result
+
+            # Drop the finished element so the tree never holds more than the open path
+            element.clear()
+            if elements:
+                elements[-1].remove(element)
+
+        if not chunk:
+            break
+
+
+def _escape(text: str) -> str:
+    if _CONTROL_CHARS.search(text):
+        raise ValueError('Strings cannot contain control characters; use bytes instead')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class XmlPlistWriter(object):
+    """Writes native values as an XML plist, handing write() a chunk at a time.
+
+    Output matches plistlib's layout, except that UIDs are written the way
+    libplist does instead of being rejected.
+    """
+    _write: Callable[[str], object]
+    _chunks: List[str]
+    _pending: int
+
+    def __init__(self, write: Callable[[str], object], sort_keys: bool = True, skipkeys: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._write = write
+        self._sort_keys = sort_keys
+        self._skipkeys = skipkeys
+        self._chunk_size = chunk_size
+        self._chunks = []
+        self._pending = 0
+
+    def write(self, value):
+        self._line(XML_PLIST_HEADER)
+        self._write_value(value, 0)
+        self._line(XML_PLIST_FOOTER)
+        self.flush()
+
+    def flush(self):
+        if self._chunks:
+            self._write(''.join(self._chunks))
+            self._chunks = []
+            self._pending = 0
+
+    def _line(self, line: str):
+        self._chunks.append(line)
+        self._pending += len(line)
+        if self._pending >= self._chunk_size:
+            self.flush()
+
+    def _element(self, tag: str, text: str, level: int):
+        self._line('%s<%s>%s</%s>\n' % ('\t' * level, tag, text, tag))
+
+    def _write_value(self, value, level: int):
+        indent = '\t' * level
+
+        if isinstance(value, str):
+            self._element('string', _escape(value), level)
+        elif value is True:
+            self._line(indent + '<true/>\n')
+        elif value is False:
+            self._line(indent + '<false/>\n')
+        elif isinstance(value, UID):
+            self._write_value({'CF$UID': value.data}, level)
+        elif isinstance(value, int):
+            if not -1 << 63 <= value < 1 << 64:
+                raise OverflowError(value)
+            self._element('integer', '%d' % value, level)
+        elif isinstance(value, float):
+            self._element('real', repr(value), level)
+        elif isinstance(value, dict):
+            self._write_dict(value, level)
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            self._write_data(bytes(value), level)
+        elif isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc)
+            self._element('date', value.strftime(XML_DATE_FORMAT), level)
+        elif isinstance(value, (list, tuple)):
+            if not value:
+                self._line(indent + '<array/>\n')
+                return
+            self._line(indent + '<array>\n')
+            for item in value:
+                self._write_value(item, level + 1)
+            self._line(indent + '</array>\n')
+        else:
+            raise TypeError('Unsupported type for XML property list: %s' % type(value))
+
+    def _write_dict(self, value: dict, level: int):
+        indent = '\t' * level
+        if not value:
+            self._line(indent + '<dict/>\n')
+            return
+
+        self._line(indent + '<dict>\n')
+        items = value.items()
+        if self._skipkeys:
+            items = [(key, item) for key, item in items if isinstance(key, str)]
+        items = sorted(items) if self._sort_keys else items
+        for key, item in items:
+            if not isinstance(key, str):
+                raise TypeError('Dictionary keys must be strings, got %s' % type(key))
+            self._element('key', _escape(key), level + 1)
+            self._write_value(item, level + 1)
+        self._line(indent + '</dict>\n')
+
+    def _write_data(self, data: bytes, level: int):
+        indent = '\t' * level
+        # Same line width rule as plistlib: 76 columns, counting tabs as 8
+        line_length = max(16, 76 - 8 * level)
+        chunk_size = line_length // 4 * 3
+
+        self._line(indent + '<data>\n')
+        for start in range(0, len(data), chunk_size):
+            self._line(indent + b2a_base64(data[start:start + chunk_size]).decode('ascii'))
+        self._line(indent + '</data>\n')
+
+
+def dump(value, fp, sort_keys: bool = True, skipkeys: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Stream value to fp, as text for text files and UTF-8 for binary ones."""
+    if isinstance(fp, TextIOBase):
+        write = fp.write
+    else:
+        def write(text: str):
+            fp.write(text.encode('utf-8'))
+    XmlPlistWriter(write, sort_keys, skipkeys, chunk_size).write(value)
+
+
+def dumps(value, sort_keys: bool = True, skipkeys: bool = False) -> str:
+    buffer = StringIO()
+    dump(value, buffer, sort_keys, skipkeys)
+    return buffer.getvalue()
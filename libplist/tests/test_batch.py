@@ -0,0 +1,45 @@
+import os
+import plistlib
+
+import pytest
+
+from plist import load_dir, loads_many
+
+
+DOCUMENTS = [plistlib.dumps({'Index': i, 'Name': 'item%d' % i}, fmt=plistlib.FMT_BINARY if i % 2 else
+                            plistlib.FMT_XML) for i in range(50)]
+
+
+@pytest.mark.parametrize('workers', [1, 2], ids=['inline', 'pool'])
+def test_loads_many_keeps_input_order(workers):
+    results = list(loads_many(DOCUMENTS, workers=workers, chunksize=4))
+
+    assert [result.index for result in results] == list(range(50))
+    assert [result.value['Index'] for result in results] == list(range(50))
+
+
+def test_loads_many_unordered_returns_everything():
+    results = list(loads_many(DOCUMENTS, workers=2, chunksize=3, ordered=False))
+    assert sorted(result.value['Index'] for result in results) == list(range(50))
+
+
+def test_loads_many_collects_errors():
+    results = list(loads_many([DOCUMENTS[0], b'bplist00 truncated', DOCUMENTS[1]], workers=2, chunksize=1))
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert isinstance(results[1].error, Exception)
+
+
+def test_load_dir(tmp_path):
+    for i, data in enumerate(DOCUMENTS[:5]):
+        (tmp_path / ('%d.plist' % i)).write_bytes(data)
+    (tmp_path / 'nested').mkdir()
+    (tmp_path / 'nested' / 'Info.plist').write_bytes(DOCUMENTS[5])
+    (tmp_path / 'ignored.txt').write_bytes(b'')
+
+    results = list(load_dir(str(tmp_path), workers=2))
+
+    assert len(results) == 6
+    assert all(result.ok for result in results)
+    assert {os.path.basename(result.source) for result in results} == \
+        {'0.plist', '1.plist', '2.plist', '3.plist', '4.plist', 'Info.plist'}
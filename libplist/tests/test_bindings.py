@@ -0,0 +1,188 @@
+"""Conformance tests every plist binding has to pass, compiled and ctypes alike."""
+
+import importlib
+import io
+import plistlib
+from ctypes import c_void_p
+from datetime import datetime
+
+import pytest
+
+from plist import bindings, libplist
+
+
+COMPILED = bindings.compiled_binding()
+
+BINDINGS = [
+    pytest.param(module, id=name, marks=pytest.mark.skipif(module is None, reason='%s binding is not available' % name))
+    for name, module in bindings.native_bindings().items()
+]
+
+# Every module, including those whose C library is missing, still has to serve the Python backend
+MODULES = [
+    pytest.param(libplist, id='ctypes'),
+    pytest.param(COMPILED, id='cython',
+                 marks=pytest.mark.skipif(COMPILED is None, reason='compiled extension is not built')),
+]
+
+SAMPLE = {
+    'ProductVersion': '15.4',
+    'DeviceName': 'iPhone – test',
+    'Counts': [0, 1, 255, 256, 65536, 2 ** 32, 2 ** 63 - 1],
+    'Ratio': 0.25,
+    'Activated': True,
+    'Locked': False,
+    'Certificate': b'\x00\x01\x02' * 10,
+    'Date': datetime(2021, 6, 1, 12, 30, 15),
+    'Nested': {'Empty': {}, 'List': [[], ['a' * 20]]},
+}
+
+
+@pytest.mark.parametrize('fmt', [plistlib.FMT_XML, plistlib.FMT_BINARY], ids=['xml', 'binary'])
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_loads_native(binding, fmt):
+    assert binding.loads(plistlib.dumps(SAMPLE, fmt=fmt), native=True) == SAMPLE
+
+
+@pytest.mark.parametrize('lazy', [False, True], ids=['eager', 'lazy'])
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_loads_nodes(binding, lazy):
+    node = binding.loads(plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY), lazy=lazy)
+
+    assert isinstance(node, binding.Dict)
+    assert len(node) == len(SAMPLE)
+    assert 'Counts' in node and 'Missing' not in node
+    assert sorted(node.keys()) == sorted(SAMPLE)
+    assert node['Counts'][-1].get_value() == 2 ** 63 - 1
+    assert node['Nested']['List'][1][0].get_value() == 'a' * 20
+    assert node.get_value() == SAMPLE
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_to_native_matches_get_value(binding):
+    data = plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY)
+    node = binding.loads(data)
+
+    assert node.to_native() == SAMPLE
+    assert binding.loads(data, native=True) == SAMPLE
+    for key in SAMPLE:
+        assert node[key].to_native() == node[key].get_value() == SAMPLE[key]
+    for item in node['Counts']:
+        assert item.to_native() == item.get_value()
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_lazy_children_are_wrapped_once(binding):
+    node = binding.loads(plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY), lazy=True)
+    counts = node['Counts']
+
+    assert counts is node['Counts']
+    assert counts[-1] is counts[len(counts) - 1]
+    assert [item.get_value() for item in counts[1:3]] == SAMPLE['Counts'][1:3]
+    assert [item.get_value() for item in counts] == SAMPLE['Counts']
+    assert {key: value.get_value() for key, value in node.items()} == SAMPLE
+    assert node.get('Missing') is None
+    with pytest.raises(KeyError):
+        node['Missing']
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_lazy_mutation(binding):
+    node = binding.loads(plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY), lazy=True)
+    node['Name'] = 'device'
+    del node['Locked']
+    node['Counts'].append(7)
+    del node['Counts'][0]
+
+    expected = dict(SAMPLE, Name='device', Counts=SAMPLE['Counts'][1:] + [7])
+    del expected['Locked']
+    assert 'Locked' not in node
+    assert len(node) == len(expected)
+    assert node.get_value() == expected
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_lazy_key_iteration_can_be_abandoned(binding):
+    value = {'key%d' % i: i for i in range(100)}
+    node = binding.loads(binding.Dict(value).to_bin(), lazy=True)
+
+    for _ in range(1000):
+        keys = iter(node)
+        assert next(keys) in value
+        del keys
+    assert sorted(node) == sorted(value)
+
+
+@pytest.mark.parametrize('fmt', [libplist.FMT_XML, libplist.FMT_BINARY], ids=['xml', 'binary'])
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_dumps_is_readable_by_plistlib(binding, fmt):
+    data = binding.dumps(SAMPLE, fmt=fmt)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    assert plistlib.loads(data) == SAMPLE
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_mutation(binding):
+    node = binding.Dict({'Items': [1, 2]})
+    node['Name'] = 'device'
+    node['Items'].append(3)
+    del node['Items'][0]
+    node['Copy'] = node['Items']
+
+    assert node.get_value() == {'Items': [2, 3], 'Name': 'device', 'Copy': [2, 3]}
+    assert binding.loads(node.to_bin(), native=True) == node.get_value()
+
+
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_plist_t_to_node_wraps_ctypes_handles(binding):
+    handle = libplist.LIBPLIST.plist_copy(libplist.Dict(SAMPLE)._c_node)
+
+    assert binding.plist_t_to_node(c_void_p(handle), False).get_value() == SAMPLE
+    assert binding.plist_t_to_native(handle, free=True) == SAMPLE
+
+
+@pytest.mark.parametrize('fmt', [libplist.FMT_XML, libplist.FMT_BINARY], ids=['xml', 'binary'])
+@pytest.mark.parametrize('module', MODULES)
+def test_dumps_native_values_identically(module, fmt):
+    expected = libplist.dumps(SAMPLE, fmt=fmt, backend=libplist.BACKEND_PYTHON)
+    fp = io.BytesIO()
+    module.dump(SAMPLE, fp, fmt=fmt)
+
+    assert module.dumps(SAMPLE, fmt=fmt) == expected
+    assert fp.getvalue() == (expected.encode('utf-8') if isinstance(expected, str) else expected)
+
+
+@pytest.mark.parametrize('fmt', [libplist.FMT_XML, libplist.FMT_BINARY], ids=['xml', 'binary'])
+@pytest.mark.parametrize('binding', BINDINGS)
+def test_dumps_nodes(binding, fmt):
+    node = binding.loads(plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY))
+    data = binding.dumps(node, fmt=fmt)
+
+    assert plistlib.loads(data.encode('utf-8') if isinstance(data, str) else data) == SAMPLE
+
+
+@pytest.mark.parametrize('sort_keys', [True, False], ids=['sorted', 'unsorted'])
+@pytest.mark.parametrize('fmt', [libplist.FMT_XML, libplist.FMT_BINARY], ids=['xml', 'binary'])
+@pytest.mark.parametrize('module', MODULES)
+def test_dumps_skipkeys(module, fmt, sort_keys):
+    data = module.dumps({'a': 1, 2: 'x'}, fmt=fmt, sort_keys=sort_keys, skipkeys=True)
+
+    assert plistlib.loads(data.encode('utf-8') if isinstance(data, str) else data) == {'a': 1}
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_python_backend(module):
+    data = module.dumps(SAMPLE, fmt=module.FMT_BINARY, backend=module.BACKEND_PYTHON)
+    assert module.loads(data, backend=module.BACKEND_PYTHON) == SAMPLE
+
+
+def test_ctypes_binding_can_be_forced(monkeypatch):
+    monkeypatch.setenv('PLIST_BINDING', bindings.BINDING_CTYPES)
+    try:
+        forced = importlib.reload(bindings)
+        assert forced.BINDING == bindings.BINDING_CTYPES
+        assert forced.Dict is libplist.Dict
+    finally:
+        monkeypatch.delenv('PLIST_BINDING')
+        importlib.reload(bindings)
@@ -0,0 +1,120 @@
+import io
+import math
+import plistlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from plist import bplist, load_mmap
+
+
+SAMPLE = {
+    'ProductVersion': '15.4',
+    'DeviceName': 'iPhone – test',
+    'Counts': [0, 1, 255, 256, 65536, 2 ** 32, 2 ** 63 - 1, -1],
+    'Ratio': 0.25,
+    'Activated': True,
+    'Locked': False,
+    'Certificate': b'\x00\x01\x02' * 10,
+    'Date': datetime(2021, 6, 1, 12, 30, 15),
+    'Uid': plistlib.UID(7),
+    'Nested': {'Empty': {}, 'List': [[], ['a' * 20]]},
+}
+
+
+def test_loads_plistlib_output():
+    data = plistlib.dumps(SAMPLE, fmt=plistlib.FMT_BINARY)
+    assert bplist.loads(data) == SAMPLE
+
+
+def test_dumps_is_readable_by_plistlib():
+    assert plistlib.loads(bplist.dumps(SAMPLE)) == SAMPLE
+
+
+def test_loads_from_memoryview():
+    data = bytearray(bplist.dumps(SAMPLE))
+    assert bplist.loads(memoryview(data)) == SAMPLE
+
+
+def test_unsigned_64bit_integer():
+    value = 2 ** 64 - 1
+    assert bplist.loads(bplist.dumps([value])) == [value]
+
+
+def test_rejects_non_bplist():
+    with pytest.raises(ValueError):
+        bplist.loads(b'<?xml version="1.0"?><plist></plist>')
+
+
+def test_truncated_input_raises_value_error():
+    data = bplist.dumps(SAMPLE)
+    trailer = data[-bplist.BPLIST_TRAILER_SIZE:]
+    offset_table = int.from_bytes(trailer[-8:], 'big')
+
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            bplist.loads(data[:length])
+    for length in range(offset_table):
+        with pytest.raises(ValueError):
+            # The trailer is intact but objects and the offset table now end early
+            bplist.loads(data[:length] + trailer)
+
+
+def test_aware_datetimes_are_written_as_utc():
+    local = datetime(2021, 6, 1, 14, 30, 15, tzinfo=timezone(timedelta(hours=2)))
+    assert bplist.loads(bplist.dumps([local])) == [datetime(2021, 6, 1, 12, 30, 15)]
+
+
+def test_dumps_deduplicates_repeated_values():
+    value = [{'Domain': 'HomeDomain', 'Flags': 1} for _ in range(100)]
+    data = bplist.dumps(value)
+
+    assert len(data) < 1000
+    assert bplist.loads(data) == value
+
+
+def test_deduplication_keeps_types_apart():
+    value = [True, 1, 1.0, '1', b'1']
+    assert [type(item) for item in bplist.loads(bplist.dumps(value))] == [bool, int, float, str, bytes]
+
+
+def test_deduplication_keeps_signed_zeros_apart():
+    value = bplist.loads(bplist.dumps([0.0, -0.0, 0.0]))
+
+    assert [math.copysign(1.0, item) for item in value] == [1.0, -1.0, 1.0]
+
+
+def test_dump_to_file():
+    fp = io.BytesIO()
+    bplist.dump(SAMPLE, fp)
+    assert fp.getvalue() == bplist.dumps(SAMPLE)
+
+
+def test_load_mmap(tmp_path):
+    path = tmp_path / 'sample.plist'
+    path.write_bytes(bplist.dumps(SAMPLE))
+
+    value = load_mmap(str(path))
+
+    assert isinstance(value, bplist.BinaryPlistDict)
+    assert value['Nested']['List'][1] == ['a' * 20]
+    assert value['Counts'][-1] == -1
+    assert value == SAMPLE
+
+
+def test_load_mmap_finds_utf16_keys(tmp_path):
+    path = tmp_path / 'sample.plist'
+    path.write_bytes(plistlib.dumps({'Schlüssel': 1, 'Key': 2}, fmt=plistlib.FMT_BINARY))
+
+    value = load_mmap(str(path))
+
+    assert value['Schlüssel'] == 1
+    assert 'Missing' not in value
+
+
+def test_load_mmap_rejects_non_bplist(tmp_path):
+    path = tmp_path / 'sample.plist'
+    path.write_bytes(plistlib.dumps({'Key': 'value'}, fmt=plistlib.FMT_XML))
+
+    with pytest.raises(ValueError):
+        load_mmap(str(path))
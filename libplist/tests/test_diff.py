@@ -0,0 +1,115 @@
+import copy
+import importlib
+from datetime import datetime
+
+import pytest
+
+from plist import bplist, diff, libplist, patch
+from plist.diff import digest
+
+
+BEFORE = {
+    'Applications': {
+        'com.example.app': {'Version': '1.0', 'Size': 4096},
+        'com.example.old': {'Version': '0.9', 'Size': 1024},
+    },
+    'Domains': ['HomeDomain', 'CameraRollDomain', 'KeychainDomain', 'AppDomain'],
+    'Date': datetime(2022, 3, 4, 5, 6, 7),
+    'Encrypted': False,
+}
+
+AFTER = {
+    'Applications': {
+        'com.example.app': {'Version': '2.0', 'Size': 4096},
+        'com.example.new': {'Version': '1.0', 'Size': 2048},
+    },
+    'Domains': ['HomeDomain', 'MediaDomain', 'CameraRollDomain', 'AppDomain'],
+    'Date': datetime(2022, 4, 4, 5, 6, 7),
+    'Encrypted': 1,
+}
+
+
+def test_identical_trees_have_no_ops():
+    assert diff(BEFORE, copy.deepcopy(BEFORE)) == []
+
+
+def test_ops_are_path_based_and_compact():
+    ops = diff(BEFORE, AFTER)
+
+    assert ('set', ('Applications', 'com.example.app', 'Version'), '2.0') in ops
+    assert ('remove', ('Applications', 'com.example.old')) in ops
+    # Same value, different plist type
+    assert ('set', ('Encrypted',), 1) in ops
+    # Only the changed part of the array is touched
+    assert not any(op[1][:2] == ('Domains', 0) or op[1][:2] == ('Domains', 3) for op in ops)
+
+
+def test_each_subtree_is_digested_once(monkeypatch):
+    def chain(depth, leaf):
+        value = leaf
+        for level in range(depth):
+            value = {'Level%d' % level: value, 'Name': 'Level %d' % level}
+        return value
+
+    module = importlib.import_module('plist.diff')
+    encoded = []
+
+    class CountingWriter(bplist.BinaryPlistWriter):
+        def _encode(self, obj):
+            encoded.append(obj)
+            return bplist.BinaryPlistWriter._encode(self, obj)
+
+    monkeypatch.setattr(module, '_LEAF_WRITER', CountingWriter())
+    depth = 40
+    path = tuple('Level%d' % level for level in reversed(range(depth)))
+
+    assert diff(chain(depth, 1), chain(depth, 2)) == [('set', path, 2)]
+    # Two keys and a name per level, and the leaf, in each tree
+    assert len(encoded) == 2 * (3 * depth + 1)
+
+
+@pytest.mark.parametrize('before, after, ops', [
+    ({'a': {'x': 1}}, {'a': {'x': True}}, [('set', ('a', 'x'), True)]),
+    ([1], [1.0], [('set', (0,), 1.0)]),
+    ({'a': [0]}, {'a': [False]}, [('set', ('a', 0), False)]),
+    ([[1.0, 2]], [[1, 2]], [('set', (0, 0), 1)]),
+])
+def test_nested_type_changes(before, after, ops):
+    assert diff(before, after) == ops
+    assert digest(patch(copy.deepcopy(before), ops)) == digest(after)
+
+
+def test_patch_applies_in_place():
+    target = copy.deepcopy(BEFORE)
+    assert patch(target, diff(BEFORE, AFTER)) is target
+    assert target == AFTER and type(target['Encrypted']) is int
+
+
+def test_patch_survives_a_plist_round_trip():
+    ops = bplist.loads(bplist.dumps(diff(BEFORE, AFTER)))
+    assert patch(copy.deepcopy(BEFORE), ops) == AFTER
+
+
+@pytest.mark.parametrize('before, after', [
+    ([1, 2, 3], [1, 2, 3, 4, 5]),
+    ([1, 2, 3, 4, 5], [1, 5]),
+    ([], ['a']),
+    ({'a': 1}, [1]),
+])
+def test_arrays_and_root_changes(before, after):
+    assert patch(copy.deepcopy(before), diff(before, after)) == after
+
+
+def test_digest():
+    assert digest(BEFORE) == digest(copy.deepcopy(BEFORE))
+    assert digest(BEFORE) != digest(AFTER)
+
+
+@pytest.mark.skipif(libplist.LIBPLIST is None, reason='libplist could not be loaded')
+def test_patch_node_tree():
+    node = libplist.Dict(BEFORE)
+
+    ops = diff(node, libplist.Dict(AFTER))
+    patch(node, ops)
+
+    assert node.get_value() == AFTER
@@ -0,0 +1,74 @@
+import io
+import plistlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from plist import iterparse, xmlplist
+
+
+SAMPLE = {
+    'Applications': {'com.example.app': {'Version': '1.0', 'Size': 0x1000}},
+    'Domains': ['HomeDomain', 'CameraRollDomain'],
+    'Date': datetime(2022, 3, 4, 5, 6, 7),
+    'Blob': b'\x00\xff' * 64,
+    'Encrypted': False,
+}
+
+
+def _stream(value) -> io.BytesIO:
+    return io.BytesIO(plistlib.dumps(value, fmt=plistlib.FMT_XML))
+
+
+def test_top_level_entries():
+    assert dict((path[0], value) for path, value in iterparse(_stream(SAMPLE))) == SAMPLE
+
+
+def test_whole_document_at_depth_zero():
+    assert list(iterparse(_stream(SAMPLE), depth=0, chunk_size=13)) == [((), SAMPLE)]
+
+
+def test_prefix_selects_nested_values():
+    result = list(iterparse(_stream(SAMPLE), depth=2, prefix=('Domains',)))
+    assert result == [(('Domains', 0), 'HomeDomain'), (('Domains', 1), 'CameraRollDomain')]
+
+
+def test_text_stream():
+    text = io.StringIO(plistlib.dumps(SAMPLE).decode('utf-8'))
+    assert list(iterparse(text, prefix=('Encrypted',))) == [(('Encrypted',), False)]
+
+
+@pytest.mark.parametrize('body', [
+    '<key>stray</key><string>x</string>',
+    '<array><key>stray</key><string>x</string></array>',
+    '<dict><string>x</string></dict>',
+    '<dict><key>a</key><key>b</key><string>x</string></dict>',
+    '<dict><key>a</key></dict>',
+])
+def test_malformed_structure(body):
+    document = io.BytesIO(('<plist version="1.0">%s</plist>' % body).encode('utf-8'))
+    with pytest.raises(ValueError):
+        list(iterparse(document, depth=0))
+
+
+def test_dumps_matches_plistlib():
+    assert xmlplist.dumps(SAMPLE) == plistlib.dumps(SAMPLE, fmt=plistlib.FMT_XML).decode('utf-8')
+
+
+def test_dump_streams_in_chunks():
+    chunks = []
+    xmlplist.XmlPlistWriter(chunks.append, chunk_size=64).write(SAMPLE)
+
+    assert len(chunks) > 1
+    assert plistlib.loads(''.join(chunks).encode('utf-8')) == SAMPLE
+
+
+def test_dump_to_binary_file():
+    fp = io.BytesIO()
+    xmlplist.dump(SAMPLE, fp)
+    assert plistlib.loads(fp.getvalue()) == SAMPLE
+
+
+def test_aware_datetimes_are_written_as_utc():
+    local = datetime(2021, 6, 1, 14, 30, 15, tzinfo=timezone(timedelta(hours=2)))
+    assert plistlib.loads(xmlplist.dumps([local]).encode('utf-8')) == [datetime(2021, 6, 1, 12, 30, 15)]